@@ -0,0 +1,35 @@
+"""add portfolio_daily_values table
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "portfolio_daily_values",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("date", sa.Date, nullable=False),
+        sa.Column("category", sa.String(30), nullable=False),
+        sa.Column("value", sa.Float, nullable=False),
+        sa.Column("holdings_version", sa.Integer, nullable=False, server_default="0"),
+        # Also the index for per-user date range reads
+        sa.UniqueConstraint("user_id", "date", "category", name="uq_portfolio_daily_values_user_date_category"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("portfolio_daily_values")
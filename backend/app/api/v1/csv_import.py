@@ -4,7 +4,7 @@ import logging
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.models.user import User
+from app.schemas.user import Principal
 from app.models.holding import Holding
 from app.models.transaction import Transaction
 from app.schemas.holdings import HoldingResponse
@@ -15,6 +15,7 @@ from app.services.mf_resolver import resolve_mf_ticker, _search_yahoo_by_isin
 from pydantic import BaseModel
 from typing import Optional
 from app.services.duplicate_service import find_duplicate_holding, compute_merge
+from app.services.portfolio_cache import commit_holdings_change
 
 logger = logging.getLogger(__name__)
 
@@ -65,7 +66,7 @@ async def upload_csv(
     file: UploadFile = File(...),
     broker: Optional[str] = Form(None),
     column_mapping: Optional[str] = Form(None),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     if not file.filename or not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="Please upload a CSV file")
@@ -113,7 +114,7 @@ async def upload_csv(
 @router.post("/check-duplicates", response_model=CheckDuplicatesResponse)
 async def check_duplicates(
     request: CheckDuplicatesRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Check which import rows conflict with existing holdings."""
@@ -155,7 +156,7 @@ async def check_duplicates(
 @router.post("/csv/confirm", response_model=list[HoldingResponse])
 async def confirm_csv_import(
     request: CsvConfirmRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     redis = await get_redis()
@@ -273,7 +274,7 @@ async def confirm_csv_import(
         db.add(transaction)
         created.append(holding)
 
-    await db.flush()
+    await commit_holdings_change(db, redis, current_user.id)
     return created
 
 
@@ -307,7 +308,7 @@ class ResolveIsinResponse(BaseModel):
 @router.post("/resolve-mf", response_model=ResolveMfResponse)
 async def resolve_mf_names(
     request: ResolveMfRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Batch resolve mutual fund names to Yahoo Finance tickers."""
     redis = await get_redis()
@@ -334,7 +335,7 @@ async def resolve_mf_names(
 @router.post("/resolve-isin", response_model=ResolveIsinResponse)
 async def resolve_isin(
     request: ResolveIsinRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Resolve a single ISIN to a Yahoo Finance ticker."""
     isin = request.isin.strip().upper()
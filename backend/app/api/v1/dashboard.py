@@ -1,18 +1,40 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
-from app.models.user import User
+from datetime import date
+from typing import Literal
+from fastapi import APIRouter, Depends, Query, Request, Response
+from app.schemas.user import Principal
 from app.utils.security import get_current_user
 from app.services import portfolio_service
+from app.services.portfolio_cache import cached_view
 from app.redis import get_redis
+from app.utils.compact_json import as_columnar, columnar_dashboard, compact_response
+from app.utils.conditional import not_modified
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 
 @router.get("")
 async def get_dashboard(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    response: Response,
+    format: Literal["rows", "columnar"] = Query("rows"),
+    current_user: Principal = Depends(get_current_user),
     redis=Depends(get_redis),
 ):
-    return await portfolio_service.get_dashboard(db, current_user.id, redis=redis)
+    today = date.today().isoformat()
+    view = f"dashboard:columnar:{today}" if format == "columnar" else f"dashboard:{today}"
+    # The dashboard's performance chart draws the default benchmarks
+    unchanged = await not_modified(request, response, redis, current_user.id, view, benchmarks=True)
+    if unchanged is not None:
+        return unchanged
+    if format == "columnar":
+        dashboard = await cached_view(
+            redis, current_user.id, view,
+            lambda db: as_columnar(columnar_dashboard, portfolio_service.get_dashboard(db, current_user.id, redis=redis)),
+            benchmarks=True,
+        )
+        return compact_response(request, dashboard, headers=response.headers)
+    return await cached_view(
+        redis, current_user.id, view,
+        lambda db: portfolio_service.get_dashboard(db, current_user.id, redis=redis),
+        benchmarks=True,
+    )
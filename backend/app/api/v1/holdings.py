@@ -5,7 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from pydantic import BaseModel
 from app.database import get_db
-from app.models.user import User
+from app.schemas.user import Principal
 from app.models.holding import Holding
 from app.models.transaction import Transaction
 from app.schemas.holdings import HoldingCreate, HoldingUpdate, HoldingResponse
@@ -13,6 +13,7 @@ from app.utils.security import get_current_user
 from app.redis import get_redis
 from app.services.mf_resolver import resolve_mf_ticker
 from app.services.duplicate_service import get_duplicate_groups, compute_merge
+from app.services.portfolio_cache import commit_holdings_change
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +30,7 @@ class MergeGroupRequest(BaseModel):
 
 @router.get("", response_model=list[HoldingResponse])
 async def list_holdings(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     result = await db.execute(
@@ -44,7 +45,7 @@ async def list_holdings(
 
 @router.get("/duplicates")
 async def list_duplicate_groups(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Return groups of holdings that share the same symbol+asset_class."""
@@ -55,8 +56,9 @@ async def list_duplicate_groups(
 @router.post("/merge-duplicates")
 async def merge_duplicate_groups(
     request: MergeGroupRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis),
 ):
     """Merge each group of duplicate holdings. Keeps the oldest, deactivates the rest."""
     merged_count = 0
@@ -98,15 +100,16 @@ async def merge_duplicate_groups(
         db.add(transaction)
         merged_count += 1
 
-    await db.flush()
+    await commit_holdings_change(db, redis, current_user.id)
     return {"merged_groups": merged_count}
 
 
 @router.post("/bulk-delete", status_code=204)
 async def bulk_delete_holdings(
     request: BulkDeleteRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis),
 ):
     result = await db.execute(
         select(Holding).where(
@@ -120,7 +123,7 @@ async def bulk_delete_holdings(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No holdings found")
     for holding in holdings:
         holding.is_active = False
-    await db.flush()
+    await commit_holdings_change(db, redis, current_user.id)
 
 
 # --- Parameterized routes below ---
@@ -128,15 +131,15 @@ async def bulk_delete_holdings(
 @router.post("", response_model=HoldingResponse, status_code=201)
 async def create_holding(
     request: HoldingCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis),
 ):
     holding_data = request.model_dump()
 
     # Auto-resolve MF symbol if not provided
     if request.asset_class_code == "MUTUAL_FUND" and not request.symbol and request.name:
         try:
-            redis = await get_redis()
             resolved = await resolve_mf_ticker(request.name, redis)
             if resolved:
                 holding_data["symbol"] = resolved["yf_ticker"]
@@ -149,6 +152,7 @@ async def create_holding(
         **holding_data,
     )
     db.add(holding)
+    await db.flush()
 
     # Create a buy transaction
     transaction = Transaction(
@@ -163,14 +167,14 @@ async def create_holding(
         transaction_date=request.buy_date,
     )
     db.add(transaction)
-    await db.flush()
+    await commit_holdings_change(db, redis, current_user.id, [transaction])
     return holding
 
 
 @router.get("/{holding_id}", response_model=HoldingResponse)
 async def get_holding(
     holding_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     result = await db.execute(
@@ -186,8 +190,9 @@ async def get_holding(
 async def update_holding(
     holding_id: uuid.UUID,
     request: HoldingUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis),
 ):
     result = await db.execute(
         select(Holding).where(Holding.id == holding_id, Holding.user_id == current_user.id)
@@ -199,15 +204,16 @@ async def update_holding(
     update_data = request.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(holding, field, value)
-    await db.flush()
+    await commit_holdings_change(db, redis, current_user.id)
     return holding
 
 
 @router.delete("/{holding_id}", status_code=204)
 async def delete_holding(
     holding_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis),
 ):
     result = await db.execute(
         select(Holding).where(Holding.id == holding_id, Holding.user_id == current_user.id)
@@ -217,6 +223,6 @@ async def delete_holding(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Holding not found")
     # Soft delete
     holding.is_active = False
-    await db.flush()
+    await commit_holdings_change(db, redis, current_user.id)
 
 
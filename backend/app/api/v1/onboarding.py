@@ -3,10 +3,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 from app.database import get_db
 from app.models.user import User
+from app.schemas.user import Principal
 from app.models.risk_profile import RiskProfile
 from app.models.goal import Goal
 from app.schemas.onboarding import RiskProfileRequest, RiskProfileResponse
-from app.utils.security import get_current_user
+from app.utils.security import get_current_user, invalidate_principal
 from app.services.risk_engine import calculate_risk_score
 
 router = APIRouter(prefix="/onboarding", tags=["onboarding"])
@@ -15,7 +16,7 @@ router = APIRouter(prefix="/onboarding", tags=["onboarding"])
 @router.post("/risk-profile", response_model=RiskProfileResponse)
 async def create_risk_profile(
     request: RiskProfileRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     # Mark previous profiles as not current
@@ -63,15 +64,16 @@ async def create_risk_profile(
             ))
 
     # Mark onboarding complete
-    current_user.onboarding_completed = True
-    await db.flush()
+    await db.execute(update(User).where(User.id == current_user.id).values(onboarding_completed=True))
+    await db.commit()
+    await invalidate_principal(current_user.id)
 
     return profile
 
 
 @router.get("/risk-profile", response_model=RiskProfileResponse | None)
 async def get_risk_profile(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     result = await db.execute(
@@ -1,37 +1,119 @@
-from fastapi import APIRouter, Depends, Query
+from datetime import date
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.models.user import User
+from app.schemas.user import Principal
 from app.utils.security import get_current_user
-from app.services import portfolio_service
+from app.services import portfolio_service, returns_service, risk_metrics
+from app.services.benchmark_service import BENCHMARKS
+from app.services.portfolio_service import MAX_PERFORMANCE_DAYS, MIN_PERFORMANCE_DAYS
+from app.services.portfolio_cache import cached_view
 from app.redis import get_redis
+from app.utils.compact_json import as_columnar, columnar_performance, compact_response
+from app.utils.conditional import not_modified
 
 router = APIRouter(prefix="/portfolio", tags=["portfolio"])
 
 
 @router.get("/summary")
 async def portfolio_summary(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
     redis=Depends(get_redis),
 ):
-    return await portfolio_service.get_portfolio_summary(db, current_user.id, redis=redis)
+    unchanged = await not_modified(request, response, redis, current_user.id, "summary")
+    if unchanged is not None:
+        return unchanged
+    return await cached_view(
+        redis, current_user.id, "summary",
+        lambda db: portfolio_service.get_portfolio_summary(db, current_user.id, redis=redis),
+    )
 
 
 @router.get("/allocation")
 async def portfolio_allocation(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
     redis=Depends(get_redis),
 ):
-    return await portfolio_service.get_allocation(db, current_user.id, redis=redis)
+    unchanged = await not_modified(request, response, redis, current_user.id, "allocation")
+    if unchanged is not None:
+        return unchanged
+    return await cached_view(
+        redis, current_user.id, "allocation",
+        lambda db: portfolio_service.get_allocation(db, current_user.id, redis=redis),
+    )
+
+
+@router.get("/benchmarks")
+async def list_benchmarks(current_user: Principal = Depends(get_current_user)):
+    """Benchmarks the performance chart can compare against."""
+    return [{"ticker": t, "name": b["name"], "default": b["default"]} for t, b in BENCHMARKS.items()]
 
 
 @router.get("/performance")
 async def portfolio_performance(
-    days: int = Query(30, ge=7, le=365),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    days: str = Query("30", pattern=r"^(\d+|max)$"),
+    interval: Literal["day", "week", "month"] = Query("day"),
+    points: int | None = Query(500, ge=10, le=5000),
+    benchmark: list[str] | None = Query(None),
+    format: Literal["rows", "columnar"] = Query("rows"),
+    current_user: Principal = Depends(get_current_user),
+    redis=Depends(get_redis),
+):
+    """Daily values (or week/month ends) over days, or since the first holding for days=max.
+
+    Every series is thinned to at most points points, keeping its peaks and troughs.
+    """
+    span = None if days == "max" else int(days)
+    if span is not None and not MIN_PERFORMANCE_DAYS <= span <= MAX_PERFORMANCE_DAYS:
+        raise HTTPException(
+            status_code=400, detail=f"days must be between {MIN_PERFORMANCE_DAYS} and {MAX_PERFORMANCE_DAYS}, or max",
+        )
+    benchmarks = list(dict.fromkeys(benchmark)) if benchmark else None
+    unknown = [t for t in benchmarks or [] if t not in BENCHMARKS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown benchmark: {', '.join(unknown)}")
+
+    def compute(db: AsyncSession):
+        return portfolio_service.get_performance(
+            db, current_user.id, span, redis=redis, benchmarks=benchmarks, interval=interval, points=points,
+        )
+
+    # The series ends today, so the view also changes at midnight
+    selection = ",".join(benchmarks) if benchmarks else "default"
+    view = f"performance:{days}:{interval}:{points}:{selection}:{date.today().isoformat()}"
+    if format == "columnar":
+        performance = await cached_view(
+            redis, current_user.id, f"{view}:columnar", lambda db: as_columnar(columnar_performance, compute(db)),
+            benchmarks=True,
+        )
+        return compact_response(request, performance)
+    return await cached_view(redis, current_user.id, view, compute, benchmarks=True)
+
+
+@router.get("/returns")
+async def portfolio_returns(
+    days: int = Query(365, ge=7, le=1825),
+    current_user: Principal = Depends(get_current_user),
     redis=Depends(get_redis),
 ):
-    return await portfolio_service.get_performance(db, current_user.id, days, redis=redis)
+    """XIRR, TWR and CAGR per holding, asset class and portfolio over the last days."""
+    return await cached_view(
+        redis, current_user.id, f"returns:{days}:{date.today().isoformat()}",
+        lambda db: returns_service.get_returns(db, current_user.id, days, redis=redis),
+    )
+
+
+@router.get("/risk")
+async def portfolio_risk(
+    benchmark: Literal["^NSEI", "^GSPC"] = Query(risk_metrics.DEFAULT_BENCHMARK),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Volatility, beta, max drawdown and Sharpe, as stored after the last EOD run."""
+    return await risk_metrics.get_risk(db, current_user.id, benchmark)
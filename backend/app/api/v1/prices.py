@@ -1,18 +1,20 @@
 """Price service endpoints: manual refresh and cache status."""
+import redis.asyncio as aioredis
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.models.user import User
+from app.schemas.user import Principal
 from app.utils.security import get_current_user
 from app.redis import get_redis
 from app.celery_app import celery
+from app.services import http_client
 
 router = APIRouter(prefix="/prices", tags=["prices"])
 
 
 @router.post("/refresh")
 async def refresh_prices(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Manually trigger a current-price fetch for all held tickers."""
     task = celery.send_task("fetch_current_prices")
@@ -21,7 +23,7 @@ async def refresh_prices(
 
 @router.get("/status")
 async def price_status(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     redis=Depends(get_redis),
 ):
     """Check cache warmth and last update time."""
@@ -46,8 +48,15 @@ async def price_status(
         if cursor == 0 or cursor == "0":
             break
 
+    # Provider traffic runs in the Celery workers, which publish their counters
+    try:
+        http = http_client.published_stats(await redis.hgetall(http_client.stats_key()))
+    except aioredis.RedisError:
+        http = None
+
     return {
         "cached_tickers": cached_count,
         "last_updated": last_updated,
         "cache_ttl_seconds": 900,
+        "http": http,
     }
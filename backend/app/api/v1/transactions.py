@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.database import get_db
-from app.models.user import User
+from app.schemas.user import Principal
 from app.models.transaction import Transaction
 from app.utils.security import get_current_user
 from pydantic import BaseModel
@@ -33,7 +33,7 @@ class TransactionResponse(BaseModel):
 
 @router.get("", response_model=list[TransactionResponse])
 async def list_transactions(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     result = await db.execute(
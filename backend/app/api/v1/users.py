@@ -2,42 +2,46 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.models.user import User
-from app.schemas.user import UserResponse, UserUpdate, ChangePasswordRequest
+from app.schemas.user import Principal, UserResponse, UserUpdate, ChangePasswordRequest
 from app.schemas.auth import MessageResponse
-from app.utils.security import get_current_user, verify_password, hash_password
+from app.utils.security import get_current_user, invalidate_principal, verify_password, hash_password
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: Principal = Depends(get_current_user)):
     return current_user
 
 
 @router.patch("/me", response_model=UserResponse)
 async def update_me(
     update: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
+    user = await db.get(User, current_user.id)
     if update.full_name is not None:
-        current_user.full_name = update.full_name
+        user.full_name = update.full_name
     if update.phone is not None:
-        current_user.phone = update.phone
+        user.phone = update.phone
     if update.preferred_currency is not None:
-        current_user.preferred_currency = update.preferred_currency
-    await db.flush()
-    return current_user
+        user.preferred_currency = update.preferred_currency
+    await db.commit()
+    await invalidate_principal(user.id)
+    return user
 
 
 @router.post("/me/change-password", response_model=MessageResponse)
 async def change_password(
     request: ChangePasswordRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    if not verify_password(request.current_password, current_user.password_hash):
+    user = await db.get(User, current_user.id)
+    if not verify_password(request.current_password, user.password_hash):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Current password is incorrect")
-    current_user.password_hash = hash_password(request.new_password)
-    await db.flush()
+    user.password_hash = hash_password(request.new_password)
+    await db.commit()
+    await invalidate_principal(user.id)
     return MessageResponse(message="Password changed successfully")
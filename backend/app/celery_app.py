@@ -1,12 +1,16 @@
+from datetime import timedelta
 from celery import Celery
-from celery.schedules import crontab
 import os
 
+from app.config import settings
+from app.services.market_calendar import NAV_FETCH_DELAY
+from app.tasks.schedules import MarketCloseSchedule, MarketSessionSchedule
+
 celery = Celery(
     "invest_me",
     broker=os.getenv("CELERY_BROKER_URL", "redis://redis:6379/1"),
     backend=os.getenv("CELERY_BROKER_URL", "redis://redis:6379/1"),
-    include=["app.tasks.price_tasks"],
+    include=["app.tasks.price_tasks", "app.tasks.portfolio_tasks", "app.tasks.risk_tasks", "app.tasks.valuation_tasks"],
 )
 
 celery.conf.update(
@@ -15,18 +19,27 @@ celery.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    worker_prefetch_multiplier=1,  # one price shard per free worker process
     beat_schedule={
         "fetch-current-prices-every-15-min": {
             "task": "fetch_current_prices",
-            "schedule": 900.0,  # 15 minutes
+            # Every 15 min in INDIA/US sessions; 24/7 crypto keeps a slower off-session cycle
+            "schedule": MarketSessionSchedule(
+                timedelta(seconds=900), ("INDIA", "US"), timedelta(seconds=settings.PRICE_OFF_SESSION_INTERVAL_SECONDS),
+            ),
         },
-        "fetch-eod-prices-daily": {
+        "fetch-eod-prices-after-close": {
             "task": "fetch_eod_prices",
-            "schedule": crontab(hour=16, minute=30),  # 16:30 UTC (after IN + US close)
+            # After each exchange close on trading days (and each UTC midnight for crypto);
+            # tickers whose market didn't close are already current and skipped
+            "schedule": MarketCloseSchedule(
+                ("INDIA", "US", "MF_DAILY", "ALWAYS"), timedelta(minutes=settings.PRICE_EOD_DELAY_MINUTES),
+            ),
         },
         "fetch-mf-nav-daily": {
             "task": "fetch_mf_nav",
-            "schedule": crontab(hour=18, minute=0),  # 18:00 UTC / 11:30 PM IST (after NAV declaration + EOD task)
+            # 23:30 IST on NSE trading days (after NAV declaration + the MF EOD run)
+            "schedule": MarketCloseSchedule(("MF_DAILY",), NAV_FETCH_DELAY),
         },
     },
 )
@@ -15,6 +15,7 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 300  # authenticated users' identity cached in Redis
 
     # Celery
     CELERY_BROKER_URL: str = "redis://redis:6379/1"
@@ -23,6 +24,37 @@ class Settings(BaseSettings):
     PRICE_CACHE_TTL_SECONDS: int = 900  # 15 minutes
     YFINANCE_BATCH_SIZE: int = 50
     PRICE_HISTORY_BACKFILL_DAYS: int = 365
+    PRICE_FETCH_MAX_CONNECTIONS: int = 20
+    PRICE_FETCH_PER_HOST_CONCURRENCY: int = 8
+    PRICE_FETCH_TIMEOUT_SECONDS: float = 10.0
+    PRICE_FETCH_SHARD_SIZE: int = 200  # tickers per fetch_price_shard subtask
+    HOLDER_INDEX_RECONCILE_SECONDS: int = 21600  # holder index checked against holdings at most this often
+    PRICE_REFRESH_MAX_CYCLES: int = 8  # least-held tickers refresh every N 15-min cycles
+    PRICE_REFRESH_REQUEST_BUDGET: int = 40  # quote requests per 15-min cycle (batches, or one per ticker on the chart fallback)
+    PRICE_OFF_SESSION_INTERVAL_SECONDS: int = 3600  # current-price cycle while INDIA/US are closed
+    PRICE_EOD_DELAY_MINUTES: int = 30  # EOD fetch runs this long after each market close
+    PORTFOLIO_VALUE_HISTORY_DAYS: int = 1825  # days of materialized portfolio_daily_values per user
+    RISK_WINDOW_DAYS: int = 365  # days of closes behind the stored risk metrics
+    RISK_FREE_RATE: float = 0.065  # annual rate the Sharpe ratio is measured against
+
+    # Outbound HTTP to market-data providers
+    HTTP_MAX_RETRIES: int = 3
+    HTTP_BACKOFF_BASE_SECONDS: float = 0.5
+    HTTP_BACKOFF_MAX_SECONDS: float = 8.0
+    YAHOO_TIMEOUT_SECONDS: float = 10.0
+    MFAPI_TIMEOUT_SECONDS: float = 10.0
+
+    # Provider rate limits / circuit breaker (shared across workers via Redis)
+    YAHOO_RATE_PER_SECOND: float = 5.0
+    YAHOO_BURST: int = 10
+    YAHOO_DAILY_BUDGET: int = 20000
+    MFAPI_RATE_PER_SECOND: float = 2.0
+    MFAPI_BURST: int = 5
+    MFAPI_DAILY_BUDGET: int = 5000
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_FAILURE_WINDOW_SECONDS: int = 60
+    CIRCUIT_COOLDOWN_SECONDS: int = 300
+    YAHOO_QUOTE_SUSPEND_SECONDS: int = 21600  # batch quotes skipped this long after Yahoo rejects them (401/403)
 
     # CORS
     CORS_ORIGINS: str = '["http://localhost:3000","http://localhost:3001"]'
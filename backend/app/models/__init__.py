@@ -10,9 +10,12 @@ from app.models.report import Report
 from app.models.goal import Goal
 from app.models.currency import Currency, ExchangeRate
 from app.models.price_history import PriceHistory
+from app.models.portfolio_daily_value import PortfolioDailyValue
+from app.models.portfolio_risk_metric import PortfolioRiskMetric
 
 __all__ = [
     "User", "RiskProfile", "AssetClass", "Holding", "Transaction",
     "BrokerConnection", "MarketData", "Signal", "Report", "Goal",
-    "Currency", "ExchangeRate", "PriceHistory",
+    "Currency", "ExchangeRate", "PriceHistory", "PortfolioDailyValue",
+    "PortfolioRiskMetric",
 ]
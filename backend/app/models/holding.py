@@ -28,4 +28,4 @@ class Holding(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     user = relationship("User", back_populates="holdings")
-    transactions = relationship("Transaction", back_populates="holding", lazy="selectin")
+    transactions = relationship("Transaction", back_populates="holding", lazy="raise")
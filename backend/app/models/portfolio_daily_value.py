@@ -0,0 +1,28 @@
+import uuid
+from datetime import date as date_type
+from sqlalchemy import String, Float, Integer, Date, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+# category of the whole-portfolio row (the others are allocation categories: Equity, Funds, ...)
+TOTAL_CATEGORY = "_total"
+
+
+class PortfolioDailyValue(Base):
+    """End-of-day value of a user's holdings, per date and category.
+
+    Maintained by the portfolio_tasks batch jobs. holdings_version is the user's
+    holdings version the row was computed from; rows from older versions are stale.
+    """
+    __tablename__ = "portfolio_daily_values"
+    __table_args__ = (
+        UniqueConstraint("user_id", "date", "category", name="uq_portfolio_daily_values_user_date_category"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    date: Mapped[date_type] = mapped_column(Date, nullable=False)
+    category: Mapped[str] = mapped_column(String(30), nullable=False)
+    value: Mapped[float] = mapped_column(Float, nullable=False)
+    holdings_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -0,0 +1,23 @@
+import uuid
+from datetime import date as date_type, datetime
+from sqlalchemy import Integer, Date, DateTime, ForeignKey, func
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class PortfolioRiskMetric(Base):
+    """A user's latest risk metrics, one row per user.
+
+    Written by the update_risk_metrics task (see risk_metrics). metrics is
+    {portfolio: {...}, holdings: [{symbol, weight, ...}]} with betas keyed by
+    benchmark ticker; as_of is the last trading day of the closes used.
+    """
+    __tablename__ = "portfolio_risk_metrics"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, unique=True)
+    as_of: Mapped[date_type] = mapped_column(Date, nullable=False)
+    holdings_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    metrics: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
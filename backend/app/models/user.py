@@ -21,6 +21,7 @@ class User(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
-    risk_profiles = relationship("RiskProfile", back_populates="user", lazy="selectin")
-    holdings = relationship("Holding", back_populates="user", lazy="selectin")
-    goals = relationship("Goal", back_populates="user", lazy="selectin")
+    # Never loaded implicitly: query them, or use selectinload() where they're needed
+    risk_profiles = relationship("RiskProfile", back_populates="user", lazy="raise")
+    holdings = relationship("Holding", back_populates="user", lazy="raise")
+    goals = relationship("Goal", back_populates="user", lazy="raise")
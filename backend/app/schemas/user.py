@@ -16,6 +16,24 @@ class UserResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class Principal(BaseModel):
+    """The authenticated user's identity columns, as loaded by get_current_user.
+
+    Not an ORM object: endpoints that change the user, or need their holdings,
+    goals or risk profiles, load those explicitly.
+    """
+    id: UUID
+    email: str
+    full_name: str
+    phone: Optional[str] = None
+    preferred_currency: str
+    onboarding_completed: bool
+    is_active: bool
+    created_at: datetime
+
+    model_config = {"from_attributes": True, "frozen": True}
+
+
 class UserUpdate(BaseModel):
     full_name: Optional[str] = None
     phone: Optional[str] = None
@@ -0,0 +1,106 @@
+"""Benchmark registry and the shared benchmark return series.
+
+The price tasks fetch every registered benchmark. After each EOD run
+update_benchmark_series stores each benchmark's cumulative return index (close
+over its first close in the window, on each day with a close) for the last
+PORTFOLIO_VALUE_HISTORY_DAYS days in one Redis hash, benchmark_series (ticker ->
+JSON index, plus the window's first date), shared by every user. A performance
+request only rescales the cached index to its portfolio's starting value;
+without the cache the index is built from price_history for the request's
+window instead.
+"""
+import json
+import logging
+from datetime import date
+
+import numpy as np
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_SERIES_KEY = "benchmark_series"
+# Hash field holding the first date of every cached index
+_START_FIELD = "_start"
+
+# yf_ticker -> display name, price_history asset class, market group (see price_tasks)
+# and whether performance charts show it unless the user picks benchmarks
+BENCHMARKS = {
+    "^NSEI": {"name": "Nifty 50", "asset_class_code": "INDEX", "market_group": "INDIA", "default": True},
+    "^BSESN": {"name": "Sensex", "asset_class_code": "INDEX", "market_group": "INDIA", "default": True},
+    "^NSEBANK": {"name": "Nifty Bank", "asset_class_code": "INDEX", "market_group": "INDIA", "default": False},
+    "^GSPC": {"name": "S&P 500", "asset_class_code": "INDEX", "market_group": "US", "default": True},
+    "^IXIC": {"name": "Nasdaq Composite", "asset_class_code": "INDEX", "market_group": "US", "default": False},
+    "GC=F": {"name": "Gold", "asset_class_code": "COMMODITY", "market_group": "US", "default": True},
+    "BTC-INR": {"name": "Bitcoin", "asset_class_code": "CRYPTO", "market_group": "ALWAYS", "default": True},
+}
+DEFAULT_BENCHMARKS = [t for t, b in BENCHMARKS.items() if b["default"]]
+
+# ticker -> (first date, cumulative return index per day from it; NaN on days without a close)
+BenchmarkSeries = dict[str, tuple[date, np.ndarray]]
+
+
+def benchmark_index(price_rows, tickers: list[str], start_date: date, days: int) -> BenchmarkSeries:
+    """Return index of each ticker with a close in the window, from (symbol, date, close) rows."""
+    column = {t: j for j, t in enumerate(tickers)}
+    closes = np.full((days + 1, len(tickers)), np.nan)
+    for symbol, d, close in price_rows:
+        j = column.get(symbol)
+        i = (d - start_date).days
+        if j is not None and 0 <= i <= days:
+            closes[i, j] = close
+
+    seen = ~np.isnan(closes)
+    first = closes[seen.argmax(axis=0), np.arange(len(tickers))]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        index = closes / first
+    return {t: (start_date, index[:, j]) for t, j in column.items() if seen[:, j].any()}
+
+
+def encode_series(series: BenchmarkSeries, start_date: date) -> dict[str, str]:
+    """BENCHMARK_SERIES_KEY hash fields for series built from start_date."""
+    fields = {t: json.dumps([None if np.isnan(x) else float(x) for x in index]) for t, (_, index) in series.items()}
+    return {_START_FIELD: start_date.isoformat(), **fields}
+
+
+async def load_benchmark_series(redis: aioredis.Redis, tickers: list[str], start_date: date) -> BenchmarkSeries | None:
+    """Cached series of tickers, or None when the cache doesn't reach back to start_date.
+
+    Tickers missing from the cache have no closes in its window and are left out.
+    """
+    try:
+        raw = await redis.hmget(BENCHMARK_SERIES_KEY, [_START_FIELD, *tickers])
+    except aioredis.RedisError as e:
+        logger.warning(f"Benchmark series cache unavailable: {e}")
+        return None
+    if raw[0] is None or date.fromisoformat(raw[0]) > start_date:
+        return None
+
+    start = date.fromisoformat(raw[0])
+    return {t: (start, np.array(json.loads(index), dtype=float)) for t, index in zip(tickers, raw[1:]) if index}
+
+
+def rescale(
+    series: BenchmarkSeries, tickers: list[str], start_date: date, days: int, base_value: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """((days + 1) x tickers values, mask) of each index scaled to base_value at its first close in the window.
+
+    Values carry forward between closes (and past the end of the series); the mask
+    is False before a ticker's first close in the window.
+    """
+    window = np.full((days + 1, len(tickers)), np.nan)
+    for j, t in enumerate(tickers):
+        if t in series:
+            start, index = series[t]
+            index = index[(start_date - start).days:][: days + 1]
+            window[: len(index), j] = index
+
+    seen = np.maximum.accumulate(~np.isnan(window), axis=0)
+    # Each cell takes the row of the last close at or above it
+    filled = np.where(np.isnan(window), 0, np.arange(days + 1)[:, None])
+    np.maximum.accumulate(filled, axis=0, out=filled)
+    window = window[filled, np.arange(len(tickers))]
+
+    base = window[seen.argmax(axis=0), np.arange(len(tickers))]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return base_value * (window / base), seen
+
@@ -0,0 +1,195 @@
+"""Async HTTP fetch engine for market-data providers.
+
+A FetchEngine owns one httpx.AsyncClient (a single keep-alive connection pool)
+for the duration of a fetch run. In-flight requests are bounded per host with a
+semaphore, and every request carries a hard deadline so one slow ticker cannot
+hold up the rest of the cycle. Retry/backoff policy and counters are shared with
+the synchronous client in http_client.
+"""
+import asyncio
+import logging
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.config import settings
+from app.services import http_client
+from app.services.rate_limiter import BudgetExceededError, CircuitOpenError, ProviderGuard
+
+logger = logging.getLogger(__name__)
+
+
+class FetchEngine:
+    """Bounded-concurrency JSON fetcher. Use as an async context manager:
+
+        async with FetchEngine() as engine:
+            data = await engine.get_json(url, params={...})
+    """
+
+    def __init__(
+        self,
+        max_connections: int | None = None,
+        per_host_limit: int | None = None,
+        timeout: float | None = None,
+        max_retries: int | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        guard: ProviderGuard | None = None,
+    ):
+        self.max_connections = max_connections or settings.PRICE_FETCH_MAX_CONNECTIONS
+        self.per_host_limit = per_host_limit or settings.PRICE_FETCH_PER_HOST_CONCURRENCY
+        self.timeout = timeout
+        self.max_retries = settings.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self._transport = transport
+        self.guard = guard
+        self._client: httpx.AsyncClient | None = None
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+
+    async def __aenter__(self) -> "FetchEngine":
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            timeout=httpx.Timeout(self.timeout or settings.PRICE_FETCH_TIMEOUT_SECONDS),
+            follow_redirects=True,
+            transport=self._transport,
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        sem = self._host_limits.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(self.per_host_limit)
+            self._host_limits[host] = sem
+        return sem
+
+    async def _acquire(self, provider: str) -> bool:
+        """Wait for a rate-limit slot. False if the circuit is open or the daily budget is spent."""
+        while True:
+            try:
+                wait = await asyncio.to_thread(self.guard.acquire, provider)
+            except (CircuitOpenError, BudgetExceededError) as e:
+                logger.warning(f"Skipping {provider} request: {type(e).__name__}")
+                return False
+            if wait <= 0:
+                return True
+            await asyncio.sleep(wait)
+
+    async def _record(self, provider: str, ok: bool) -> None:
+        if self.guard is not None:
+            record = self.guard.record_success if ok else self.guard.record_failure
+            await asyncio.to_thread(record, provider)
+
+    async def get(
+        self,
+        url: str,
+        params: dict | None = None,
+        headers: dict | None = None,
+        deadline: float | None = None,
+        provider: str = "default",
+    ) -> httpx.Response | None:
+        """GET a URL and return the final response, whatever its status.
+
+        429/5xx responses and transport errors (connection failures, httpx
+        timeouts) are retried with backoff, as http_client.get does. With a guard,
+        every attempt first takes a rate-limit token and outcomes feed the
+        provider's circuit breaker (timeouts and transport errors count as
+        failures). Returns None on exhausted transport retries, an open circuit
+        or spent budget, or when an attempt overruns its deadline (seconds,
+        default: the provider's timeout).
+        """
+        if self._client is None:
+            raise RuntimeError("FetchEngine must be used as an async context manager")
+
+        deadline = deadline or self.timeout or http_client.provider_timeout(provider)
+        attempt = 0
+        while True:
+            if self.guard is not None and not await self._acquire(provider):
+                return None
+
+            resp = None
+            opened: list = []
+            async with self._host_limit(url):
+                try:
+                    resp = await asyncio.wait_for(
+                        self._client.get(
+                            url,
+                            params=params,
+                            headers=headers,
+                            extensions={"trace": http_client.async_trace(opened)},
+                        ),
+                        timeout=deadline,
+                    )
+                except asyncio.TimeoutError:
+                    await self._record(provider, ok=False)
+                    logger.warning(f"Request to {url} exceeded {deadline}s deadline")
+                    return None
+                except httpx.TransportError as e:
+                    await self._record(provider, ok=False)
+                    if attempt >= self.max_retries:
+                        logger.warning(f"Request to {url} failed: {e}")
+                        return None
+                except httpx.HTTPError as e:
+                    await self._record(provider, ok=False)
+                    logger.warning(f"Request to {url} failed: {e}")
+                    return None
+
+            if resp is not None:
+                http_client.stats.record_request(provider, len(opened))
+                throttled = resp.status_code in http_client.RETRY_STATUSES
+                await self._record(provider, ok=not throttled)
+                if not throttled or attempt >= self.max_retries:
+                    break
+
+            # Back off outside the host slot so other requests can proceed
+            http_client.stats.incr(provider, "retries")
+            await asyncio.sleep(http_client.backoff_delay(attempt, http_client.retry_after_seconds(resp)))
+            attempt += 1
+
+        return resp
+
+    async def get_json(
+        self,
+        url: str,
+        params: dict | None = None,
+        headers: dict | None = None,
+        deadline: float | None = None,
+        provider: str = "default",
+    ) -> dict | list | None:
+        """GET a URL and decode the JSON body (see get).
+
+        Returns None where get does, and on non-200 responses or undecodable bodies.
+        """
+        resp = await self.get(url, params=params, headers=headers, deadline=deadline, provider=provider)
+        if resp is None:
+            return None
+        if resp.status_code != 200:
+            logger.warning(f"{url} returned {resp.status_code}")
+            return None
+        try:
+            return resp.json()
+        except ValueError as e:
+            logger.warning(f"Invalid JSON from {url}: {e}")
+            return None
+
+
+def run_sync(coro):
+    """Run a coroutine to completion from synchronous code (Celery tasks).
+
+    Uses a private event loop rather than asyncio.run so the calling thread's
+    current loop, if any, is left untouched.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            loop.close()
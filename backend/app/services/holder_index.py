@@ -0,0 +1,172 @@
+"""Inverted index from each priced ticker to the users holding it.
+
+Keys:
+  ticker_holders:{yf_ticker}   user ids holding the ticker
+  holder_tickers:{user_id}     the user's indexed tickers (to move them when holdings change)
+  holder_index:users           every indexed user
+  holder_index:reconciled      set while the last reconciliation is recent
+
+commit_holdings_change re-indexes the user after each holdings write. As a
+safety net for a missed write, price cycles reconcile the index with the
+holdings table when it is cold and otherwise at most once per interval: only
+users whose indexed tickers differ from the table are re-read and re-indexed,
+and each write is conditional on the user's entry being unchanged since it was
+compared, so a reconciliation never undoes a concurrent index_user_holdings.
+Consumers fan out to holders_of_sync(tickers) instead of every user, and still
+check the holdings they load: the index may briefly list a former holder, but a
+current holder is only missing while the index is cold, which holders_of_sync
+reports as None.
+"""
+import logging
+import uuid
+from collections.abc import Iterable
+
+import redis
+import redis.asyncio as aioredis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.holding import Holding
+from app.services.price_service import PRICEABLE_CLASSES, to_yfinance_ticker
+
+logger = logging.getLogger(__name__)
+
+_USERS_KEY = "holder_index:users"
+_RECONCILED_KEY = "holder_index:reconciled"
+_ANY = "*"
+
+# KEYS[1] = holder_tickers:{user_id}, KEYS[2] = holder_index:users;
+# ARGV[1] = user id, ARGV[2] = how many indexed tickers are expected ("*": any),
+# ARGV[3..] = those expected tickers, then the user's tickers (none: drop the user).
+# The expected tickers are compared as a set, never by their order.
+# Returns the number of tickers indexed, or -1 if the expectation didn't hold.
+_REINDEX_LUA = """
+local first = 3
+if ARGV[2] ~= '*' then
+    local n = tonumber(ARGV[2])
+    if redis.call('SCARD', KEYS[1]) ~= n then
+        return -1
+    end
+    for i = 3, n + 2 do
+        if redis.call('SISMEMBER', KEYS[1], ARGV[i]) == 0 then
+            return -1
+        end
+    end
+    first = n + 3
+end
+for _, t in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    redis.call('SREM', 'ticker_holders:' .. t, ARGV[1])
+end
+redis.call('DEL', KEYS[1])
+for i = first, #ARGV do
+    redis.call('SADD', 'ticker_holders:' .. ARGV[i], ARGV[1])
+    redis.call('SADD', KEYS[1], ARGV[i])
+end
+if #ARGV >= first then
+    redis.call('SADD', KEYS[2], ARGV[1])
+else
+    redis.call('SREM', KEYS[2], ARGV[1])
+end
+return #ARGV - first + 1
+"""
+
+
+def ticker_holders_key(yf_ticker: str) -> str:
+    return f"ticker_holders:{yf_ticker}"
+
+
+def holder_tickers_key(user_id: uuid.UUID | str) -> str:
+    return f"holder_tickers:{user_id}"
+
+
+def holding_tickers(holdings) -> set[str]:
+    """Yahoo tickers of the priceable holdings (objects with symbol, asset_class_code, exchange)."""
+    tickers = set()
+    for h in holdings:
+        if h.asset_class_code in PRICEABLE_CLASSES:
+            yf_ticker = to_yfinance_ticker(h.symbol, h.asset_class_code, h.exchange)
+            if yf_ticker:
+                tickers.add(yf_ticker)
+    return tickers
+
+
+def _reindex_args(user_id, tickers: Iterable[str], expected: Iterable[str] | None = None) -> dict:
+    if expected is None:
+        expectation = [_ANY]
+    else:
+        expected = sorted(expected)
+        expectation = [str(len(expected)), *expected]
+    return {
+        "keys": [holder_tickers_key(user_id), _USERS_KEY],
+        "args": [str(user_id), *expectation, *sorted(tickers)],
+    }
+
+
+async def index_user_holdings(db: AsyncSession, redis: aioredis.Redis, user_id: uuid.UUID) -> None:
+    """Re-index a user from their active holdings. Call only after the holdings change is committed."""
+    result = await db.execute(
+        select(Holding.symbol, Holding.asset_class_code, Holding.exchange)
+        .where(Holding.user_id == user_id, Holding.is_active == True)
+    )
+    tickers = holding_tickers(result.all())
+    try:
+        await redis.register_script(_REINDEX_LUA)(**_reindex_args(user_id, tickers))
+    except aioredis.RedisError as e:
+        logger.warning(f"Failed to index holdings of {user_id}: {e}")
+
+
+def reconcile_due_sync(r, interval_seconds: int) -> bool:
+    """Whether to reconcile now: the index is cold, or the last reconciliation is over interval_seconds old."""
+    if not r.exists(_USERS_KEY):
+        r.set(_RECONCILED_KEY, 1, ex=interval_seconds)
+        return True
+    return bool(r.set(_RECONCILED_KEY, 1, nx=True, ex=interval_seconds))
+
+
+def stale_holders_sync(r, user_tickers: dict[str, set[str]]) -> dict[str, set[str]]:
+    """user id -> indexed tickers of every user whose index entry differs from user_tickers.
+
+    Indexed users missing from user_tickers (they hold nothing priced) are stale too.
+    """
+    user_ids = sorted(set(user_tickers) | r.smembers(_USERS_KEY))
+    pipe = r.pipeline(transaction=False)
+    for user_id in user_ids:
+        pipe.smembers(holder_tickers_key(user_id))
+    return {
+        user_id: indexed
+        for user_id, indexed in zip(user_ids, pipe.execute())
+        if indexed != user_tickers.get(user_id, set())
+    }
+
+
+def reindex_holders_sync(r, user_tickers: dict[str, set[str]], expected: dict[str, set[str]]) -> int:
+    """Re-index each user (no tickers: drop them) whose entry still holds expected[user].
+
+    Returns the number of users re-indexed; the others changed since they were
+    read and were left to whoever changed them.
+    """
+    script = r.register_script(_REINDEX_LUA)
+    pipe = r.pipeline(transaction=False)
+    for user_id, tickers in user_tickers.items():
+        script(**_reindex_args(user_id, tickers, expected[user_id]), client=pipe)
+    return sum(1 for n in pipe.execute() if n >= 0)
+
+
+def add_holder_sync(r, user_id: str, yf_ticker: str) -> None:
+    """Index one newly priced holding of a user."""
+    pipe = r.pipeline()
+    pipe.sadd(ticker_holders_key(yf_ticker), user_id)
+    pipe.sadd(holder_tickers_key(user_id), yf_ticker)
+    pipe.sadd(_USERS_KEY, user_id)
+    pipe.execute()
+
+
+def holders_of_sync(r, tickers: list[str]) -> set[str] | None:
+    """Ids of users holding any of tickers; None when the index is empty or unavailable."""
+    try:
+        if not r.exists(_USERS_KEY):
+            return None
+        return r.sunion([ticker_holders_key(t) for t in tickers]) if tickers else set()
+    except redis.RedisError as e:
+        logger.warning(f"Holder index unavailable: {e}")
+        return None
@@ -0,0 +1,231 @@
+"""Shared outbound HTTP layer for market-data providers (Yahoo, mfapi.in).
+
+- One process-wide keep-alive connection pool for synchronous calls (get());
+  the async FetchEngine uses the same retry policy and counters.
+- Retries on 429/5xx and transport errors (connection failures, timeouts) with exponential backoff and full
+  jitter, honouring Retry-After when the provider sends one.
+- Per-provider timeouts.
+- Counters per provider: requests, retries, connections opened / reused.
+  Workers add theirs to a daily Redis hash after each task (publish_stats) so
+  the API process can report the fleet's traffic (published_stats).
+"""
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+from app.config import settings
+from app.services.rate_limiter import ProviderGuard
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+PROVIDER_TIMEOUTS = {
+    "yahoo": settings.YAHOO_TIMEOUT_SECONDS,
+    "mfapi": settings.MFAPI_TIMEOUT_SECONDS,
+}
+
+
+def provider_timeout(provider: str) -> float:
+    """Request timeout in seconds for a provider (falls back to the fetch default)."""
+    return PROVIDER_TIMEOUTS.get(provider, settings.PRICE_FETCH_TIMEOUT_SECONDS)
+
+
+def backoff_delay(attempt: int, retry_after: float | None = None) -> float:
+    """Seconds to wait before retry number `attempt` (0-based).
+
+    Full jitter over an exponentially growing cap; a Retry-After hint from the
+    provider is used instead when present. Both are capped at HTTP_BACKOFF_MAX_SECONDS.
+    """
+    if retry_after is not None:
+        return min(retry_after, settings.HTTP_BACKOFF_MAX_SECONDS)
+    cap = min(settings.HTTP_BACKOFF_MAX_SECONDS, settings.HTTP_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+def retry_after_seconds(resp: httpx.Response | None) -> float | None:
+    """Parse a numeric Retry-After header, if any."""
+    if resp is None:
+        return None
+    value = resp.headers.get("Retry-After")
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+class HttpStats:
+    """Thread-safe per-provider counters."""
+
+    METRICS = ("requests", "retries", "connections_opened", "connections_reused")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: dict[str, Counter] = defaultdict(Counter)
+
+    def incr(self, provider: str, metric: str, n: int = 1) -> None:
+        with self._lock:
+            self._counts[provider][metric] += n
+
+    def record_request(self, provider: str, opened: int) -> None:
+        """Count one completed request; `opened` is the number of new connections it made."""
+        with self._lock:
+            counts = self._counts[provider]
+            counts["requests"] += 1
+            counts["connections_opened"] += opened
+            if not opened:
+                counts["connections_reused"] += 1
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {
+                provider: {m: counts.get(m, 0) for m in self.METRICS}
+                for provider, counts in self._counts.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+    def drain(self) -> dict[str, dict[str, int]]:
+        """snapshot() and reset() in one step."""
+        with self._lock:
+            counts = {
+                provider: {m: counts.get(m, 0) for m in self.METRICS}
+                for provider, counts in self._counts.items()
+            }
+            self._counts.clear()
+            return counts
+
+
+stats = HttpStats()
+
+
+def stats_key() -> str:
+    """Redis hash of today's (UTC) published counters, fields "provider:metric"."""
+    return f"http_stats:{datetime.now(timezone.utc):%Y%m%d}"
+
+
+def publish_stats(r) -> None:
+    """Move this process's counters into today's shared totals (sync Redis client)."""
+    counts = stats.drain()
+    fields = {f"{p}:{m}": n for p, metrics in counts.items() for m, n in metrics.items() if n}
+    if not fields:
+        return
+    key = stats_key()
+    pipe = r.pipeline()
+    for field, n in fields.items():
+        pipe.hincrby(key, field, n)
+    pipe.expire(key, 2 * 86400)
+    pipe.execute()
+
+
+def published_stats(raw: dict[str, str]) -> dict[str, dict[str, int]]:
+    """Today's published totals (the stats_key() hash) shaped like HttpStats.snapshot()."""
+    totals: dict[str, dict[str, int]] = {}
+    for field, n in raw.items():
+        provider, _, metric = field.rpartition(":")
+        if metric in HttpStats.METRICS:
+            totals.setdefault(provider, dict.fromkeys(HttpStats.METRICS, 0))[metric] = int(n)
+    return totals
+
+
+_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> httpx.Client:
+    """Process-wide pooled client for synchronous provider calls."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=settings.PRICE_FETCH_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.PRICE_FETCH_MAX_CONNECTIONS,
+                    ),
+                    follow_redirects=True,
+                )
+    return _client
+
+
+_CONNECT_EVENT = "connection.connect_tcp.started"
+
+
+def _sync_trace(opened: list):
+    def trace(event_name: str, info: dict) -> None:
+        if event_name == _CONNECT_EVENT:
+            opened.append(1)
+    return trace
+
+
+def async_trace(opened: list):
+    """httpcore trace hook for AsyncClient requests; appends to `opened` on each new TCP connect."""
+    async def trace(event_name: str, info: dict) -> None:
+        if event_name == _CONNECT_EVENT:
+            opened.append(1)
+    return trace
+
+
+def get(
+    provider: str,
+    url: str,
+    params: dict | None = None,
+    headers: dict | None = None,
+    max_retries: int | None = None,
+    guard: ProviderGuard | None = None,
+) -> httpx.Response:
+    """GET through the shared pool with retry/backoff on 429/5xx and transport errors.
+
+    With a guard, each attempt waits for a rate-limit token and outcomes feed the
+    provider's circuit breaker; CircuitOpenError / BudgetExceededError propagate.
+    Returns the final response (which may still be a 429/5xx once retries are
+    exhausted). Raises httpx.HTTPError if the last attempt failed at the network level.
+    """
+    client = get_client()
+    retries = settings.HTTP_MAX_RETRIES if max_retries is None else max_retries
+
+    attempt = 0
+    while True:
+        if guard is not None:
+            while (wait := guard.acquire(provider)) > 0:
+                time.sleep(wait)
+
+        opened: list = []
+        try:
+            resp = client.get(
+                url,
+                params=params,
+                headers=headers,
+                timeout=provider_timeout(provider),
+                extensions={"trace": _sync_trace(opened)},
+            )
+        except httpx.TransportError as e:
+            # Timeouts included: a hanging provider must trip its circuit too
+            if guard is not None:
+                guard.record_failure(provider)
+            if attempt >= retries:
+                raise
+            logger.info(f"{provider} {type(e).__name__} ({e}), retry {attempt + 1}/{retries}")
+            stats.incr(provider, "retries")
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+            continue
+
+        stats.record_request(provider, len(opened))
+        throttled = resp.status_code in RETRY_STATUSES
+        if guard is not None:
+            (guard.record_failure if throttled else guard.record_success)(provider)
+        if not throttled or attempt >= retries:
+            return resp
+
+        logger.info(f"{provider} returned {resp.status_code}, retry {attempt + 1}/{retries}")
+        stats.incr(provider, "retries")
+        time.sleep(backoff_delay(attempt, retry_after_seconds(resp)))
+        attempt += 1
@@ -0,0 +1,182 @@
+"""Exchange calendars: trading days, holidays, short sessions and a session timeline.
+
+Each market group used by the price tasks maps to an exchange calendar:
+  INDIA     NSE cash market, 09:15 - 15:30 IST
+  US        NYSE, 09:30 - 16:00 ET
+  MF_DAILY  NSE trading days; the "close" is when AMCs have published the day's NAV
+  ALWAYS    24/7 markets (crypto); sessions are UTC days
+
+Holiday tables follow the exchanges' published lists and must be extended each
+year; dates outside the tables fall back to weekday-only rules, with a warning
+logged the first time a year without holidays is used. Sessions are
+precomputed per (group, year) and looked up with bisect.
+"""
+import bisect
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+MARKETS = {
+    "INDIA": {"tz": "Asia/Kolkata", "open": time(9, 15), "close": time(15, 30), "calendar": "NSE"},
+    "US": {"tz": "America/New_York", "open": time(9, 30), "close": time(16, 0), "calendar": "NYSE"},
+    "MF_DAILY": {"tz": "Asia/Kolkata", "open": time(9, 15), "close": time(21, 0), "calendar": "NSE"},
+}
+
+# Full-day trading holidays falling on weekdays
+HOLIDAYS = {
+    "NSE": frozenset({
+        # 2025
+        date(2025, 2, 26), date(2025, 3, 14), date(2025, 3, 31), date(2025, 4, 10),
+        date(2025, 4, 14), date(2025, 4, 18), date(2025, 5, 1), date(2025, 8, 15),
+        date(2025, 8, 27), date(2025, 10, 2), date(2025, 10, 21), date(2025, 10, 22),
+        date(2025, 11, 5), date(2025, 12, 25),
+        # 2026
+        date(2026, 1, 15), date(2026, 1, 26), date(2026, 3, 3), date(2026, 3, 26),
+        date(2026, 3, 31), date(2026, 4, 3), date(2026, 4, 14), date(2026, 5, 1),
+        date(2026, 5, 28), date(2026, 6, 26), date(2026, 9, 14), date(2026, 10, 2),
+        date(2026, 10, 20), date(2026, 11, 10), date(2026, 11, 24), date(2026, 12, 25),
+    }),
+    "NYSE": frozenset({
+        # 2025
+        date(2025, 1, 1), date(2025, 1, 9), date(2025, 1, 20), date(2025, 2, 17),
+        date(2025, 4, 18), date(2025, 5, 26), date(2025, 6, 19), date(2025, 7, 4),
+        date(2025, 9, 1), date(2025, 11, 27), date(2025, 12, 25),
+        # 2026
+        date(2026, 1, 1), date(2026, 1, 19), date(2026, 2, 16), date(2026, 4, 3),
+        date(2026, 5, 25), date(2026, 6, 19), date(2026, 7, 3), date(2026, 9, 7),
+        date(2026, 11, 26), date(2026, 12, 25),
+        # 2027
+        date(2027, 1, 1), date(2027, 1, 18), date(2027, 2, 15), date(2027, 3, 26),
+        date(2027, 5, 31), date(2027, 6, 18), date(2027, 7, 5), date(2027, 9, 6),
+        date(2027, 11, 25), date(2027, 12, 24),
+    }),
+}
+
+# Sessions with non-standard hours: {date: (open, close)} in exchange-local time.
+# MF_DAILY has none: NAVs are only published on regular business days.
+SHORT_SESSIONS = {
+    "INDIA": {
+        date(2025, 10, 21): (time(13, 45), time(14, 45)),  # Diwali Muhurat trading
+    },
+    "US": {
+        date(2025, 7, 3): (time(9, 30), time(13, 0)),
+        date(2025, 11, 28): (time(9, 30), time(13, 0)),
+        date(2025, 12, 24): (time(9, 30), time(13, 0)),
+        date(2026, 11, 27): (time(9, 30), time(13, 0)),
+        date(2026, 12, 24): (time(9, 30), time(13, 0)),
+        date(2027, 11, 26): (time(9, 30), time(13, 0)),
+    },
+}
+
+# Fetch window around each session: pre-open quotes and post-close settlement
+SESSION_BUFFER = timedelta(hours=1)
+# fetch_mf_nav runs this long after the MF_DAILY close (NAV publication)
+NAV_FETCH_DELAY = timedelta(hours=2, minutes=30)
+
+_UTC = timezone.utc
+
+
+def _utc_now() -> datetime:
+    return datetime.now(_UTC)
+
+
+def is_trading_day(group: str, d: date) -> bool:
+    """Whether a market group has a session on local date d."""
+    if group not in MARKETS:
+        return True
+    if d in SHORT_SESSIONS.get(group, {}):
+        return True
+    return d.weekday() < 5 and d not in HOLIDAYS[MARKETS[group]["calendar"]]
+
+
+def session_on(group: str, d: date) -> tuple[datetime, datetime] | None:
+    """(open, close) in UTC of a group's session on local date d, or None on a closed day."""
+    if group not in MARKETS:
+        start = datetime.combine(d, time(0, 0), _UTC)
+        return start, start + timedelta(days=1)
+    if not is_trading_day(group, d):
+        return None
+
+    market = MARKETS[group]
+    tz = ZoneInfo(market["tz"])
+    opens, closes = SHORT_SESSIONS.get(group, {}).get(d, (market["open"], market["close"]))
+    return (
+        datetime.combine(d, opens, tz).astimezone(_UTC),
+        datetime.combine(d, closes, tz).astimezone(_UTC),
+    )
+
+
+@lru_cache(maxsize=64)
+def _timeline(group: str, year: int) -> tuple[tuple[date, datetime, datetime], ...]:
+    """Every (local date, open, close) of a group's sessions in one calendar year, sorted."""
+    calendar = MARKETS.get(group, {}).get("calendar")
+    if calendar and not any(h.year == year for h in HOLIDAYS[calendar]):
+        logger.warning(f"No {calendar} holidays listed for {year}: {group} sessions assume every weekday trades")
+
+    sessions = []
+    d = date(year, 1, 1)
+    while d.year == year:
+        s = session_on(group, d)
+        if s is not None:
+            sessions.append((d, *s))
+        d += timedelta(days=1)
+    return tuple(sessions)
+
+
+@lru_cache(maxsize=64)
+def _sessions_around(group: str, year: int) -> tuple[tuple, list[datetime], list[datetime]]:
+    """Sessions from the previous year through the next, with their opens and closes for bisect."""
+    sessions = tuple(s for y in (year - 1, year, year + 1) for s in _timeline(group, y))
+    return sessions, [s[1] for s in sessions], [s[2] for s in sessions]
+
+
+def is_open(
+    group: str,
+    now: datetime | None = None,
+    pre: timedelta = timedelta(0),
+    post: timedelta = timedelta(0),
+) -> bool:
+    """Whether now falls inside a session, widened by pre/post buffers."""
+    now = now or _utc_now()
+    sessions, opens, _ = _sessions_around(group, now.astimezone(_UTC).year)
+    i = bisect.bisect_right(opens, now + pre)
+    return i > 0 and now <= sessions[i - 1][2] + post
+
+
+def next_open(group: str, now: datetime | None = None) -> datetime:
+    """Start of the first session opening after now (UTC)."""
+    now = now or _utc_now()
+    sessions, opens, _ = _sessions_around(group, now.astimezone(_UTC).year)
+    i = bisect.bisect_right(opens, now)
+    if i < len(sessions):
+        return opens[i]
+    raise ValueError(f"No {group} session within a year of {now}")
+
+
+def last_close(group: str, now: datetime | None = None) -> tuple[date, datetime] | None:
+    """(local date, close) of the most recent session that has closed at or before now."""
+    now = now or _utc_now()
+    sessions, _, closes = _sessions_around(group, now.astimezone(_UTC).year)
+    i = bisect.bisect_right(closes, now)
+    if i == 0:
+        return None
+    return sessions[i - 1][0], closes[i - 1]
+
+
+def next_close(group: str, now: datetime | None = None) -> datetime:
+    """Close of the first session closing after now (UTC)."""
+    now = now or _utc_now()
+    sessions, _, closes = _sessions_around(group, now.astimezone(_UTC).year)
+    i = bisect.bisect_right(closes, now)
+    if i < len(sessions):
+        return closes[i]
+    raise ValueError(f"No {group} session within a year of {now}")
+
+
+def last_completed_session(group: str, now: datetime | None = None) -> date:
+    """Local date of the most recent session whose daily bar is final."""
+    now = now or _utc_now()
+    return last_close(group, now)[0]
@@ -5,13 +5,16 @@ Resolution chain:
 
 Caching: Resolved tickers are cached in Redis for 7 days.
 """
+import asyncio
 import json
 import logging
 import re
 
-import requests
 import redis.asyncio as aioredis
 
+from app.services import http_client
+from app.services.rate_limiter import get_guard
+
 logger = logging.getLogger(__name__)
 
 _MFAPI_SEARCH_URL = "https://api.mfapi.in/mf/search"
@@ -31,10 +34,11 @@ def _normalize_name(name: str) -> str:
 def _search_mfapi(fund_name: str) -> dict | None:
     """Search mfapi.in for a fund by name. Returns best match {schemeCode, schemeName}."""
     try:
-        resp = requests.get(
+        resp = http_client.get(
+            "mfapi",
             _MFAPI_SEARCH_URL,
             params={"q": fund_name},
-            timeout=10,
+            guard=get_guard(),
         )
         if resp.status_code != 200:
             logger.warning(f"mfapi search returned {resp.status_code} for '{fund_name}'")
@@ -52,9 +56,10 @@ def _search_mfapi(fund_name: str) -> dict | None:
 def _get_scheme_isin(scheme_code: int | str) -> str | None:
     """Fetch scheme details from mfapi.in and extract ISIN."""
     try:
-        resp = requests.get(
+        resp = http_client.get(
+            "mfapi",
             _MFAPI_SCHEME_URL.format(scheme_code=scheme_code),
-            timeout=10,
+            guard=get_guard(),
         )
         if resp.status_code != 200:
             return None
@@ -75,11 +80,12 @@ def _get_scheme_isin(scheme_code: int | str) -> str | None:
 def _search_yahoo_by_isin(isin: str) -> str | None:
     """Search Yahoo Finance for a ticker using an ISIN code."""
     try:
-        resp = requests.get(
+        resp = http_client.get(
+            "yahoo",
             _YF_SEARCH_URL,
             headers=_YF_HEADERS,
             params={"q": isin, "quotesCount": 5, "newsCount": 0},
-            timeout=10,
+            guard=get_guard(),
         )
         if resp.status_code != 200:
             return None
@@ -158,8 +164,8 @@ async def resolve_mf_ticker(
         except Exception:
             pass
 
-    # Resolve synchronously (API calls)
-    result = resolve_mf_ticker_sync(fund_name)
+    # Resolve in a worker thread so provider calls and retry backoff don't block the event loop
+    result = await asyncio.to_thread(resolve_mf_ticker_sync, fund_name)
 
     # Cache result (even None as empty string to avoid re-querying)
     if redis and result:
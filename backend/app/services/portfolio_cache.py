@@ -0,0 +1,189 @@
+"""Versioned Redis cache for computed portfolio views (dashboard, summary, ...).
+
+Keys:
+  holdings_version:{user_id}                       bumped after every committed holdings write,
+                                                   and when the user's daily values are updated
+  price_snapshot                                   bumped whenever the price tasks write prices
+  benchmark_series_version                         bumped when the benchmark series are rebuilt
+  portfolio:{user_id}:{view}:{holdings_version}:{price_snapshot}   cached JSON
+  (views drawing the benchmark series append :{benchmark_series_version})
+  portfolio_lock:{...}                             held by the process computing a missing view
+
+A view is only ever stored under the versions it was computed from, so a hit is
+always consistent with the holdings and prices it was built on; the TTL only
+garbage-collects superseded entries. A hit costs one round trip (a Lua script
+reads both versions and the view). Concurrent misses for the same key are
+coalesced: in-process through a shared task, across processes through a short
+Redis lock that the other processes wait on. The shared task outlives the
+request that started it, so compute is handed a database session of its own
+rather than closing over a request's.
+
+view_etag derives a view's ETag from the same versions with one MGET, so
+a conditional request for an unchanged view is answered without computing it.
+
+Redis errors fail open: the view is computed without caching.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from collections.abc import Awaitable, Callable
+
+import redis.asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.celery_app import celery
+from app.database import async_session
+from app.services.holder_index import index_user_holdings
+from app.services.position_service import record_position_events, transaction_event
+
+logger = logging.getLogger(__name__)
+
+PRICE_SNAPSHOT_KEY = "price_snapshot"
+BENCHMARK_VERSION_KEY = "benchmark_series_version"
+VIEW_TTL = 24 * 60 * 60
+_LOCK_TTL_MS = 10_000
+_LOCK_POLL_SECONDS = 0.05
+_LOCK_WAIT_SECONDS = 5.0
+
+# KEYS = the view's version keys; returns [view key, cached JSON or nil]
+_LOOKUP_LUA = """
+local key = ARGV[1]
+for _, version_key in ipairs(KEYS) do
+    key = key .. ':' .. (redis.call('GET', version_key) or '0')
+end
+return {key, redis.call('GET', key)}
+"""
+
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def holdings_version_key(user_id: uuid.UUID | str) -> str:
+    return f"holdings_version:{user_id}"
+
+
+def _version_keys(user_id: uuid.UUID | str, benchmarks: bool) -> list[str]:
+    keys = [holdings_version_key(user_id), PRICE_SNAPSHOT_KEY]
+    return keys + [BENCHMARK_VERSION_KEY] if benchmarks else keys
+
+
+def view_key(user_id: uuid.UUID | str, view: str, holdings_version, price_snapshot) -> str:
+    """Cache key of a view computed at the given versions (the key the lookup script builds)."""
+    return f"portfolio:{user_id}:{view}:{holdings_version}:{price_snapshot}"
+
+
+async def view_etag(redis: aioredis.Redis, user_id: uuid.UUID, view: str, benchmarks: bool = False) -> str | None:
+    """Weak ETag of the user's view at the current versions; None when Redis is unavailable.
+
+    The user id is part of the digest so two users with equal versions never
+    share an ETag in one browser cache.
+    """
+    try:
+        versions = await redis.mget(*_version_keys(user_id, benchmarks))
+    except aioredis.RedisError as e:
+        logger.warning(f"Portfolio cache unavailable: {e}")
+        return None
+    digest = hashlib.sha1(f"{user_id}:{view}".encode()).hexdigest()[:12]
+    return f'W/"{".".join(str(v or 0) for v in versions)}.{digest}"'
+
+
+async def bump_holdings_version(redis: aioredis.Redis, user_id: uuid.UUID) -> None:
+    """Invalidate a user's cached views. Call only after the holdings change is committed."""
+    try:
+        await redis.incr(holdings_version_key(user_id))
+    except aioredis.RedisError as e:
+        logger.warning(f"Failed to bump holdings version for {user_id}: {e}")
+
+
+async def commit_holdings_change(db, redis: aioredis.Redis, user_id: uuid.UUID, transactions=()) -> None:
+    """Commit the request's holdings writes, then invalidate the user's cached views.
+
+    Bumping after the commit guarantees no request can cache a view of the old
+    holdings under the new version. New transactions are appended to the user's
+    cached position events, the user is re-indexed under the tickers they now
+    hold, and the materialized daily values are queued for a rebuild under the
+    new version.
+    """
+    await db.flush()
+    events = [e for e in map(transaction_event, transactions) if e is not None]
+    await db.commit()
+    await bump_holdings_version(redis, user_id)
+    await record_position_events(redis, user_id, events)
+    await index_user_holdings(db, redis, user_id)
+    try:
+        celery.send_task("rebuild_portfolio_values", args=[str(user_id)])
+        celery.send_task("update_risk_metrics", args=[str(user_id)])
+    except Exception as e:
+        # Stale daily values are ignored by readers until the next rebuild
+        logger.warning(f"Failed to queue portfolio rebuilds for {user_id}: {e}")
+
+
+async def cached_view(
+    redis: aioredis.Redis,
+    user_id: uuid.UUID,
+    view: str,
+    compute: Callable[[AsyncSession], Awaitable],
+    benchmarks: bool = False,
+):
+    """Return the cached view for the user's current versions, computing it on a miss.
+
+    compute(db) builds the view; db is a session opened for it (see _compute).
+    benchmarks: the view draws the benchmark series, so their version keys it too.
+    """
+    try:
+        key, raw = await redis.register_script(_LOOKUP_LUA)(
+            keys=_version_keys(user_id, benchmarks),
+            args=[f"portfolio:{user_id}:{view}"],
+        )
+    except aioredis.RedisError as e:
+        logger.warning(f"Portfolio cache unavailable: {e}")
+        return await _compute(compute)
+    if raw is not None:
+        return json.loads(raw)
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fill(redis, key, compute))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def _compute(compute: Callable[[AsyncSession], Awaitable]):
+    """Run compute on a session of its own, open only for as long as it runs."""
+    async with async_session() as db:
+        return await compute(db)
+
+
+async def _fill(redis: aioredis.Redis, key: str, compute: Callable[[AsyncSession], Awaitable]):
+    """Compute and store one view, or wait for another process that is already computing it."""
+    lock_key = key.replace("portfolio:", "portfolio_lock:", 1)
+    try:
+        locked = await redis.set(lock_key, "1", nx=True, px=_LOCK_TTL_MS)
+        if not locked:
+            waited = 0.0
+            while waited < _LOCK_WAIT_SECONDS:
+                await asyncio.sleep(_LOCK_POLL_SECONDS)
+                waited += _LOCK_POLL_SECONDS
+                raw = await redis.get(key)
+                if raw is not None:
+                    return json.loads(raw)
+    except aioredis.RedisError as e:
+        logger.warning(f"Portfolio cache lock failed for {key}: {e}")
+        locked = False
+
+    try:
+        value = await _compute(compute)
+        try:
+            await redis.set(key, json.dumps(value, default=str), ex=VIEW_TTL)
+        except aioredis.RedisError as e:
+            logger.warning(f"Failed to store portfolio view {key}: {e}")
+        return value
+    finally:
+        # Released even when compute raises, so other processes don't wait out the lock
+        if locked:
+            try:
+                await redis.delete(lock_key)
+            except aioredis.RedisError as e:
+                logger.warning(f"Failed to release portfolio cache lock {lock_key}: {e}")
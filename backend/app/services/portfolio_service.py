@@ -1,13 +1,25 @@
 """Portfolio aggregation and analytics service."""
 import uuid
 from datetime import datetime, timedelta, date
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 import redis.asyncio as aioredis
 from app.models.holding import Holding
 from app.models.transaction import Transaction
 from app.models.price_history import PriceHistory
-from app.services.price_service import resolve_price, to_yfinance_ticker, PRICEABLE_CLASSES
+from app.models.portfolio_daily_value import PortfolioDailyValue, TOTAL_CATEGORY
+from app.services.benchmark_service import (
+    BENCHMARKS,
+    DEFAULT_BENCHMARKS,
+    BenchmarkSeries,
+    benchmark_index,
+    load_benchmark_series,
+    rescale,
+)
+from app.services.portfolio_cache import holdings_version_key
+from app.services.position_service import PositionEvent, load_position_events, position_matrix
+from app.services.price_service import resolve_prices_bulk, to_yfinance_ticker, PRICEABLE_CLASSES
 
 # Color palette for allocation chart
 CATEGORY_COLORS = {
@@ -38,6 +50,10 @@ ASSET_CLASS_NAMES = {
     "OTHER": "Other",
 }
 
+# Shortest performance range, and the longest one a caller can ask for by days
+MIN_PERFORMANCE_DAYS = 7
+MAX_PERFORMANCE_DAYS = 3650
+
 ASSET_CLASS_CATEGORIES = {
     "EQUITY_IN": "Equity", "EQUITY_US": "Equity",
     "MUTUAL_FUND": "Funds", "CRYPTO": "Crypto",
@@ -48,23 +64,31 @@ ASSET_CLASS_CATEGORIES = {
 }
 
 
-async def get_portfolio_summary(db: AsyncSession, user_id: uuid.UUID, redis: aioredis.Redis | None = None) -> dict:
-    """Calculate net worth, total invested, and returns using live market prices."""
+async def _load_holdings(db: AsyncSession, user_id: uuid.UUID) -> list[Holding]:
     result = await db.execute(
         select(Holding).where(Holding.user_id == user_id, Holding.is_active == True)
     )
-    holdings = result.scalars().all()
+    return list(result.scalars().all())
+
 
+async def _value_holdings(
+    db: AsyncSession, redis: aioredis.Redis | None, holdings: list[Holding],
+) -> list[tuple[Holding, dict | None]]:
+    """Pair each holding with its resolved price (None without Redis: value at cost basis)."""
+    prices = await resolve_prices_bulk(db, redis, holdings) if redis else [None] * len(holdings)
+    return list(zip(holdings, prices))
+
+
+def _summarize(valued: list[tuple[Holding, dict | None]]) -> dict:
     total_invested = 0.0
     current_value = 0.0
     day_change = 0.0
 
-    for h in holdings:
+    for h, price_info in valued:
         invested = h.quantity * h.avg_buy_price
         total_invested += invested
 
-        if redis:
-            price_info = await resolve_price(db, redis, h.symbol, h.asset_class_code, h.exchange, h.avg_buy_price)
+        if price_info:
             market_value = h.quantity * price_info["price"]
             current_value += market_value
 
@@ -75,6 +99,11 @@ async def get_portfolio_summary(db: AsyncSession, user_id: uuid.UUID, redis: aio
         else:
             current_value += invested
 
+    return summary_totals(total_invested, current_value, day_change)
+
+
+def summary_totals(total_invested: float, current_value: float, day_change: float) -> dict:
+    """Portfolio summary from its invested amount, market value and day change."""
     total_gain_loss = current_value - total_invested
     total_gain_loss_pct = (total_gain_loss / total_invested * 100) if total_invested > 0 else 0
     day_change_pct = (day_change / (current_value - day_change) * 100) if current_value - day_change > 0 else 0
@@ -89,23 +118,20 @@ async def get_portfolio_summary(db: AsyncSession, user_id: uuid.UUID, redis: aio
     }
 
 
-async def get_allocation(db: AsyncSession, user_id: uuid.UUID, redis: aioredis.Redis | None = None) -> list[dict]:
-    """Asset allocation breakdown using current market values."""
-    result = await db.execute(
-        select(Holding).where(Holding.user_id == user_id, Holding.is_active == True)
-    )
-    holdings = result.scalars().all()
-
+def _allocate(valued: list[tuple[Holding, dict | None]]) -> list[dict]:
     totals: dict[str, float] = {}
-    for h in holdings:
+    for h, price_info in valued:
         code = h.asset_class_code
-        if redis:
-            price_info = await resolve_price(db, redis, h.symbol, h.asset_class_code, h.exchange, h.avg_buy_price)
+        if price_info:
             value = h.quantity * price_info["price"]
         else:
             value = h.quantity * h.avg_buy_price
         totals[code] = totals.get(code, 0) + value
+    return allocation_rows(totals)
 
+
+def allocation_rows(totals: dict[str, float]) -> list[dict]:
+    """Allocation entries, largest first, from each asset class's total value."""
     grand_total = sum(totals.values())
     allocation = []
     for code, value in sorted(totals.items(), key=lambda x: -x[1]):
@@ -121,207 +147,435 @@ async def get_allocation(db: AsyncSession, user_id: uuid.UUID, redis: aioredis.R
     return allocation
 
 
-async def get_performance(db: AsyncSession, user_id: uuid.UUID, days: int = 30, redis: aioredis.Redis | None = None) -> dict:
+def _rank_holdings(valued: list[tuple[Holding, dict | None]]) -> list[dict]:
+    """Every holding with its market value and returns, largest first."""
+    ranked = []
+    for h, price_info in valued:
+        invested = h.quantity * h.avg_buy_price
+        if price_info:
+            current_value = h.quantity * price_info["price"]
+            gain_loss = current_value - invested
+            gain_loss_pct = (gain_loss / invested * 100) if invested > 0 else 0
+            day_change_pct = price_info.get("day_change_pct", 0)
+        else:
+            current_value = invested
+            gain_loss = 0
+            gain_loss_pct = 0
+            day_change_pct = 0
+
+        ranked.append({
+            "id": str(h.id),
+            "name": h.name,
+            "symbol": h.symbol,
+            "asset_class_code": h.asset_class_code,
+            "quantity": h.quantity,
+            "avg_buy_price": h.avg_buy_price,
+            "buy_currency": h.buy_currency,
+            "value": round(current_value, 2),
+            "current_value": round(current_value, 2),
+            "gain_loss": round(gain_loss, 2),
+            "gain_loss_pct": round(gain_loss_pct, 2),
+            "day_change_pct": round(day_change_pct, 2),
+            "is_active": h.is_active,
+        })
+
+    ranked.sort(key=lambda x: -x["value"])
+    return ranked
+
+
+async def get_portfolio_summary(db: AsyncSession, user_id: uuid.UUID, redis: aioredis.Redis | None = None) -> dict:
+    """Calculate net worth, total invested, and returns using live market prices."""
+    holdings = await _load_holdings(db, user_id)
+    return _summarize(await _value_holdings(db, redis, holdings))
+
+
+async def get_allocation(db: AsyncSession, user_id: uuid.UUID, redis: aioredis.Redis | None = None) -> list[dict]:
+    """Asset allocation breakdown using current market values."""
+    holdings = await _load_holdings(db, user_id)
+    return _allocate(await _value_holdings(db, redis, holdings))
+
+
+async def get_performance(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    days: int | None = 30,
+    redis: aioredis.Redis | None = None,
+    benchmarks: list[str] | None = None,
+    interval: str = "day",
+    points: int | None = None,
+) -> dict:
     """Build performance time-series from price_history data with cost-basis fallback.
 
+    Reads the materialized portfolio_daily_values when they are current for the
+    user's holdings, otherwise computes from price_history. days=None reaches back
+    to the user's first transaction or holding. benchmarks are registry tickers
+    (see benchmark_service), DEFAULT_BENCHMARKS when None. interval and points
+    downsample every series alike (see sample_indices).
+
     Returns {portfolio: [...], by_category: {category: [...]}, benchmarks: {index: [...]}}.
     """
-    result = await db.execute(
-        select(Holding).where(Holding.user_id == user_id, Holding.is_active == True)
+    holdings = await _load_holdings(db, user_id)
+    if days is None:
+        days = await _inception_days(db, user_id, holdings)
+    return await _build_performance(
+        db, holdings, days, user_id=user_id, redis=redis, benchmarks=benchmarks, interval=interval, points=points,
     )
-    holdings = result.scalars().all()
 
+
+async def _inception_days(db: AsyncSession, user_id: uuid.UUID, holdings: list[Holding]) -> int:
+    """Days since the user's first dated transaction or first holding (at least MIN_PERFORMANCE_DAYS)."""
+    result = await db.execute(
+        select(func.min(Transaction.transaction_date))
+        .where(Transaction.user_id == user_id, Transaction.broker.is_distinct_from("merge"))
+    )
+    first_dates = [h.created_at.date() for h in holdings if h.created_at]
+    if (first_transaction := result.scalar()) is not None:
+        first_dates.append(first_transaction)
+    if not first_dates:
+        return MIN_PERFORMANCE_DAYS
+    return max((date.today() - min(first_dates)).days, MIN_PERFORMANCE_DAYS)
+
+
+async def _build_performance(
+    db: AsyncSession,
+    holdings: list[Holding],
+    days: int,
+    user_id: uuid.UUID | None = None,
+    redis: aioredis.Redis | None = None,
+    benchmarks: list[str] | None = None,
+    interval: str = "day",
+    points: int | None = None,
+) -> dict:
+    """Performance time-series for already-loaded holdings (see get_performance)."""
     if not holdings:
         return {"portfolio": [], "by_category": {}, "benchmarks": {}}
 
     today = date.today()
     start_date = today - timedelta(days=days)
 
-    # Build maps: ticker -> holdings, ticker -> category
-    ticker_holdings: dict[str, list] = {}  # yf_ticker -> list of (quantity, avg_buy_price)
-    ticker_category: dict[str, str] = {}   # yf_ticker -> category name
-    cost_basis_by_category: dict[str, float] = {}  # category -> cost basis total
+    materialized = None
+    if user_id is not None and redis is not None:
+        materialized = await _read_daily_values(db, redis, user_id, start_date, days)
+
+    benchmark_tickers = DEFAULT_BENCHMARKS if benchmarks is None else benchmarks
+    cached_benchmarks = None
+    if redis is not None and benchmark_tickers:
+        cached_benchmarks = await load_benchmark_series(redis, benchmark_tickers, start_date)
+    # Benchmarks are read from price_history only when the shared series aren't cached
+    history_benchmarks = benchmark_tickers if cached_benchmarks is None else []
+
+    if materialized is not None:
+        portfolio_values, category_values = materialized
+        fetch_tickers = history_benchmarks if category_values else []
+    else:
+        tickers = priced_tickers(holdings)
+        fetch_tickers = tickers + history_benchmarks if tickers else []
+
+    # Fetch price_history for held tickers + uncached benchmark indices
+    price_rows = []
+    if fetch_tickers:
+        ph_result = await db.execute(
+            select(PriceHistory.symbol, PriceHistory.date, PriceHistory.close)
+            .where(
+                PriceHistory.symbol.in_(fetch_tickers),
+                PriceHistory.date >= start_date,
+            )
+        )
+        price_rows = ph_result.all()
+
+    if materialized is None:
+        events = await load_position_events(db, redis, user_id) if user_id is not None else []
+        portfolio_values, category_values = compute_daily_values(
+            holdings, price_rows, start_date, days, events=events,
+        )
+
+    # Every series keeps the days picked on the portfolio's, so their dates line up
+    keep = sample_indices(start_date, portfolio_values, interval, points)
+    dates = [(start_date + timedelta(days=int(i))).isoformat() for i in keep]
+    return {
+        "portfolio": _series(dates, portfolio_values[keep]),
+        "by_category": {cat: _series(dates, values[keep]) for cat, values in category_values.items()},
+        # Benchmarks only accompany a priced portfolio
+        "benchmarks": _benchmark_series(
+            cached_benchmarks if cached_benchmarks is not None
+            else benchmark_index(price_rows, benchmark_tickers, start_date, days),
+            benchmark_tickers, start_date, days, dates, keep, portfolio_values[0],
+        ) if category_values else {},
+    }
+
 
-    for h in holdings:
+def _group_holdings(holdings) -> tuple[dict[str, list[int]], dict[str, str], dict[str, list[int]]]:
+    """Split holdings (by index) into priced tickers and cost-basis categories.
+
+    Returns (yf_ticker -> holding indices, yf_ticker -> category,
+    category -> indices of holdings valued at cost basis).
+    """
+    ticker_holdings: dict[str, list[int]] = {}
+    ticker_category: dict[str, str] = {}
+    cost_basis_holdings: dict[str, list[int]] = {}
+
+    for k, h in enumerate(holdings):
         category = ASSET_CLASS_CATEGORIES.get(h.asset_class_code, "Other")
         yf_ticker = to_yfinance_ticker(h.symbol, h.asset_class_code, h.exchange)
         if yf_ticker and h.asset_class_code in PRICEABLE_CLASSES:
             if yf_ticker not in ticker_holdings:
                 ticker_holdings[yf_ticker] = []
-            ticker_holdings[yf_ticker].append((h.quantity, h.avg_buy_price))
+            ticker_holdings[yf_ticker].append(k)
             ticker_category[yf_ticker] = category
         else:
-            cost_basis_by_category[category] = cost_basis_by_category.get(category, 0) + h.quantity * h.avg_buy_price
+            cost_basis_holdings.setdefault(category, []).append(k)
 
-    cost_basis_total = sum(cost_basis_by_category.values())
+    return ticker_holdings, ticker_category, cost_basis_holdings
 
-    if not ticker_holdings:
-        points = []
-        for i in range(days, -1, -1):
-            d = today - timedelta(days=i)
-            points.append({"date": d.isoformat(), "value": round(cost_basis_total, 2)})
-        return {"portfolio": points, "by_category": {}, "benchmarks": {}}
-
-    # Fetch price_history for held tickers + benchmark indices
-    benchmark_tickers = ["^NSEI", "^BSESN", "^GSPC", "GC=F", "BTC-INR"]
-    all_tickers = list(ticker_holdings.keys())
-    fetch_tickers = all_tickers + benchmark_tickers
-
-    ph_result = await db.execute(
-        select(PriceHistory)
-        .where(
-            PriceHistory.symbol.in_(fetch_tickers),
-            PriceHistory.date >= start_date,
-        )
-        .order_by(PriceHistory.date)
-    )
-    price_rows = ph_result.scalars().all()
-
-    # Build date -> ticker -> close price map
-    price_map: dict[date, dict[str, float]] = {}
-    for pr in price_rows:
-        if pr.date not in price_map:
-            price_map[pr.date] = {}
-        price_map[pr.date][pr.symbol] = pr.close
-
-    # Initialize last known prices with cost basis
-    last_known_prices: dict[str, float] = {}
-    for ticker, holding_list in ticker_holdings.items():
-        total_qty = sum(q for q, _ in holding_list)
-        weighted_avg = sum(q * p for q, p in holding_list) / total_qty if total_qty > 0 else 0
-        last_known_prices[ticker] = weighted_avg
-
-    # Track benchmark base values for normalization
-    benchmark_last: dict[str, float] = {}
-    benchmark_base: dict[str, float | None] = {t: None for t in benchmark_tickers}
-
-    # Get all unique categories
-    all_categories = set(ticker_category.values()) | set(cost_basis_by_category.keys())
 
-    points = []
-    category_points: dict[str, list] = {cat: [] for cat in all_categories}
-    benchmark_points: dict[str, list] = {t: [] for t in benchmark_tickers}
-
-    # Get portfolio base value for normalizing benchmarks
-    portfolio_base_value: float | None = None
-
-    for i in range(days, -1, -1):
-        d = today - timedelta(days=i)
-        day_prices = price_map.get(d, {})
-
-        # Update last known prices
-        for ticker in all_tickers:
-            if ticker in day_prices:
-                last_known_prices[ticker] = day_prices[ticker]
-
-        # Portfolio total
-        day_value = cost_basis_total
-        for ticker, holding_list in ticker_holdings.items():
-            price = last_known_prices.get(ticker, 0)
-            for quantity, _ in holding_list:
-                day_value += quantity * price
-
-        points.append({"date": d.isoformat(), "value": round(day_value, 2)})
-
-        if portfolio_base_value is None:
-            portfolio_base_value = day_value
-
-        # Per-category values
-        for cat in all_categories:
-            cat_value = cost_basis_by_category.get(cat, 0)
-            for ticker, holding_list in ticker_holdings.items():
-                if ticker_category.get(ticker) == cat:
-                    price = last_known_prices.get(ticker, 0)
-                    for quantity, _ in holding_list:
-                        cat_value += quantity * price
-            category_points[cat].append({"date": d.isoformat(), "value": round(cat_value, 2)})
-
-        # Benchmark indices — normalize to portfolio starting value
-        for bt in benchmark_tickers:
-            if bt in day_prices:
-                benchmark_last[bt] = day_prices[bt]
-            if bt in benchmark_last and benchmark_base[bt] is None:
-                benchmark_base[bt] = benchmark_last[bt]
-
-            if bt in benchmark_last and benchmark_base[bt] and portfolio_base_value:
-                normalized = portfolio_base_value * (benchmark_last[bt] / benchmark_base[bt])
-                benchmark_points[bt].append({"date": d.isoformat(), "value": round(normalized, 2)})
-
-    # Clean up benchmark names
-    benchmark_names = {
-        "^NSEI": "Nifty 50",
-        "^BSESN": "Sensex",
-        "^GSPC": "S&P 500",
-        "GC=F": "Gold",
-        "BTC-INR": "Bitcoin",
+def holdings_by_ticker(holdings) -> dict[str, list[int]]:
+    """Yahoo ticker -> indices of the holdings valued from its price_history."""
+    return _group_holdings(holdings)[0]
+
+
+def priced_tickers(holdings) -> list[str]:
+    """Yahoo tickers of the holdings valued from price_history."""
+    return list(holdings_by_ticker(holdings))
+
+
+def holding_daily_values(
+    holdings,
+    price_rows,
+    start_date: date,
+    days: int,
+    seeds: dict[str, float] | None = None,
+    events: list[PositionEvent] = (),
+) -> np.ndarray:
+    """(days + 1) x holdings value of each holding from start_date through start_date + days.
+
+    Each day values the quantities held on it, replayed from the position events
+    (see position_service). Priced holdings use price_history closes, given as
+    (symbol, date, close) rows and forward-filled; before its first close in the
+    window a ticker is valued at seeds[ticker] (its last earlier close) or else its
+    weighted average buy price. Other holdings stay at their buy price.
+    """
+    ticker_holdings, _, _ = _group_holdings(holdings)
+    positions = position_matrix(holdings, list(events), start_date, days)
+    prices = np.broadcast_to(np.array([float(h.avg_buy_price) for h in holdings]), positions.shape).copy()
+
+    if ticker_holdings:
+        all_tickers = list(ticker_holdings.keys())
+        seeds = seeds or {}
+
+        # Held tickers start from their last earlier close, else their weighted average buy price
+        quantities = np.array([sum(holdings[k].quantity for k in ticker_holdings[t]) for t in all_tickers])
+        cost = np.array([sum(holdings[k].quantity * holdings[k].avg_buy_price for k in ticker_holdings[t]) for t in all_tickers])
+        seed = np.divide(cost, quantities, out=np.zeros_like(cost), where=quantities > 0)
+        for j, t in enumerate(all_tickers):
+            if seeds.get(t) is not None:
+                seed[j] = seeds[t]
+        closes = _close_matrix(price_rows, all_tickers, start_date, days, seed)
+
+        for j, t in enumerate(all_tickers):
+            prices[:, ticker_holdings[t]] = closes[:, [j]]
+
+    return positions * prices
+
+
+def compute_daily_values(
+    holdings,
+    price_rows,
+    start_date: date,
+    days: int,
+    seeds: dict[str, float] | None = None,
+    events: list[PositionEvent] = (),
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """Daily portfolio and per-category values (see holding_daily_values).
+
+    Returns (portfolio values, {category: values}); categories are empty when no
+    holding is priced. Shared by get_performance and the portfolio_tasks batch jobs.
+    """
+    ticker_holdings, ticker_category, cost_basis_holdings = _group_holdings(holdings)
+    holding_values = holding_daily_values(holdings, price_rows, start_date, days, seeds, events)
+
+    # Unpriced holdings at cost basis, per category and in total
+    cost_basis_by_category = {
+        cat: _running_total(0, holding_values[:, ks]) for cat, ks in cost_basis_holdings.items()
     }
-    benchmarks = {}
-    for bt in benchmark_tickers:
-        name = benchmark_names.get(bt, bt)
-        if benchmark_points[bt]:
-            benchmarks[name] = benchmark_points[bt]
+    cost_basis_total = _running_total(0, np.array(list(cost_basis_by_category.values())).reshape(-1, days + 1).T)
 
-    return {
-        "portfolio": points,
-        "by_category": {cat: pts for cat, pts in category_points.items() if pts},
-        "benchmarks": benchmarks,
+    if not ticker_holdings:
+        return cost_basis_total, {}
+
+    # Priced holdings in ticker order
+    columns = [k for ks in ticker_holdings.values() for k in ks]
+    priced_values = holding_values[:, columns]
+    portfolio_values = _running_total(cost_basis_total, priced_values)
+
+    # Per-category values: each category sums its columns of a holdings x categories mask
+    column_category = [ticker_category[t] for t, ks in ticker_holdings.items() for _ in ks]
+    all_categories = set(ticker_category.values()) | set(cost_basis_by_category.keys())
+    grouping = np.array([[category == cat for cat in all_categories] for category in column_category])
+    category_values = {
+        cat: _running_total(cost_basis_by_category.get(cat, 0), priced_values[:, grouping[:, k]])
+        for k, cat in enumerate(all_categories)
     }
+    return portfolio_values, category_values
+
 
+async def _read_daily_values(
+    db: AsyncSession, redis: aioredis.Redis, user_id: uuid.UUID, start_date: date, days: int,
+) -> tuple[np.ndarray, dict[str, np.ndarray]] | None:
+    """Materialized values for the window, as compute_daily_values returns them.
+
+    None when the rows don't cover the window or any was computed from an older
+    holdings version (or Redis can't tell). Days after the last stored date
+    carry its values forward: no close has arrived for them yet.
+    """
+    try:
+        version = int(await redis.get(holdings_version_key(user_id)) or 0)
+    except aioredis.RedisError:
+        return None
 
-async def get_top_holdings(db: AsyncSession, user_id: uuid.UUID, limit: int | None = 5, redis: aioredis.Redis | None = None) -> list[dict]:
-    """Top holdings by current market value."""
     result = await db.execute(
-        select(Holding).where(Holding.user_id == user_id, Holding.is_active == True)
+        select(
+            PortfolioDailyValue.category, PortfolioDailyValue.date,
+            PortfolioDailyValue.value, PortfolioDailyValue.holdings_version,
+        )
+        .where(PortfolioDailyValue.user_id == user_id, PortfolioDailyValue.date >= start_date)
+        .order_by(PortfolioDailyValue.date, PortfolioDailyValue.category)
     )
-    holdings = result.scalars().all()
+    rows = result.all()
+    if not rows or rows[0].date > start_date or any(r.holdings_version != version for r in rows):
+        return None
+
+    categories = list(dict.fromkeys(r.category for r in rows))
+    if TOTAL_CATEGORY not in categories:
+        return None
+    values = _close_matrix([(r.category, r.date, r.value) for r in rows], categories, start_date, days)
+    by_category = {cat: values[:, k] for k, cat in enumerate(categories) if cat != TOTAL_CATEGORY}
+    return values[:, categories.index(TOTAL_CATEGORY)], by_category
+
+
+def _benchmark_series(
+    series: BenchmarkSeries,
+    tickers: list[str],
+    start_date: date,
+    days: int,
+    dates: list[str],
+    keep: np.ndarray,
+    base_value: float,
+) -> dict:
+    """Benchmark indices scaled to base_value from each index's first close in the window, by display name.
+
+    Only the days in keep (whose dates are dates) are returned.
+    """
+    benchmarks = {}
+    if base_value:
+        values, seen = rescale(series, tickers, start_date, days, base_value)
+        values, seen = values[keep], seen[keep]
+        for k, t in enumerate(tickers):
+            if seen[:, k].any():
+                benchmarks[BENCHMARKS[t]["name"]] = _series(dates, values[:, k], seen[:, k])
+    return benchmarks
 
-    valued = []
-    for h in holdings:
-        invested = h.quantity * h.avg_buy_price
-        if redis:
-            price_info = await resolve_price(db, redis, h.symbol, h.asset_class_code, h.exchange, h.avg_buy_price)
-            current_value = h.quantity * price_info["price"]
-            gain_loss = current_value - invested
-            gain_loss_pct = (gain_loss / invested * 100) if invested > 0 else 0
-            day_change_pct = price_info.get("day_change_pct", 0)
+
+def sample_indices(start_date: date, values: np.ndarray, interval: str = "day", points: int | None = None) -> np.ndarray:
+    """Days (indices into values, one per day from start_date) a downsampled series keeps.
+
+    interval "week" or "month" keeps the last day of each calendar week or month
+    (and the first day); points then thins what is left to at most that many
+    with largest-triangle-three-buckets, which keeps the peaks and troughs.
+    """
+    keep = np.arange(len(values))
+    if interval != "day":
+        if interval == "week":
+            period = (keep + start_date.weekday()) // 7
         else:
-            current_value = invested
-            gain_loss = 0
-            gain_loss_pct = 0
-            day_change_pct = 0
+            period = (np.datetime64(start_date, "D") + keep).astype("datetime64[M]")
+        period_end = np.append(period[1:] != period[:-1], True)
+        period_end[0] = True
+        keep = keep[period_end]
+    if points is not None and len(keep) > points:
+        keep = keep[_lttb(keep.astype(float), values[keep], points)]
+    return keep
+
+
+def _lttb(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Indices of the points (at least 3) largest-triangle-three-buckets keeps, ends included."""
+    n = len(y)
+    if points >= n:
+        return np.arange(n)
+    # The points between the ends, split into points - 2 buckets
+    edges = np.linspace(1, n - 1, points - 1).astype(int)
+    keep = np.empty(points, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for b in range(points - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # Triangle's third corner: the next bucket's average (the last point after the last bucket)
+        if b + 2 < len(edges):
+            next_x, next_y = x[hi:edges[b + 2]].mean(), y[hi:edges[b + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(area.argmax())
+        keep[b + 1] = a
+    return keep
 
-        valued.append({
-            "id": str(h.id),
-            "name": h.name,
-            "symbol": h.symbol,
-            "asset_class_code": h.asset_class_code,
-            "quantity": h.quantity,
-            "avg_buy_price": h.avg_buy_price,
-            "buy_currency": h.buy_currency,
-            "value": round(current_value, 2),
-            "current_value": round(current_value, 2),
-            "gain_loss": round(gain_loss, 2),
-            "gain_loss_pct": round(gain_loss_pct, 2),
-            "day_change_pct": round(day_change_pct, 2),
-            "is_active": h.is_active,
-        })
 
-    valued.sort(key=lambda x: -x["value"])
-    return valued[:limit] if limit else valued
+def _close_matrix(
+    price_rows, tickers: list[str], start_date: date, days: int, seed: np.ndarray | None = None,
+) -> np.ndarray:
+    """(days + 1) x tickers closing prices, forward-filled from the last close.
+
+    Before a ticker's first close in the window the value is its seed, or NaN without one.
+    """
+    column = {t: j for j, t in enumerate(tickers)}
+    # Row 0 holds the seed; rows 1.. are start_date.. today
+    closes = np.full((days + 2, len(tickers)), np.nan)
+    if seed is not None:
+        closes[0] = seed
+    for symbol, d, close in price_rows:
+        j = column.get(symbol)
+        i = (d - start_date).days + 1
+        if j is not None and 1 <= i <= days + 1:
+            closes[i, j] = close
+
+    last_seen = np.where(np.isnan(closes), 0, np.arange(days + 2)[:, None])
+    np.maximum.accumulate(last_seen, axis=0, out=last_seen)
+    return np.take_along_axis(closes, last_seen, axis=0)[1:]
+
+
+def _running_total(start: float | np.ndarray, values: np.ndarray) -> np.ndarray:
+    """start (a scalar or one value per row) plus each row of values, added left to right.
+
+    cumsum adds strictly in column order (unlike a dot product or sum), so totals
+    round to the same paise as a plain Python loop over the holdings.
+    """
+    start_column = np.broadcast_to(np.asarray(start, dtype=float), (len(values),))[:, None]
+    return np.cumsum(np.hstack([start_column, values]), axis=1)[:, -1]
+
+
+def _series(dates: list[str], values: np.ndarray, mask: np.ndarray | None = None) -> list[dict]:
+    """[{date, value}] points rounded to paise, skipping days where mask is False."""
+    values = values.tolist()
+    if mask is None:
+        return [{"date": d, "value": round(v, 2)} for d, v in zip(dates, values)]
+    return [{"date": d, "value": round(v, 2)} for d, v, keep in zip(dates, values, mask.tolist()) if keep]
 
 
 async def get_dashboard(db: AsyncSession, user_id: uuid.UUID, redis: aioredis.Redis | None = None) -> dict:
-    """Aggregated dashboard data."""
-    summary = await get_portfolio_summary(db, user_id, redis)
-    allocation = await get_allocation(db, user_id, redis)
-    performance = await get_performance(db, user_id, days=30, redis=redis)
-    all_holdings = await get_top_holdings(db, user_id, limit=None, redis=redis)
-    top_holdings = all_holdings[:5]
+    """Aggregated dashboard data.
+
+    One valuation pass: holdings are loaded once and priced once, and summary,
+    allocation and holdings are derived from that; performance reuses the same
+    holdings for its price_history query.
+    """
+    holdings = await _load_holdings(db, user_id)
+    valued = await _value_holdings(db, redis, holdings)
+    performance = await _build_performance(db, holdings, days=30, user_id=user_id, redis=redis)
+    all_holdings = _rank_holdings(valued)
 
     return {
-        "summary": summary,
-        "allocation": allocation,
+        "summary": _summarize(valued),
+        "allocation": _allocate(valued),
         "performance": performance,
-        "top_holdings": top_holdings,
+        "top_holdings": all_holdings[:5],
         "all_holdings": all_holdings,
     }
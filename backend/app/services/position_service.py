@@ -0,0 +1,135 @@
+"""As-of-date positions replayed from the transactions table.
+
+Holdings carry today's quantities; dated buy/sell transactions say when they
+changed. A holding's quantity on a past day is its current quantity with every
+later transaction undone, so positions stay anchored to the holdings even where
+the ledger is incomplete. Undated transactions (CSV imports) count as opening
+positions, and merge bookkeeping entries don't move anything.
+
+Each user's position events are cached in a Redis list (positions:{user_id})
+that is only ever appended to: a new transaction pushes one event. The list is
+valid once it holds the sentinel pushed by a full load from the database;
+events are deduplicated by transaction id, so a load racing an append is safe.
+"""
+import logging
+import uuid
+from datetime import date
+
+import numpy as np
+import redis.asyncio as aioredis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.transaction import Transaction
+
+logger = logging.getLogger(__name__)
+
+POSITION_EVENTS_TTL = 7 * 24 * 60 * 60
+_LOADED = "*"
+_SIGNS = {"buy": 1, "sell": -1}
+
+# (transaction id, holding id, trade date, signed quantity)
+PositionEvent = tuple[str, str, date, float]
+
+
+def position_events_key(user_id: uuid.UUID | str) -> str:
+    return f"positions:{user_id}"
+
+
+def transaction_event(txn) -> PositionEvent | None:
+    """The position change a transaction records, or None when it doesn't date one."""
+    sign = _SIGNS.get(txn.type)
+    if not sign or txn.holding_id is None or txn.transaction_date is None or txn.broker == "merge":
+        return None
+    return str(txn.id), str(txn.holding_id), txn.transaction_date, sign * txn.quantity
+
+
+def position_matrix(holdings, events: list[PositionEvent], start_date: date, days: int) -> np.ndarray:
+    """(days + 1) x holdings quantity held at each day's close from start_date.
+
+    A transaction counts from its trade date on. Events before the window are
+    already part of every day in it; events after today are folded into today.
+    """
+    quantities = np.array([float(h.quantity) for h in holdings])
+    column = {str(h.id): k for k, h in enumerate(holdings)}
+    # Row i collects the events of window day i; earlier ones are clamped into
+    # row 0 and later ones into row days (today)
+    increments = np.zeros((days + 1, len(holdings)))
+    for _, holding_id, d, qty in events:
+        k = column.get(holding_id)
+        if k is not None:
+            increments[min(max((d - start_date).days, 0), days), k] += qty
+    if not increments.any():
+        return np.broadcast_to(quantities, (days + 1, len(holdings)))
+
+    # Quantity on day i = current quantity - events dated after day i
+    later = increments.sum(axis=0) - np.cumsum(increments, axis=0)
+    return np.maximum(quantities - later, 0)
+
+
+def _encode(event: PositionEvent) -> str:
+    txn_id, holding_id, d, qty = event
+    return f"{txn_id}|{holding_id}|{d.isoformat()}|{qty!r}"
+
+
+def _decode(raw: list[str]) -> dict[str, PositionEvent]:
+    events = {}
+    for item in raw:
+        if item == _LOADED:
+            continue
+        txn_id, holding_id, d, qty = item.split("|")
+        events[txn_id] = (txn_id, holding_id, date.fromisoformat(d), float(qty))
+    return events
+
+
+async def load_position_events(db: AsyncSession, redis: aioredis.Redis | None, user_id: uuid.UUID) -> list[PositionEvent]:
+    """A user's position events, from the Redis list when it was loaded, else from transactions."""
+    raw: list[str] = []
+    if redis is not None:
+        try:
+            raw = await redis.lrange(position_events_key(user_id), 0, -1)
+        except aioredis.RedisError as e:
+            logger.warning(f"Position events cache unavailable: {e}")
+        if _LOADED in raw:
+            return list(_decode(raw).values())
+
+    result = await db.execute(
+        select(
+            Transaction.id, Transaction.holding_id, Transaction.type,
+            Transaction.quantity, Transaction.transaction_date, Transaction.broker,
+        ).where(Transaction.user_id == user_id, Transaction.transaction_date.is_not(None))
+    )
+    loaded = [e for e in map(transaction_event, result.all()) if e is not None]
+
+    if redis is not None:
+        try:
+            key = position_events_key(user_id)
+            pipe = redis.pipeline()
+            pipe.rpush(key, _LOADED, *map(_encode, loaded))
+            pipe.expire(key, POSITION_EVENTS_TTL)
+            await pipe.execute()
+        except aioredis.RedisError as e:
+            logger.warning(f"Failed to cache position events for {user_id}: {e}")
+
+    events = _decode(raw)
+    events.update((e[0], e) for e in loaded)
+    return list(events.values())
+
+
+async def record_position_events(redis: aioredis.Redis, user_id: uuid.UUID, events: list[PositionEvent]) -> None:
+    """Append committed transactions' events to the user's cached list."""
+    if not events:
+        return
+    try:
+        key = position_events_key(user_id)
+        pipe = redis.pipeline()
+        pipe.rpush(key, *map(_encode, events))
+        pipe.expire(key, POSITION_EVENTS_TTL)
+        await pipe.execute()
+    except aioredis.RedisError as e:
+        # The list would miss this event: drop it so the next read reloads
+        logger.warning(f"Failed to record position events for {user_id}: {e}")
+        try:
+            await redis.delete(position_events_key(user_id))
+        except aioredis.RedisError:
+            pass
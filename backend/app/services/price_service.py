@@ -1,20 +1,29 @@
 """Price resolution service: Yahoo Finance API, Redis caching, DB fallback."""
+import abc
+import asyncio
 import json
 import logging
 import math
-from datetime import date, datetime
+import time
+from collections.abc import Sequence
+from datetime import date, datetime, timedelta, timezone
 
-import requests
 import redis.asyncio as aioredis
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.config import settings
 from app.models.market_data import MarketData
+from app.services import http_client, market_calendar
+from app.services.fetch_engine import FetchEngine, run_sync
+from app.services.rate_limiter import ProviderGuard
 
 logger = logging.getLogger(__name__)
 
 _YF_CHART_URL = "https://query2.finance.yahoo.com/v8/finance/chart/{ticker}"
+_YF_QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+_YF_COOKIE_URL = "https://fc.yahoo.com"
+_YF_CRUMB_URL = "https://query1.finance.yahoo.com/v1/test/getcrumb"
 _YF_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
 
 # Asset classes that can be priced via yfinance
@@ -65,177 +74,489 @@ async def get_cached_price(redis: aioredis.Redis, yf_ticker: str) -> dict | None
     return None
 
 
-async def set_cached_prices_bulk(redis: aioredis.Redis, prices: dict[str, dict]) -> None:
-    """Write multiple prices to Redis with TTL."""
+async def get_cached_prices_bulk(redis: aioredis.Redis, yf_tickers: Sequence[str]) -> dict[str, dict]:
+    """Read many cached prices from Redis with one MGET (misses are absent)."""
+    if not yf_tickers:
+        return {}
+    raws = await redis.mget([f"price:{t}" for t in yf_tickers])
+    return {t: json.loads(raw) for t, raw in zip(yf_tickers, raws) if raw}
+
+
+def price_cache_ttl(group: str | None, refresh_in: int | None = None, now: datetime | None = None) -> int:
+    """Seconds a just-fetched price should stay in Redis for its market group.
+
+    The key lives until the fetch that will replace it, plus PRICE_CACHE_TTL_SECONDS
+    of grace. While the market trades that is refresh_in seconds away; if the
+    market will be closed by then, it is the next session's fetch window, and for
+    MF_DAILY it is the next NAV fetch. Closed-market prices thus stay cached
+    instead of falling through to market_data overnight.
+    """
+    base = settings.PRICE_CACHE_TTL_SECONDS
+    now = now or datetime.now(timezone.utc)
+    next_fetch = now + timedelta(seconds=refresh_in or base)
+
+    if group == "MF_DAILY":
+        next_fetch = market_calendar.next_close(group, now) + market_calendar.NAV_FETCH_DELAY
+    elif group in market_calendar.MARKETS:
+        buffer = market_calendar.SESSION_BUFFER
+        if not market_calendar.is_open(group, next_fetch, pre=buffer, post=buffer):
+            next_fetch = max(next_fetch, market_calendar.next_open(group, next_fetch) - buffer)
+
+    return int((next_fetch - now).total_seconds()) + base
+
+
+async def set_cached_prices_bulk(
+    redis: aioredis.Redis,
+    prices: dict[str, dict],
+    groups: dict[str, str] | None = None,
+) -> None:
+    """Write multiple prices to Redis, each with its market's TTL (see price_cache_ttl).
+
+    groups maps tickers to market groups; unmapped tickers are treated as 24/7.
+    """
+    groups = groups or {}
+    now = datetime.now(timezone.utc)
     pipe = redis.pipeline()
     for ticker, data in prices.items():
-        pipe.setex(f"price:{ticker}", settings.PRICE_CACHE_TTL_SECONDS, json.dumps(data))
+        pipe.setex(f"price:{ticker}", price_cache_ttl(groups.get(ticker), now=now), json.dumps(data))
     await pipe.execute()
 
 
-def _fetch_yahoo_chart(ticker: str, range_: str = "1d", interval: str = "1d") -> dict | None:
-    """Fetch chart data from Yahoo Finance API directly."""
-    try:
-        resp = requests.get(
-            _YF_CHART_URL.format(ticker=ticker),
-            headers=_YF_HEADERS,
-            params={"range": range_, "interval": interval},
-            timeout=10,
+async def _fetch_yahoo_chart(
+    engine: FetchEngine,
+    ticker: str,
+    range_: str = "1d",
+    interval: str = "1d",
+    url: str = _YF_CHART_URL,
+    start: date | None = None,
+) -> dict | None:
+    """Fetch chart data from Yahoo Finance API directly.
+
+    With `start`, requests the explicit window [start, now] instead of `range_`.
+    """
+    if start is not None:
+        period1 = int(datetime.combine(start, datetime.min.time(), tzinfo=timezone.utc).timestamp())
+        params = {"period1": period1, "period2": int(time.time()), "interval": interval}
+    else:
+        params = {"range": range_, "interval": interval}
+    return await engine.get_json(
+        url.format(ticker=ticker),
+        params=params,
+        headers=_YF_HEADERS,
+        provider="yahoo",
+    )
+
+
+def _build_quote(current_price: float, previous_close: float | None) -> dict:
+    """Shape a price into the {price, previous_close, day_change_pct, last_updated} dict."""
+    day_change_pct = 0.0
+    if previous_close and previous_close > 0:
+        day_change_pct = round((current_price - previous_close) / previous_close * 100, 2)
+
+    return {
+        "price": round(current_price, 2),
+        "previous_close": round(previous_close, 2) if previous_close else None,
+        "day_change_pct": day_change_pct,
+        "last_updated": datetime.utcnow().isoformat(),
+    }
+
+
+def _parse_chart_quote(ticker: str, data: dict | None) -> dict | None:
+    """Extract {price, previous_close, day_change_pct, last_updated} from a chart response."""
+    if not data:
+        return None
+
+    chart = data.get("chart", {}).get("result")
+    if not chart:
+        logger.warning(f"No chart result for {ticker}")
+        return None
+
+    meta = chart[0].get("meta", {})
+    current_price = meta.get("regularMarketPrice")
+    previous_close = meta.get("chartPreviousClose") or meta.get("previousClose")
+
+    if current_price is None:
+        return None
+
+    return _build_quote(current_price, previous_close)
+
+
+def _parse_quote_response(tickers: list[str], data: dict | None) -> dict[str, dict]:
+    """Map a multi-symbol quote response back onto the requested tickers."""
+    if not data:
+        return {}
+
+    requested = {t.upper(): t for t in tickers}
+    results = {}
+    for item in data.get("quoteResponse", {}).get("result") or []:
+        ticker = requested.get(str(item.get("symbol", "")).upper())
+        current_price = item.get("regularMarketPrice")
+        if ticker is None or current_price is None:
+            continue
+        previous_close = item.get("regularMarketPreviousClose")
+        results[ticker] = _build_quote(current_price, previous_close)
+    return results
+
+
+def _parse_chart_history(data: dict | None) -> list[dict]:
+    """Extract daily OHLCV rows from a chart response, skipping days with no close."""
+    if not data:
+        return []
+
+    chart = data.get("chart", {}).get("result")
+    if not chart:
+        return []
+
+    timestamps = chart[0].get("timestamp", [])
+    indicators = chart[0].get("indicators", {})
+    quotes = indicators.get("quote", [{}])[0]
+
+    opens = quotes.get("open", [])
+    highs = quotes.get("high", [])
+    lows = quotes.get("low", [])
+    closes = quotes.get("close", [])
+    volumes = quotes.get("volume", [])
+
+    rows = []
+    for i, ts in enumerate(timestamps):
+        close_val = closes[i] if i < len(closes) else None
+        if close_val is None:
+            continue
+
+        d = datetime.utcfromtimestamp(ts).date()
+        rows.append({
+            "date": d.isoformat(),
+            "open": _safe_float(opens[i] if i < len(opens) else None),
+            "high": _safe_float(highs[i] if i < len(highs) else None),
+            "low": _safe_float(lows[i] if i < len(lows) else None),
+            "close": round(float(close_val), 2),
+            "volume": _safe_int(volumes[i] if i < len(volumes) else None),
+        })
+    return rows
+
+
+class QuoteProvider(abc.ABC):
+    """Source of current prices. batch_size is the number of symbols per HTTP request."""
+
+    name = "base"
+    batch_size = 1
+
+    @abc.abstractmethod
+    async def fetch_quotes(self, engine: FetchEngine, tickers: list[str]) -> dict[str, dict]:
+        """Fetch one batch (at most batch_size tickers). Returns ticker -> quote dict."""
+
+    async def available(self, engine: FetchEngine) -> bool:
+        """False while the provider is suspended; its tickers then go straight to the fallback."""
+        return True
+
+
+class YahooChartProvider(QuoteProvider):
+    """One v8 chart request per symbol. Used as the fallback for symbols a batch misses."""
+
+    name = "yahoo_chart"
+
+    def __init__(self, url: str = _YF_CHART_URL):
+        self.url = url
+
+    async def fetch_quotes(self, engine: FetchEngine, tickers: list[str]) -> dict[str, dict]:
+        async def _fetch_one(ticker: str) -> tuple[str, dict | None]:
+            try:
+                data = await _fetch_yahoo_chart(engine, ticker, range_="2d", interval="1d", url=self.url)
+                return ticker, _parse_chart_quote(ticker, data)
+            except Exception as e:
+                logger.warning(f"Failed to fetch price for {ticker}: {e}")
+                return ticker, None
+
+        fetched = await asyncio.gather(*(_fetch_one(t) for t in tickers))
+        return {ticker: quote for ticker, quote in fetched if quote}
+
+
+# url -> monotonic time the quote endpoint is suspended until in this process
+_quote_suspended_until: dict[str, float] = {}
+# url -> (Cookie header, crumb) of the Yahoo session this process sends with quote requests
+_yahoo_sessions: dict[str, tuple[str, str]] = {}
+
+
+class YahooQuoteProvider(QuoteProvider):
+    """Many symbols per request via the v7 multi-symbol quote endpoint.
+
+    Yahoo answers the endpoint with 401/403 unless the request carries a session
+    cookie (set by any response from fc.yahoo.com) and the crumb issued for it.
+    The pair is fetched once per process and reused until a quote request is
+    rejected, which fetches a new pair and retries once. If Yahoo won't issue a
+    crumb, or rejects a fresh one, the provider suspends itself for
+    YAHOO_QUOTE_SUSPEND_SECONDS (across workers through the guard's circuit,
+    else in this process), so cycles go straight to the chart fallback instead
+    of spending a rejected request per batch.
+    """
+
+    name = "yahoo_quote"
+
+    def __init__(
+        self,
+        batch_size: int | None = None,
+        url: str = _YF_QUOTE_URL,
+        cookie_url: str = _YF_COOKIE_URL,
+        crumb_url: str = _YF_CRUMB_URL,
+    ):
+        self.batch_size = batch_size or settings.YFINANCE_BATCH_SIZE
+        self.url = url
+        self.cookie_url = cookie_url
+        self.crumb_url = crumb_url
+        self._lock: asyncio.Lock | None = None
+
+    def suspended(self, guard: ProviderGuard | None = None) -> bool:
+        """Whether the endpoint is suspended in this process or, with a guard, across workers."""
+        if time.monotonic() < _quote_suspended_until.get(self.url, 0):
+            return True
+        return guard is not None and guard.is_open(self.name)
+
+    async def available(self, engine: FetchEngine) -> bool:
+        """Not suspended, and holding a session (fetched here, before the batches run)."""
+        if await asyncio.to_thread(self.suspended, engine.guard):
+            return False
+        # A lock per fetch run (and event loop), so concurrent batches renew the session once
+        self._lock = asyncio.Lock()
+        return await self._session(engine) is not None
+
+    async def _suspend(self, engine: FetchEngine, status: int) -> None:
+        seconds = settings.YAHOO_QUOTE_SUSPEND_SECONDS
+        logger.warning(f"{self.name} rejected with {status}; using the chart fallback for {seconds}s")
+        _quote_suspended_until[self.url] = time.monotonic() + seconds
+        if engine.guard is not None:
+            await asyncio.to_thread(engine.guard.suspend, self.name, seconds)
+
+    async def _session(self, engine: FetchEngine, stale: tuple[str, str] | None = None) -> tuple[str, str] | None:
+        """The cached (cookie, crumb), or a new pair when there is none or it is stale.
+
+        None if the pair can't be fetched; the provider is suspended if Yahoo refused it.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            session = _yahoo_sessions.get(self.url)
+            if session is not None and session != stale:
+                return session
+            _yahoo_sessions.pop(self.url, None)
+
+            # Unanswered or throttled: no session this run, but nothing refused either
+            resp = await engine.get(self.cookie_url, headers=_YF_HEADERS, provider="yahoo")
+            if resp is None or resp.status_code in http_client.RETRY_STATUSES:
+                return None
+            cookie = "; ".join(f"{name}={value}" for name, value in resp.cookies.items())
+            if not cookie:
+                await self._suspend(engine, resp.status_code)
+                return None
+
+            resp = await engine.get(self.crumb_url, headers={**_YF_HEADERS, "Cookie": cookie}, provider="yahoo")
+            if resp is None or resp.status_code in http_client.RETRY_STATUSES:
+                return None
+            crumb = resp.text.strip() if resp.status_code == 200 else ""
+            if not crumb or "<" in crumb:  # an HTML error page is not a crumb
+                await self._suspend(engine, resp.status_code)
+                return None
+
+            _yahoo_sessions[self.url] = (cookie, crumb)
+            return cookie, crumb
+
+    async def _get_quotes(self, engine: FetchEngine, tickers: list[str], session: tuple[str, str]):
+        cookie, crumb = session
+        return await engine.get(
+            self.url,
+            params={"symbols": ",".join(tickers), "crumb": crumb},
+            headers={**_YF_HEADERS, "Cookie": cookie},
+            provider="yahoo",
         )
+
+    async def fetch_quotes(self, engine: FetchEngine, tickers: list[str]) -> dict[str, dict]:
+        session = await self._session(engine)
+        if session is None:
+            return {}
+        resp = await self._get_quotes(engine, tickers, session)
+        if resp is not None and resp.status_code in (401, 403):
+            # The crumb expired: retry once with a new session, then give up on the endpoint
+            session = await self._session(engine, stale=session)
+            if session is None:
+                return {}
+            resp = await self._get_quotes(engine, tickers, session)
+            if resp is not None and resp.status_code in (401, 403):
+                await self._suspend(engine, resp.status_code)
+                return {}
+        if resp is None:
+            return {}
         if resp.status_code != 200:
-            logger.warning(f"Yahoo API returned {resp.status_code} for {ticker}")
-            return None
-        return resp.json()
-    except Exception as e:
-        logger.warning(f"Yahoo API request failed for {ticker}: {e}")
-        return None
+            logger.warning(f"{self.url} returned {resp.status_code}")
+            return {}
+        try:
+            data = resp.json()
+        except ValueError as e:
+            logger.warning(f"Invalid JSON from {self.url}: {e}")
+            return {}
+        return _parse_quote_response(tickers, data)
 
 
-def fetch_current_prices_batch(tickers: list[str]) -> dict[str, dict]:
-    """Fetch current prices from Yahoo Finance API for a batch of tickers.
+def current_price_batch_size(guard: ProviderGuard | None = None) -> int:
+    """Tickers per request fetch_current_prices_batch makes right now.
+
+    The batch quote provider's batch size, or 1 while it is suspended and every
+    ticker takes its own chart request.
+    """
+    provider = YahooQuoteProvider()
+    return 1 if provider.suspended(guard) else provider.batch_size
+
+
+async def fetch_current_prices_async(
+    tickers: list[str],
+    provider: QuoteProvider | None = None,
+    fallback: QuoteProvider | None = None,
+    guard: ProviderGuard | None = None,
+) -> dict[str, dict]:
+    """Fetch current prices for all tickers concurrently over one connection pool.
+
+    Tickers are split into provider.batch_size chunks, one request each. With the
+    default provider (multi-symbol Yahoo quotes), any ticker the batch response
+    misses is retried through the per-symbol chart provider, as is every ticker
+    while the provider is suspended. A guard applies the
+    shared rate limit / circuit breaker to every request.
 
     Returns dict of ticker -> {price, previous_close, day_change_pct, last_updated}.
     """
     if not tickers:
         return {}
 
-    results = {}
-    for ticker_str in tickers:
+    if provider is None:
+        provider = YahooQuoteProvider()
+        fallback = fallback or YahooChartProvider()
+
+    async def _fetch_batch(engine: FetchEngine, p: QuoteProvider, batch: list[str]) -> dict[str, dict]:
         try:
-            data = _fetch_yahoo_chart(ticker_str, range_="2d", interval="1d")
-            if not data:
-                continue
-
-            chart = data.get("chart", {}).get("result")
-            if not chart:
-                logger.warning(f"No chart result for {ticker_str}")
-                continue
-
-            meta = chart[0].get("meta", {})
-            current_price = meta.get("regularMarketPrice")
-            previous_close = meta.get("chartPreviousClose") or meta.get("previousClose")
-
-            if current_price is None:
-                continue
-
-            day_change_pct = 0.0
-            if previous_close and previous_close > 0:
-                day_change_pct = round((current_price - previous_close) / previous_close * 100, 2)
-
-            results[ticker_str] = {
-                "price": round(current_price, 2),
-                "previous_close": round(previous_close, 2) if previous_close else None,
-                "day_change_pct": day_change_pct,
-                "last_updated": datetime.utcnow().isoformat(),
-            }
+            return await p.fetch_quotes(engine, batch)
         except Exception as e:
-            logger.warning(f"Failed to fetch price for {ticker_str}: {e}")
+            logger.warning(f"{p.name} fetch failed for {len(batch)} tickers: {e}")
+            return {}
+
+    async with FetchEngine(guard=guard) as engine:
+        results: dict[str, dict] = {}
+        if await provider.available(engine):
+            size = max(provider.batch_size, 1)
+            batches = [tickers[i:i + size] for i in range(0, len(tickers), size)]
+            for fetched in await asyncio.gather(*(_fetch_batch(engine, provider, b) for b in batches)):
+                results.update(fetched)
+
+        missing = [t for t in tickers if t not in results]
+        if missing and fallback is not None:
+            logger.info(f"{len(missing)} tickers missing from {provider.name}, falling back to {fallback.name}")
+            results.update(await _fetch_batch(engine, fallback, missing))
 
     return results
 
 
-def fetch_eod_history(tickers: list[str], period: str = "5d") -> dict[str, list[dict]]:
-    """Fetch OHLCV history from Yahoo Finance API.
+def fetch_current_prices_batch(
+    tickers: list[str],
+    provider: QuoteProvider | None = None,
+    guard: ProviderGuard | None = None,
+) -> dict[str, dict]:
+    """Fetch current prices from Yahoo Finance API for a batch of tickers.
 
-    Returns dict of ticker -> list of {date, open, high, low, close, volume}.
+    Synchronous entry point for Celery tasks; runs fetch_current_prices_async.
+    Returns dict of ticker -> {price, previous_close, day_change_pct, last_updated}.
     """
     if not tickers:
         return {}
+    return run_sync(fetch_current_prices_async(tickers, provider, guard=guard))
 
-    # Map period strings to Yahoo range parameter
-    range_map = {"5d": "5d", "1mo": "1mo", "1y": "1y", "6mo": "6mo", "max": "max"}
-    yf_range = range_map.get(period, period)
 
-    results = {}
-    for ticker in tickers:
+async def fetch_eod_history_since_async(
+    starts: dict[str, date],
+    guard: ProviderGuard | None = None,
+) -> dict[str, list[dict]]:
+    """Fetch daily OHLCV rows from each ticker's start date onwards (inclusive).
+
+    Returns dict of ticker -> list of {date, open, high, low, close, volume}.
+    """
+    if not starts:
+        return {}
+
+    async def _fetch_one(engine: FetchEngine, ticker: str, start: date) -> tuple[str, list[dict]]:
         try:
-            data = _fetch_yahoo_chart(ticker, range_=yf_range, interval="1d")
-            if not data:
-                continue
-
-            chart = data.get("chart", {}).get("result")
-            if not chart:
-                continue
-
-            timestamps = chart[0].get("timestamp", [])
-            indicators = chart[0].get("indicators", {})
-            quotes = indicators.get("quote", [{}])[0]
-
-            opens = quotes.get("open", [])
-            highs = quotes.get("high", [])
-            lows = quotes.get("low", [])
-            closes = quotes.get("close", [])
-            volumes = quotes.get("volume", [])
-
-            rows = []
-            for i, ts in enumerate(timestamps):
-                close_val = closes[i] if i < len(closes) else None
-                if close_val is None:
-                    continue
-
-                d = datetime.utcfromtimestamp(ts).date()
-                rows.append({
-                    "date": d.isoformat(),
-                    "open": _safe_float(opens[i] if i < len(opens) else None),
-                    "high": _safe_float(highs[i] if i < len(highs) else None),
-                    "low": _safe_float(lows[i] if i < len(lows) else None),
-                    "close": round(float(close_val), 2),
-                    "volume": _safe_int(volumes[i] if i < len(volumes) else None),
-                })
-
-            if rows:
-                results[ticker] = rows
+            data = await _fetch_yahoo_chart(engine, ticker, interval="1d", start=start)
+            start_iso = start.isoformat()
+            return ticker, [r for r in _parse_chart_history(data) if r["date"] >= start_iso]
         except Exception as e:
             logger.warning(f"Failed to fetch EOD data for {ticker}: {e}")
+            return ticker, []
 
-    return results
+    async with FetchEngine(guard=guard) as engine:
+        fetched = await asyncio.gather(*(_fetch_one(engine, t, d) for t, d in starts.items()))
 
+    return {ticker: rows for ticker, rows in fetched if rows}
 
-async def resolve_price(
-    db: AsyncSession,
-    redis: aioredis.Redis,
-    symbol: str | None,
-    asset_class_code: str,
-    exchange: str | None,
-    avg_buy_price: float,
-) -> dict:
-    """3-tier price resolution: Redis cache -> market_data table -> cost basis.
-
-    Returns {price, source, day_change_pct}.
+
+def fetch_eod_history_since(
+    starts: dict[str, date],
+    guard: ProviderGuard | None = None,
+) -> dict[str, list[dict]]:
+    """Synchronous entry point for Celery tasks; runs fetch_eod_history_since_async."""
+    if not starts:
+        return {}
+    return run_sync(fetch_eod_history_since_async(starts, guard=guard))
+
+
+async def resolve_prices_bulk(db: AsyncSession, redis: aioredis.Redis, holdings: Sequence) -> list[dict]:
+    """3-tier price resolution for many holdings: Redis cache -> market_data table -> cost basis.
+
+    One Redis MGET, then one market_data query for the misses.
+
+    holdings are objects with symbol, asset_class_code, exchange and avg_buy_price
+    (e.g. Holding rows). Returns one {price, previous_close, day_change_pct, source}
+    per holding, in input order.
     """
-    yf_ticker = to_yfinance_ticker(symbol, asset_class_code, exchange)
-
-    if yf_ticker and asset_class_code in PRICEABLE_CLASSES:
-        # Tier 1: Redis cache
-        cached = await get_cached_price(redis, yf_ticker)
-        if cached:
-            return {
-                "price": cached["price"],
-                "previous_close": cached.get("previous_close"),
-                "day_change_pct": cached.get("day_change_pct", 0),
+    tickers = [
+        to_yfinance_ticker(h.symbol, h.asset_class_code, h.exchange)
+        if h.asset_class_code in PRICEABLE_CLASSES else None
+        for h in holdings
+    ]
+    unique = list(dict.fromkeys(t for t in tickers if t))
+
+    # Tier 1: Redis cache
+    cached = await get_cached_prices_bulk(redis, unique)
+
+    # Tier 2: market_data table, all misses in one IN query
+    stored: dict[str, MarketData] = {}
+    misses = [t for t in unique if t not in cached]
+    if misses:
+        result = await db.execute(select(MarketData).where(MarketData.symbol.in_(misses)))
+        for md in result.scalars().all():
+            if md.current_price and md.symbol not in stored:
+                stored[md.symbol] = md
+
+    resolved = []
+    for h, ticker in zip(holdings, tickers):
+        if ticker in cached:
+            data = cached[ticker]
+            resolved.append({
+                "price": data["price"],
+                "previous_close": data.get("previous_close"),
+                "day_change_pct": data.get("day_change_pct", 0),
                 "source": "cache",
-            }
-
-        # Tier 2: market_data table
-        result = await db.execute(
-            select(MarketData).where(MarketData.symbol == yf_ticker).limit(1)
-        )
-        md = result.scalar_one_or_none()
-        if md and md.current_price:
-            return {
+            })
+        elif ticker in stored:
+            md = stored[ticker]
+            resolved.append({
                 "price": md.current_price,
                 "previous_close": md.previous_close,
                 "day_change_pct": md.day_change_pct or 0,
                 "source": "db",
-            }
-
-    # Tier 3: cost basis fallback
-    return {
-        "price": avg_buy_price,
-        "previous_close": None,
-        "day_change_pct": 0,
-        "source": "cost_basis",
-    }
+            })
+        else:
+            # Tier 3: cost basis fallback
+            resolved.append({
+                "price": h.avg_buy_price,
+                "previous_close": None,
+                "day_change_pct": 0,
+                "source": "cost_basis",
+            })
+    return resolved
 
 
 def get_previous_close_from_history(conn, ticker: str) -> float | None:
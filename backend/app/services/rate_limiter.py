@@ -0,0 +1,169 @@
+"""Provider-aware rate limiting and circuit breaking for outbound market-data calls.
+
+State lives in Redis so every Celery worker (and the API process) shares it:
+  ratelimit:{provider}            token bucket (hash: tokens, ts)
+  circuit:{provider}:failures     consecutive-failure counter within a window
+  circuit:{provider}:open         set while the circuit is open (expires after cooldown)
+  budget:{provider}:{YYYYMMDD}    requests made today (UTC)
+
+Redis errors fail open: a broken limiter must not stop price fetching.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+import redis as sync_redis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_LIMITS = {
+    "yahoo": {
+        "rate": settings.YAHOO_RATE_PER_SECOND,
+        "burst": settings.YAHOO_BURST,
+        "daily_budget": settings.YAHOO_DAILY_BUDGET,
+    },
+    "mfapi": {
+        "rate": settings.MFAPI_RATE_PER_SECOND,
+        "burst": settings.MFAPI_BURST,
+        "daily_budget": settings.MFAPI_DAILY_BUDGET,
+    },
+}
+
+# Returns the seconds to wait (as a string; Lua numbers would be truncated to ints)
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+  tokens = capacity
+  ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+
+class CircuitOpenError(Exception):
+    """The provider's circuit is open; skip the call."""
+
+
+class BudgetExceededError(Exception):
+    """The provider's daily request budget is spent."""
+
+
+class ProviderGuard:
+    """Token bucket + circuit breaker + daily budget per provider."""
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self._bucket = redis_client.register_script(_TOKEN_BUCKET_LUA)
+
+    def is_open(self, provider: str) -> bool:
+        """True while the provider's circuit is open."""
+        try:
+            return bool(self.redis.exists(f"circuit:{provider}:open"))
+        except sync_redis.RedisError as e:
+            logger.warning(f"Circuit check failed for {provider}: {e}")
+            return False
+
+    def acquire(self, provider: str) -> float:
+        """Reserve one request slot.
+
+        Returns seconds to wait before sending (0 when a token was available; the
+        caller should sleep and call again otherwise). Raises CircuitOpenError or
+        BudgetExceededError when the request must not be sent at all.
+        """
+        limits = PROVIDER_LIMITS.get(provider)
+        if limits is None:
+            return 0.0
+        if self.is_open(provider):
+            raise CircuitOpenError(provider)
+
+        try:
+            wait = float(self._bucket(
+                keys=[f"ratelimit:{provider}"],
+                args=[limits["rate"], limits["burst"], time.time()],
+            ))
+            if wait > 0:
+                return wait
+
+            budget_key = f"budget:{provider}:{datetime.now(timezone.utc):%Y%m%d}"
+            pipe = self.redis.pipeline()
+            pipe.incr(budget_key)
+            pipe.expire(budget_key, 2 * 86400)
+            used, _ = pipe.execute()
+        except sync_redis.RedisError as e:
+            logger.warning(f"Rate limiter unavailable for {provider}: {e}")
+            return 0.0
+
+        if used > limits["daily_budget"]:
+            raise BudgetExceededError(provider)
+        return 0.0
+
+    def record_success(self, provider: str) -> None:
+        try:
+            self.redis.delete(f"circuit:{provider}:failures")
+        except sync_redis.RedisError:
+            pass
+
+    def record_failure(self, provider: str) -> None:
+        """Count a throttled/failed call; open the circuit once the threshold is hit."""
+        key = f"circuit:{provider}:failures"
+        try:
+            pipe = self.redis.pipeline()
+            pipe.incr(key)
+            pipe.expire(key, settings.CIRCUIT_FAILURE_WINDOW_SECONDS)
+            failures, _ = pipe.execute()
+            if failures >= settings.CIRCUIT_FAILURE_THRESHOLD:
+                self.redis.set(f"circuit:{provider}:open", "1", ex=settings.CIRCUIT_COOLDOWN_SECONDS)
+                self.redis.delete(key)
+                logger.warning(
+                    f"Circuit opened for {provider} after {failures} failures "
+                    f"({settings.CIRCUIT_COOLDOWN_SECONDS}s cooldown)"
+                )
+        except sync_redis.RedisError as e:
+            logger.warning(f"Failed to record failure for {provider}: {e}")
+
+    def suspend(self, provider: str, seconds: int) -> None:
+        """Open the provider's circuit for seconds regardless of its failure count."""
+        try:
+            self.redis.set(f"circuit:{provider}:open", "1", ex=seconds)
+            logger.warning(f"Circuit opened for {provider} ({seconds}s suspension)")
+        except sync_redis.RedisError as e:
+            logger.warning(f"Failed to suspend {provider}: {e}")
+
+    def budget_used(self, provider: str) -> int:
+        """Requests counted against today's budget."""
+        try:
+            raw = self.redis.get(f"budget:{provider}:{datetime.now(timezone.utc):%Y%m%d}")
+            return int(raw or 0)
+        except sync_redis.RedisError:
+            return 0
+
+
+_guard: ProviderGuard | None = None
+_guard_lock = threading.Lock()
+
+
+def get_guard() -> ProviderGuard:
+    """Process-wide guard backed by REDIS_URL."""
+    global _guard
+    if _guard is None:
+        with _guard_lock:
+            if _guard is None:
+                _guard = ProviderGuard(sync_redis.from_url(settings.REDIS_URL, decode_responses=True))
+    return _guard
@@ -0,0 +1,204 @@
+"""Money- and time-weighted returns (XIRR, TWR, CAGR) per holding, asset class and portfolio.
+
+Everything is computed on one daily grid over the period [today - days, today]:
+each holding's daily value at the quantities held (holding_daily_values, with
+today's value from live prices) and its daily external cash flows from dated
+transactions. Asset classes and the portfolio are column sums of the same grid,
+so every XIRR is solved in one batched call.
+
+- XIRR: the rate r with -V(start) - sum(flows) + V(today) discounted at r equal
+  to zero, i.e. the money-weighted annual return over the period.
+- TWR: daily returns (V(d) - flow(d)) / V(d - 1), chain-linked over the period.
+- CAGR: TWR annualized over each column's live span (its first value or flow
+  to today); null for spans under a year, where annualizing overstates.
+"""
+import uuid
+from datetime import date, timedelta
+
+import numpy as np
+import redis.asyncio as aioredis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.price_history import PriceHistory
+from app.models.transaction import Transaction
+from app.services.portfolio_service import (
+    ASSET_CLASS_NAMES,
+    _load_holdings,
+    _value_holdings,
+    holding_daily_values,
+    priced_tickers,
+)
+from app.services.position_service import load_position_events
+
+# ln(1 + r) bracket searched for XIRR: r from about -99.995% to about 2.2 million %
+_LOG_RATE_BOUNDS = (-10.0, 10.0)
+_XIRR_TOLERANCE = 1e-10
+_XIRR_MAX_ITERATIONS = 100
+# Columns live for fewer days than this get no CAGR
+_MIN_CAGR_DAYS = 365
+
+
+def solve_xirr(times: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+    """Annual internal rate of return of each row of cash flows.
+
+    times: (n,) years since the first flow; amounts: (rows, n), investments
+    negative. Solves for x = ln(1 + r) with Newton steps kept inside a sign-change
+    bracket, falling back to bisection when a step leaves it, for all rows at once.
+    Rows without both inflows and outflows (or without a root in the bracket) are NaN.
+    """
+    amounts = np.atleast_2d(np.asarray(amounts, dtype=float))
+    rows = amounts.shape[0]
+    # Scaled per row so the tolerance means the same for small and large portfolios
+    scale = np.abs(amounts).max(axis=1, keepdims=True)
+    amounts = np.divide(amounts, scale, out=np.zeros_like(amounts), where=scale > 0)
+
+    def npv(x):
+        discount = np.exp(-np.outer(x, times))
+        return (amounts * discount).sum(axis=1), -(amounts * times * discount).sum(axis=1)
+
+    lo = np.full(rows, _LOG_RATE_BOUNDS[0])
+    hi = np.full(rows, _LOG_RATE_BOUNDS[1])
+    f_lo, _ = npv(lo)
+    f_hi, _ = npv(hi)
+    solvable = (np.sign(f_lo) * np.sign(f_hi) < 0) & (amounts > 0).any(axis=1) & (amounts < 0).any(axis=1)
+
+    x = np.full(rows, np.log1p(0.1))
+    done = ~solvable
+    for _ in range(_XIRR_MAX_ITERATIONS):
+        f, df = npv(x)
+        # Keep the root bracketed: x replaces the bound whose NPV has the same sign
+        same_as_lo = np.sign(f) == np.sign(f_lo)
+        lo = np.where(same_as_lo, x, lo)
+        f_lo = np.where(same_as_lo, f, f_lo)
+        hi = np.where(same_as_lo, hi, x)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = x - f / df
+        step_ok = np.isfinite(newton) & (newton >= lo) & (newton <= hi)
+        x_next = np.where(f == 0, x, np.where(step_ok, newton, (lo + hi) / 2))
+
+        converged = np.abs(x_next - x) < _XIRR_TOLERANCE
+        x = np.where(done, x, x_next)
+        done |= converged
+        if done.all():
+            break
+
+    return np.where(solvable, np.expm1(x), np.nan)
+
+
+def time_weighted_returns(values: np.ndarray, flows: np.ndarray) -> np.ndarray:
+    """Chain-linked return of each column over the days of values.
+
+    values and flows are (days + 1) x columns; flows[d] is the money put in on
+    day d (withdrawals negative). Days starting from zero value contribute nothing.
+    """
+    previous = values[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(previous > 0, (values[1:] - flows[1:]) / previous, 1.0)
+    return growth.prod(axis=0) - 1
+
+
+def annualized_returns(twr: np.ndarray, values: np.ndarray, flows: np.ndarray) -> np.ndarray:
+    """CAGR of each column's TWR over its live span: from its first value or flow to the last day.
+
+    NaN for columns live fewer than _MIN_CAGR_DAYS days or wiped out (TWR of -100%).
+    """
+    live = (values != 0) | (flows != 0)
+    span = np.where(live.any(axis=0), len(values) - 1 - live.argmax(axis=0), 0)
+    with np.errstate(invalid="ignore"):
+        return np.where(
+            (twr > -1) & (span >= _MIN_CAGR_DAYS), (1 + twr) ** (365 / np.maximum(span, 1)) - 1, np.nan,
+        )
+
+
+def _flow_amount(txn) -> float:
+    """Money into the holding for one transaction (sells and dividends are negative)."""
+    amount = txn.total_amount or txn.quantity * txn.price
+    if txn.type == "buy":
+        return amount + (txn.fees or 0)
+    if txn.type == "sell":
+        return -(amount - (txn.fees or 0))
+    if txn.type == "dividend":
+        return -amount
+    return 0.0
+
+
+def _pct(x: float) -> float | None:
+    # + 0.0 turns a rounded -0.0 into 0.0
+    return round(float(x) * 100, 2) + 0.0 if np.isfinite(x) else None
+
+
+async def get_returns(db: AsyncSession, user_id: uuid.UUID, days: int = 365, redis: aioredis.Redis | None = None) -> dict:
+    """XIRR, TWR and CAGR (percent) over the last days per holding, asset class and portfolio."""
+    today = date.today()
+    start_date = today - timedelta(days=days)
+    result = {"start_date": start_date.isoformat(), "end_date": today.isoformat(), "days": days}
+
+    holdings = await _load_holdings(db, user_id)
+    if not holdings:
+        return {**result, "portfolio": None, "by_asset_class": [], "holdings": []}
+
+    price_rows = []
+    tickers = priced_tickers(holdings)
+    if tickers:
+        ph_result = await db.execute(
+            select(PriceHistory.symbol, PriceHistory.date, PriceHistory.close)
+            .where(PriceHistory.symbol.in_(tickers), PriceHistory.date >= start_date)
+        )
+        price_rows = ph_result.all()
+    events = await load_position_events(db, redis, user_id)
+    values = holding_daily_values(holdings, price_rows, start_date, days, events=events)
+
+    # Today at live prices rather than the last close
+    for k, (h, price_info) in enumerate(await _value_holdings(db, redis, holdings)):
+        if price_info:
+            values[-1, k] = h.quantity * price_info["price"]
+
+    txn_result = await db.execute(
+        select(
+            Transaction.holding_id, Transaction.type, Transaction.quantity, Transaction.price,
+            Transaction.total_amount, Transaction.fees, Transaction.transaction_date, Transaction.broker,
+        ).where(
+            Transaction.user_id == user_id,
+            Transaction.transaction_date > start_date,
+            Transaction.broker.is_distinct_from("merge"),
+        )
+    )
+    column = {str(h.id): k for k, h in enumerate(holdings)}
+    flows = np.zeros_like(values)
+    for txn in txn_result.all():
+        k = column.get(str(txn.holding_id))
+        if k is not None:
+            flows[min((txn.transaction_date - start_date).days, days), k] += _flow_amount(txn)
+
+    # Columns: every holding, then every asset class, then the portfolio
+    asset_classes = list(dict.fromkeys(h.asset_class_code for h in holdings))
+    grouping = np.array([[h.asset_class_code == code for code in asset_classes] for h in holdings], dtype=float)
+    grouping = np.hstack([np.eye(len(holdings)), grouping, np.ones((len(holdings), 1))])
+    group_values = values @ grouping
+    group_flows = flows @ grouping
+
+    # Investor's cash flows: the opening value in, each day's flows, today's value out
+    amounts = -group_flows.T.copy()
+    amounts[:, 0] = -group_values[0]
+    amounts[:, -1] += group_values[-1]
+    xirr = solve_xirr(np.arange(days + 1) / 365, amounts)
+
+    twr = time_weighted_returns(group_values, group_flows)
+    cagr = annualized_returns(twr, group_values, group_flows)
+
+    metrics = [{"xirr": _pct(xirr[i]), "twr": _pct(twr[i]), "cagr": _pct(cagr[i])} for i in range(grouping.shape[1])]
+    n = len(holdings)
+    return {
+        **result,
+        "portfolio": metrics[-1],
+        "by_asset_class": [
+            {"asset_class": code, "asset_class_name": ASSET_CLASS_NAMES.get(code, code), **metrics[n + i]}
+            for i, code in enumerate(asset_classes)
+        ],
+        "holdings": [
+            {"id": str(h.id), "name": h.name, "symbol": h.symbol, "asset_class_code": h.asset_class_code, **metrics[k]}
+            for k, h in enumerate(holdings)
+        ],
+    }
@@ -0,0 +1,141 @@
+"""Risk metrics (volatility, beta, max drawdown, Sharpe) from price_history closes.
+
+risk_tasks computes them after each EOD run for every held ticker and benchmark
+at once: the closes form a trading days x tickers matrix and each metric is a
+column reduction of its daily returns, each taken between the ticker's own
+consecutive closes. A portfolio's daily return is its holdings' returns weighted
+by value (holdings without a market price count as cash) on the days any of them
+traded, so every portfolio is one more column of the same computation and
+depends only on its own holdings' calendars. Results
+are stored per user in portfolio_risk_metrics; get_risk only looks them up.
+"""
+import uuid
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.portfolio_risk_metric import PortfolioRiskMetric
+
+TRADING_DAYS = 252
+# Trailing window of the short-term volatility, in trading days
+RECENT_VOLATILITY_DAYS = 21
+# Columns with fewer daily returns get no metrics
+MIN_OBSERVATIONS = 20
+
+# Indices betas are measured against, by display name
+RISK_BENCHMARKS = {
+    "^NSEI": "Nifty 50",
+    "^GSPC": "S&P 500",
+}
+DEFAULT_BENCHMARK = "^NSEI"
+
+
+def close_table(price_rows, tickers: list[str]) -> tuple[list, np.ndarray]:
+    """(dates, dates x tickers closes) from (symbol, date, close) rows.
+
+    Rows are every date any ticker has a close on; a ticker is NaN on the dates
+    it has none (nothing is forward-filled).
+    """
+    dates = sorted({d for _, d, _ in price_rows})
+    row = {d: i for i, d in enumerate(dates)}
+    column = {t: j for j, t in enumerate(tickers)}
+    closes = np.full((len(dates), len(tickers)), np.nan)
+    for symbol, d, close in price_rows:
+        j = column.get(symbol)
+        if j is not None and close is not None:
+            closes[row[d], j] = close
+    return dates, closes
+
+
+def daily_returns(closes: np.ndarray) -> np.ndarray:
+    """Each column's return from its previous close, on the rows after the first.
+
+    A return sits on the date of the close it ends at and spans back to the
+    column's own previous close, so a ticker that doesn't trade on a date other
+    tickers do has NaN there rather than a 0% day.
+    """
+    # Each cell takes the row of the last close strictly above it (-1: none)
+    previous = np.where(np.isnan(closes), -1, np.arange(len(closes))[:, None])
+    np.maximum.accumulate(previous, axis=0, out=previous)
+    previous = previous[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = closes[1:] / closes[np.maximum(previous, 0), np.arange(closes.shape[1])] - 1
+    return np.where(previous >= 0, returns, np.nan)
+
+
+def _moments(returns: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(count, mean, sample standard deviation) of each column, ignoring NaN."""
+    valid = ~np.isnan(returns)
+    n = valid.sum(axis=0)
+    mean = np.where(valid, returns, 0).sum(axis=0) / np.maximum(n, 1)
+    var = np.where(valid, returns - mean, 0) ** 2
+    return n, mean, np.sqrt(var.sum(axis=0) / np.maximum(n - 1, 1))
+
+
+def _beta(returns: np.ndarray, benchmark: np.ndarray) -> np.ndarray:
+    """Beta of each column to the benchmark's returns, over the days both have one."""
+    both = ~np.isnan(returns) & ~np.isnan(benchmark)[:, None]
+    n = np.maximum(both.sum(axis=0), 1)
+    r = np.where(both, returns, 0)
+    b = np.where(both, benchmark[:, None], 0)
+    r_dev = np.where(both, r - r.sum(axis=0) / n, 0)
+    b_dev = np.where(both, b - b.sum(axis=0) / n, 0)
+    cov = (r_dev * b_dev).sum(axis=0)
+    var = (b_dev ** 2).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where((both.sum(axis=0) >= MIN_OBSERVATIONS) & (var > 0), cov / var, np.nan)
+
+
+def risk_metrics(returns: np.ndarray, benchmarks: dict[str, np.ndarray], risk_free_rate: float) -> dict:
+    """Annualized metrics of each column of daily returns.
+
+    Returns {volatility, volatility_1m, max_drawdown, sharpe: (columns,),
+    beta: {benchmark: (columns,)}}; NaN where a column has too little history.
+    """
+    n, mean, std = _moments(returns)
+    enough = n >= MIN_OBSERVATIONS
+    # Each column's own last RECENT_VOLATILITY_DAYS returns
+    valid = ~np.isnan(returns)
+    recent = valid & (np.cumsum(valid[::-1], axis=0)[::-1] <= RECENT_VOLATILITY_DAYS)
+    recent_n, _, recent_std = _moments(np.where(recent, returns, np.nan))
+
+    volatility = std * np.sqrt(TRADING_DAYS)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = (mean * TRADING_DAYS - risk_free_rate) / volatility
+
+    # Growth of 1 invested at the start; days without a return don't move it
+    growth = np.cumprod(1 + np.nan_to_num(returns), axis=0)
+    growth = np.vstack([np.ones(returns.shape[1]), growth])
+    drawdown = (growth / np.maximum.accumulate(growth, axis=0) - 1).min(axis=0)
+
+    nan = np.full(returns.shape[1], np.nan)
+    return {
+        "volatility": np.where(enough, volatility, nan),
+        "volatility_1m": np.where(enough & (recent_n > 1), recent_std * np.sqrt(TRADING_DAYS), nan),
+        "max_drawdown": np.where(enough, drawdown, nan),
+        "sharpe": np.where(enough & (volatility > 0), sharpe, nan),
+        "beta": {b: _beta(returns, benchmark) for b, benchmark in benchmarks.items()},
+    }
+
+
+async def get_risk(db: AsyncSession, user_id: uuid.UUID, benchmark: str = DEFAULT_BENCHMARK) -> dict:
+    """A user's stored risk metrics with betas to benchmark (see risk_tasks)."""
+    result = await db.execute(
+        select(PortfolioRiskMetric.as_of, PortfolioRiskMetric.metrics)
+        .where(PortfolioRiskMetric.user_id == user_id)
+    )
+    row = result.first()
+    response = {"benchmark": benchmark, "benchmark_name": RISK_BENCHMARKS[benchmark]}
+    if row is None:
+        return {**response, "as_of": None, "portfolio": None, "holdings": []}
+
+    def with_beta(metrics: dict) -> dict:
+        return {**{k: v for k, v in metrics.items() if k != "beta"}, "beta": metrics["beta"].get(benchmark)}
+
+    return {
+        **response,
+        "as_of": row.as_of.isoformat(),
+        "portfolio": with_beta(row.metrics["portfolio"]),
+        "holdings": [with_beta(h) for h in row.metrics["holdings"]],
+    }
@@ -0,0 +1,295 @@
+"""Celery tasks maintaining the materialized portfolio_daily_values table.
+
+Each user's rows hold the daily value of their holdings (per category and in
+total, at the quantities held on each day) for the last
+PORTFOLIO_VALUE_HISTORY_DAYS days, stamped with the holdings version they were
+computed from. get_performance reads them instead of rebuilding the series
+from price_history on every request.
+
+- update_portfolio_values runs after fetch_eod_prices writes closes and
+  recomputes the holders of those tickers (see holder_index) from the earliest
+  new close onwards, then bumps those users' holdings versions so only their
+  cached views are recomputed.
+- rebuild_portfolio_values recomputes a user's whole window after a holdings
+  change (or every user's, for a backfill).
+- update_benchmark_series refreshes the benchmark return series shared by every
+  user's performance chart (see benchmark_service) after fetch_eod_prices, and
+  bumps the benchmark version that only views drawing the series are keyed by.
+"""
+import logging
+import os
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import psycopg2.extras
+
+from app.celery_app import celery
+from app.models.portfolio_daily_value import TOTAL_CATEGORY
+from app.services.benchmark_service import BENCHMARK_SERIES_KEY, BENCHMARKS, benchmark_index, encode_series
+from app.services.holder_index import holders_of_sync
+from app.services.portfolio_cache import BENCHMARK_VERSION_KEY, holdings_version_key
+from app.services.portfolio_service import compute_daily_values, priced_tickers
+from app.services.position_service import transaction_event
+from app.tasks.price_tasks import _get_sync_db, _get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+_VALUE_DAYS = int(os.getenv("PORTFOLIO_VALUE_HISTORY_DAYS", "1825"))
+
+
+def load_holdings_by_user_sync(conn, user_ids: list[str] | None = None) -> dict[str, list]:
+    """Active holdings grouped by user id (every user with holdings when user_ids is None)."""
+    query = """
+        SELECT id, user_id, symbol, asset_class_code, exchange, quantity, avg_buy_price
+        FROM holdings
+        WHERE is_active = true
+    """
+    params: tuple = ()
+    if user_ids is not None:
+        query += " AND user_id = ANY(%s::uuid[])"
+        params = (list(user_ids),)
+
+    by_user: dict[str, list] = defaultdict(list)
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(query, params)
+        for row in cur.fetchall():
+            by_user[str(row.pop("user_id"))].append(SimpleNamespace(**row))
+    return by_user
+
+
+def _load_position_events_sync(conn, user_ids: list[str]) -> dict[str, list]:
+    """Dated position events (see position_service) grouped by user id."""
+    events: dict[str, list] = defaultdict(list)
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute("""
+            SELECT id, user_id, holding_id, type, quantity, transaction_date, broker
+            FROM transactions
+            WHERE user_id = ANY(%s::uuid[]) AND transaction_date IS NOT NULL
+        """, (list(user_ids),))
+        for row in cur.fetchall():
+            event = transaction_event(SimpleNamespace(**row))
+            if event is not None:
+                events[str(row["user_id"])].append(event)
+    return events
+
+
+def _get_value_versions_sync(conn, user_ids: list[str]) -> dict[str, tuple[int, int]]:
+    """(min, max) holdings_version of each user's stored rows (users without rows are absent)."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT user_id, MIN(holdings_version), MAX(holdings_version)
+            FROM portfolio_daily_values
+            WHERE user_id = ANY(%s::uuid[])
+            GROUP BY user_id
+        """, (list(user_ids),))
+        return {str(user_id): (lo, hi) for user_id, lo, hi in cur.fetchall()}
+
+
+def _load_price_rows_sync(conn, tickers: list[str], start: date) -> tuple[list[tuple], dict[str, float]]:
+    """price_history (symbol, date, close) rows from start, and each ticker's last close before it."""
+    if not tickers:
+        return [], {}
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT symbol, date, close FROM price_history
+            WHERE symbol = ANY(%s) AND date >= %s
+        """, (tickers, start))
+        rows = cur.fetchall()
+        cur.execute("""
+            SELECT DISTINCT ON (symbol) symbol, close FROM price_history
+            WHERE symbol = ANY(%s) AND date < %s
+            ORDER BY symbol, date DESC
+        """, (tickers, start))
+        seeds = dict(cur.fetchall())
+    return rows, seeds
+
+
+def _write_values_sync(
+    conn, user_id: str, start: date, values: dict[str, list[float]], version: int, replace: bool,
+) -> int:
+    """Replace a user's rows from start (or all of them) with values: category -> daily values."""
+    rows = [
+        (str(uuid.uuid4()), user_id, start + timedelta(days=i), category, value, version)
+        for category, series in values.items()
+        for i, value in enumerate(series)
+    ]
+    with conn.cursor() as cur:
+        if replace:
+            cur.execute("DELETE FROM portfolio_daily_values WHERE user_id = %s", (user_id,))
+        else:
+            cur.execute(
+                "DELETE FROM portfolio_daily_values WHERE user_id = %s AND date >= %s", (user_id, start),
+            )
+        if rows:
+            psycopg2.extras.execute_values(cur, """
+                INSERT INTO portfolio_daily_values (id, user_id, date, category, value, holdings_version)
+                VALUES %s
+            """, rows, page_size=1000)
+    conn.commit()
+    return len(rows)
+
+
+def _bump_value_versions_sync(conn, r, versions: dict[str, int]) -> None:
+    """Invalidate the cached views of users whose values were just written at versions[user].
+
+    Each user's holdings version is bumped and their rows re-stamped with it, so
+    readers keep using them. A user whose version moved on in the meantime (a
+    holdings change, whose queued rebuild writes fresh rows) keeps the old stamp.
+    """
+    if not versions:
+        return
+    user_ids = list(versions)
+    pipe = r.pipeline(transaction=False)
+    for u in user_ids:
+        pipe.incr(holdings_version_key(u))
+    restamp = [
+        (u, versions[u], new) for u, new in zip(user_ids, pipe.execute()) if new == versions[u] + 1
+    ]
+    if restamp:
+        with conn.cursor() as cur:
+            psycopg2.extras.execute_values(cur, """
+                UPDATE portfolio_daily_values AS p SET holdings_version = v.new
+                FROM (VALUES %s) AS v(user_id, old, new)
+                WHERE p.user_id = v.user_id::uuid AND p.holdings_version = v.old
+            """, restamp, page_size=1000)
+        conn.commit()
+
+
+def _materialize_sync(
+    holdings_by_user: dict[str, list], starts: dict[str, date | None], invalidate: bool = False,
+) -> dict:
+    """Recompute each user's values from starts[user] (None: the whole window) and store them.
+
+    Users whose stored rows aren't all from their current holdings version are
+    rebuilt in full whatever their start. Price rows are loaded once for every user.
+    With invalidate, the cached views of the users written are invalidated
+    (see _bump_value_versions_sync).
+    """
+    today = date.today()
+    window_start = today - timedelta(days=_VALUE_DAYS)
+    user_ids = list(starts)
+    if not user_ids:
+        return {"users": 0, "rebuilt": 0, "rows": 0}
+
+    r = _get_sync_redis()
+    conn = _get_sync_db()
+    try:
+        # Versions are read before holdings: a holdings change racing this job
+        # leaves rows stamped with an older version, which readers ignore
+        versions = {u: int(v or 0) for u, v in zip(user_ids, r.mget([holdings_version_key(u) for u in user_ids]))}
+        stored = _get_value_versions_sync(conn, user_ids)
+        for u in user_ids:
+            if stored.get(u) != (versions[u], versions[u]):
+                starts[u] = None
+
+        tickers = sorted({t for u in user_ids for t in priced_tickers(holdings_by_user.get(u, []))})
+        first = min(max(s, window_start) if s else window_start for s in starts.values())
+        price_rows, seeds = _load_price_rows_sync(conn, tickers, first)
+        events = _load_position_events_sync(conn, user_ids)
+
+        rebuilt = written = 0
+        written_versions = {}
+        for u in user_ids:
+            holdings = holdings_by_user.get(u, [])
+            start = max(starts[u], window_start) if starts[u] else window_start
+            values = {}
+            if holdings:
+                # Computed over the shared window, stored from the user's own start
+                total, by_category = compute_daily_values(
+                    holdings, price_rows, first, (today - first).days, seeds, events.get(u, []),
+                )
+                offset = (start - first).days
+                values = {TOTAL_CATEGORY: total[offset:].tolist()}
+                values.update({cat: series[offset:].tolist() for cat, series in by_category.items()})
+            try:
+                written += _write_values_sync(conn, u, start, values, versions[u], replace=starts[u] is None)
+                rebuilt += starts[u] is None
+                written_versions[u] = versions[u]
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Failed to store portfolio values for {u}: {e}")
+
+        if invalidate:
+            _bump_value_versions_sync(conn, r, written_versions)
+        return {"users": len(user_ids), "rebuilt": rebuilt, "rows": written}
+    finally:
+        conn.close()
+        r.close()
+
+
+@celery.task(name="update_portfolio_values")
+def update_portfolio_values(changes: dict[str, str]):
+    """Recompute the stored values of every user holding a ticker with new closes.
+
+    changes maps yf_ticker -> earliest date (ISO) written by the EOD run; each
+    user is recomputed from the earliest change among their tickers.
+    """
+    changed = {ticker: date.fromisoformat(d) for ticker, d in changes.items()}
+    # Only the holders of a changed ticker (everyone while the index is cold)
+    r = _get_sync_redis()
+    try:
+        holders = holders_of_sync(r, list(changed))
+    finally:
+        r.close()
+    conn = _get_sync_db()
+    try:
+        holdings_by_user = load_holdings_by_user_sync(conn, sorted(holders) if holders is not None else None)
+    finally:
+        conn.close()
+
+    starts = {}
+    for user_id, holdings in holdings_by_user.items():
+        affected = [changed[t] for t in priced_tickers(holdings) if t in changed]
+        if affected:
+            starts[user_id] = min(affected)
+
+    # Views these users cached since the EOD run drew the previous values
+    result = _materialize_sync(holdings_by_user, starts, invalidate=True)
+    logger.info(f"Portfolio values updated: {result}")
+    return result
+
+
+@celery.task(name="rebuild_portfolio_values")
+def rebuild_portfolio_values(user_id: str | None = None):
+    """Recompute a user's whole window of values (every user's when user_id is None)."""
+    conn = _get_sync_db()
+    try:
+        holdings_by_user = load_holdings_by_user_sync(conn, [user_id] if user_id else None)
+    finally:
+        conn.close()
+
+    # A user without holdings still gets their old rows cleared
+    user_ids = [user_id] if user_id else list(holdings_by_user)
+    result = _materialize_sync(holdings_by_user, {u: None for u in user_ids})
+    logger.info(f"Portfolio values rebuilt: {result}")
+    return result
+
+
+@celery.task(name="update_benchmark_series")
+def update_benchmark_series():
+    """Rebuild the cached return index of every registered benchmark from price_history."""
+    start = date.today() - timedelta(days=_VALUE_DAYS)
+    tickers = list(BENCHMARKS)
+    conn = _get_sync_db()
+    try:
+        price_rows, _ = _load_price_rows_sync(conn, tickers, start)
+    finally:
+        conn.close()
+
+    series = benchmark_index(price_rows, tickers, start, _VALUE_DAYS)
+    r = _get_sync_redis()
+    try:
+        pipe = r.pipeline()
+        pipe.delete(BENCHMARK_SERIES_KEY)
+        pipe.hset(BENCHMARK_SERIES_KEY, mapping=encode_series(series, start))
+        # Views cached since the EOD run drew the previous series
+        pipe.incr(BENCHMARK_VERSION_KEY)
+        pipe.execute()
+    finally:
+        r.close()
+
+    result = {"benchmarks": len(series), "start": start.isoformat()}
+    logger.info(f"Benchmark series updated: {result}")
+    return result
@@ -1,24 +1,44 @@
 """Celery tasks for fetching and caching market prices."""
 import json
 import logging
+import math
 import os
+import time
 import uuid
-from datetime import datetime, date
+import zlib
+from datetime import datetime, date, timedelta
+from types import SimpleNamespace
 from zoneinfo import ZoneInfo
 
 import psycopg2
 import psycopg2.extras
 import redis as sync_redis
+from celery import chord
+from celery.signals import task_postrun
 
 from app.celery_app import celery
 from app.services.price_service import (
     to_yfinance_ticker,
+    current_price_batch_size,
     fetch_current_prices_batch,
-    fetch_eod_history,
+    fetch_eod_history_since,
     get_previous_close_from_history,
+    price_cache_ttl,
     PRICEABLE_CLASSES,
 )
+from app.services import market_calendar
+from app.services.benchmark_service import BENCHMARKS
+from app.services.holder_index import (
+    add_holder_sync,
+    holding_tickers,
+    reconcile_due_sync,
+    reindex_holders_sync,
+    stale_holders_sync,
+)
 from app.services.mf_resolver import resolve_mf_ticker_sync_cached
+from app.services.portfolio_cache import PRICE_SNAPSHOT_KEY, holdings_version_key
+from app.services import http_client
+from app.services.rate_limiter import get_guard
 
 logger = logging.getLogger(__name__)
 
@@ -33,9 +53,20 @@ if "+asyncpg" in _SYNC_DB_URL:
 
 _REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
 _CACHE_TTL = int(os.getenv("PRICE_CACHE_TTL_SECONDS", "900"))
-_BATCH_SIZE = int(os.getenv("YFINANCE_BATCH_SIZE", "50"))
 _BACKFILL_DAYS = int(os.getenv("PRICE_HISTORY_BACKFILL_DAYS", "365"))
-_MF_CACHE_TTL = 86400  # 24 hours for MF NAV prices
+_SHARD_SIZE = int(os.getenv("PRICE_FETCH_SHARD_SIZE", "200"))
+_HOLDER_INDEX_RECONCILE_SECONDS = int(os.getenv("HOLDER_INDEX_RECONCILE_SECONDS", "21600"))
+
+# Weighted refresh scheduling for fetch_current_prices
+_REFRESH_CYCLE_SECONDS = 900  # beat period of fetch_current_prices in INDIA/US sessions
+_OFF_SESSION_INTERVAL = int(os.getenv("PRICE_OFF_SESSION_INTERVAL_SECONDS", "3600"))
+_REFRESH_MAX_CYCLES = int(os.getenv("PRICE_REFRESH_MAX_CYCLES", "8"))
+_REFRESH_REQUEST_BUDGET = int(os.getenv("PRICE_REFRESH_REQUEST_BUDGET", "40"))
+_REFRESH_KEY = "price_refresh:last"  # hash: yf_ticker -> epoch seconds of last successful fetch
+
+# Fleet-wide jobs owed by EOD runs, queued after the day's last equity close
+_EOD_PENDING_KEY = "eod:pending"  # set of "risk", "benchmarks"
+_EQUITY_GROUPS = ("INDIA", "US")
 
 # Market groups: maps asset class codes to scheduling groups
 _MARKET_GROUPS = {
@@ -47,20 +78,14 @@ _MARKET_GROUPS = {
 }
 
 # Benchmark tickers mapped to market groups
-_BENCHMARK_MARKET_GROUPS = {
-    "^NSEI": "INDIA",
-    "^BSESN": "INDIA",
-    "^GSPC": "US",
-    "GC=F": "US",
-    "BTC-INR": "ALWAYS",
-}
+_BENCHMARK_MARKET_GROUPS = {t: b["market_group"] for t, b in BENCHMARKS.items()}
 
 
 def _is_market_open(group: str) -> bool:
     """Check if a market group should be fetched right now.
 
-    INDIA: Mon-Fri, 8:45 AM - 4:00 PM IST (with 30-min buffer → 8:15 - 16:30)
-    US: Mon-Fri, 9:00 AM - 4:30 PM ET (with 30-min buffer → 8:30 - 17:00)
+    INDIA / US: inside an exchange session per market_calendar (holidays and
+    half days included), widened by SESSION_BUFFER on both sides
     ALWAYS: Always returns True (crypto, 24/7)
     MF_DAILY: Always returns False (handled by dedicated daily task)
     """
@@ -68,24 +93,8 @@ def _is_market_open(group: str) -> bool:
         return True
     if group == "MF_DAILY":
         return False
-
-    now_utc = datetime.now(ZoneInfo("UTC"))
-
-    if group == "INDIA":
-        now_ist = now_utc.astimezone(ZoneInfo("Asia/Kolkata"))
-        if now_ist.weekday() >= 5:  # Saturday=5, Sunday=6
-            return False
-        hour_min = now_ist.hour * 60 + now_ist.minute
-        return (8 * 60 + 15) <= hour_min <= (16 * 60 + 30)
-
-    if group == "US":
-        now_et = now_utc.astimezone(ZoneInfo("America/New_York"))
-        if now_et.weekday() >= 5:
-            return False
-        hour_min = now_et.hour * 60 + now_et.minute
-        return (8 * 60 + 30) <= hour_min <= (17 * 60)
-
-    return False
+    buffer = market_calendar.SESSION_BUFFER
+    return market_calendar.is_open(group, pre=buffer, post=buffer)
 
 
 def _get_sync_db():
@@ -101,36 +110,98 @@ def _get_sync_redis():
 def _get_all_tickers_sync() -> list[dict]:
     """Query distinct priceable holdings from the DB.
 
-    Returns list of {symbol, asset_class_code, exchange, yf_ticker}.
+    Returns list of {symbol, asset_class_code, exchange, yf_ticker, user_ids, exposure},
+    user_ids being the distinct users holding the row and exposure its market
+    value: summed quantity at the last price in market_data (cost basis until the
+    ticker has one).
+    The holder index is reconciled with the holdings on the way when due (see holder_index).
     """
     conn = _get_sync_db()
     try:
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
             cur.execute("""
-                SELECT DISTINCT symbol, asset_class_code, exchange
+                SELECT symbol, asset_class_code, exchange,
+                       ARRAY_AGG(DISTINCT user_id::text) AS user_ids,
+                       COALESCE(SUM(quantity), 0) AS quantity,
+                       COALESCE(SUM(quantity * avg_buy_price), 0) AS cost_basis
                 FROM holdings
                 WHERE is_active = true AND symbol IS NOT NULL
+                GROUP BY symbol, asset_class_code, exchange
             """)
-            rows = cur.fetchall()
+            rows = [
+                {**row, "yf_ticker": to_yfinance_ticker(row["symbol"], row["asset_class_code"], row.get("exchange"))}
+                for row in cur.fetchall() if row["asset_class_code"] in PRICEABLE_CLASSES
+            ]
+            rows = [row for row in rows if row["yf_ticker"]]
+            cur.execute("""
+                SELECT symbol, current_price FROM market_data
+                WHERE symbol = ANY(%s) AND current_price IS NOT NULL AND current_price <> 0
+            """, (sorted({row["yf_ticker"] for row in rows}),))
+            last_prices = {md["symbol"]: float(md["current_price"]) for md in cur.fetchall()}
     finally:
         conn.close()
 
     tickers = []
+    user_tickers: dict[str, set[str]] = {}
     for row in rows:
-        if row["asset_class_code"] not in PRICEABLE_CLASSES:
-            continue
-        yf_ticker = to_yfinance_ticker(row["symbol"], row["asset_class_code"], row.get("exchange"))
-        if yf_ticker:
-            tickers.append({
-                "symbol": row["symbol"],
-                "asset_class_code": row["asset_class_code"],
-                "exchange": row.get("exchange"),
-                "yf_ticker": yf_ticker,
-            })
-
+        yf_ticker = row["yf_ticker"]
+        price = last_prices.get(yf_ticker)
+        tickers.append({
+            "symbol": row["symbol"],
+            "asset_class_code": row["asset_class_code"],
+            "exchange": row.get("exchange"),
+            "yf_ticker": yf_ticker,
+            "user_ids": row["user_ids"],
+            "exposure": float(row["quantity"]) * price if price else float(row["cost_basis"]),
+        })
+        for user_id in row["user_ids"]:
+            user_tickers.setdefault(user_id, set()).add(yf_ticker)
+
+    _reconcile_holder_index_sync(user_tickers)
     return tickers
 
 
+def _load_user_tickers_sync(user_ids: list[str]) -> dict[str, set[str]]:
+    """user id -> Yahoo tickers of the user's active priceable holdings (users holding none left out)."""
+    conn = _get_sync_db()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute("""
+                SELECT user_id::text AS user_id, symbol, asset_class_code, exchange FROM holdings
+                WHERE is_active = true AND symbol IS NOT NULL AND user_id = ANY(%s::uuid[])
+            """, (user_ids,))
+            rows = cur.fetchall()
+    finally:
+        conn.close()
+
+    by_user: dict[str, list] = {}
+    for row in rows:
+        by_user.setdefault(row["user_id"], []).append(SimpleNamespace(**row))
+    return {u: tickers for u, holdings in by_user.items() if (tickers := holding_tickers(holdings))}
+
+
+def _reconcile_holder_index_sync(user_tickers: dict[str, set[str]]) -> None:
+    """Re-index the users whose index entry differs from user_tickers, at most once per interval.
+
+    user_tickers may predate a holdings change the index already reflects, so
+    the differing users are re-read from the DB after their entries are, and
+    an entry that changed again in between is left alone.
+    """
+    r = _get_sync_redis()
+    try:
+        if not reconcile_due_sync(r, _HOLDER_INDEX_RECONCILE_SECONDS):
+            return
+        stale = stale_holders_sync(r, user_tickers)
+        if stale:
+            current = _load_user_tickers_sync(sorted(stale))
+            reindexed = reindex_holders_sync(r, {u: current.get(u, set()) for u in stale}, stale)
+            logger.info(f"Holder index reconciled: {reindexed} of {len(stale)} stale users re-indexed")
+    except sync_redis.RedisError as e:
+        logger.warning(f"Failed to reconcile the holder index: {e}")
+    finally:
+        r.close()
+
+
 def _upsert_market_data_sync(prices: dict[str, dict]) -> None:
     """Write current prices to market_data table (ON CONFLICT upsert)."""
     if not prices:
@@ -164,74 +235,285 @@ def _upsert_market_data_sync(prices: dict[str, dict]) -> None:
         conn.close()
 
 
-def _upsert_price_history_sync(ticker: str, asset_class_code: str, rows: list[dict]) -> None:
-    """Write EOD OHLCV rows to price_history table."""
-    if not rows:
-        return
+def _upsert_price_history_bulk_sync(history: dict[str, list[dict]], asset_classes: dict[str, str]) -> int:
+    """Write EOD OHLCV rows for many tickers to price_history in one round trip.
+
+    Returns the number of rows written.
+    """
+    values = {}
+    for ticker, rows in history.items():
+        for row in rows:
+            # Keyed by (symbol, date): ON CONFLICT can't touch the same row twice in one statement
+            values[(ticker, row["date"])] = (
+                str(uuid.uuid4()),
+                ticker,
+                asset_classes.get(ticker, ""),
+                row["date"],
+                row.get("open"),
+                row.get("high"),
+                row.get("low"),
+                row["close"],
+                row.get("volume"),
+            )
+    if not values:
+        return 0
 
     conn = _get_sync_db()
     try:
         with conn.cursor() as cur:
-            for row in rows:
-                cur.execute("""
-                    INSERT INTO price_history (id, symbol, asset_class_code, date, open, high, low, close, volume)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT ON CONSTRAINT uq_price_history_symbol_date
-                    DO UPDATE SET
-                        open = EXCLUDED.open,
-                        high = EXCLUDED.high,
-                        low = EXCLUDED.low,
-                        close = EXCLUDED.close,
-                        volume = EXCLUDED.volume
-                """, (
-                    str(uuid.uuid4()),
-                    ticker,
-                    asset_class_code,
-                    row["date"],
-                    row.get("open"),
-                    row.get("high"),
-                    row.get("low"),
-                    row["close"],
-                    row.get("volume"),
-                ))
+            psycopg2.extras.execute_values(cur, """
+                INSERT INTO price_history (id, symbol, asset_class_code, date, open, high, low, close, volume)
+                VALUES %s
+                ON CONFLICT ON CONSTRAINT uq_price_history_symbol_date
+                DO UPDATE SET
+                    open = EXCLUDED.open,
+                    high = EXCLUDED.high,
+                    low = EXCLUDED.low,
+                    close = EXCLUDED.close,
+                    volume = EXCLUDED.volume
+            """, list(values.values()), page_size=1000)
         conn.commit()
+        return len(values)
     except Exception as e:
         conn.rollback()
-        logger.error(f"Failed to upsert price_history for {ticker}: {e}")
+        logger.error(f"Failed to upsert price_history: {e}")
+        return 0
     finally:
         conn.close()
 
 
-def _ticker_has_history_sync(ticker: str) -> bool:
-    """Check if a ticker already has price_history data."""
+def _get_history_watermarks_sync(tickers: list[str]) -> dict[str, date]:
+    """Latest stored price_history date per ticker (tickers with no history are absent)."""
+    if not tickers:
+        return {}
+
     conn = _get_sync_db()
     try:
         with conn.cursor() as cur:
-            cur.execute("SELECT 1 FROM price_history WHERE symbol = %s LIMIT 1", (ticker,))
-            return cur.fetchone() is not None
+            cur.execute("""
+                SELECT symbol, MAX(date)
+                FROM price_history
+                WHERE symbol = ANY(%s)
+                GROUP BY symbol
+            """, (list(tickers),))
+            return {symbol: max_date for symbol, max_date in cur.fetchall()}
     finally:
         conn.close()
 
 
+def _last_completed_session(group: str, now: datetime | None = None) -> date:
+    """Most recent date whose daily bar is final for a market group."""
+    return market_calendar.last_completed_session(group, now)
+
+
+def _ticker_market_group(t: dict) -> str:
+    return _BENCHMARK_MARKET_GROUPS.get(t["yf_ticker"]) or _MARKET_GROUPS.get(t["asset_class_code"], "ALWAYS")
+
+
+def _plan_eod_fetch(
+    ticker_info: list[dict],
+    watermarks: dict[str, date],
+    now: datetime | None = None,
+) -> tuple[dict[str, date], dict[str, int]]:
+    """Compute each ticker's fetch start date from its price_history watermark.
+
+    - no history: backfill PRICE_HISTORY_BACKFILL_DAYS
+    - watermark before the last completed session: fetch from the watermark
+      (inclusive, so a bar stored mid-session gets its final close)
+    - already current: skipped
+
+    Returns ({ticker: start_date}, {"backfill": n, "update": n, "current": n}).
+    """
+    now = now or datetime.now(ZoneInfo("UTC"))
+    today = now.astimezone(ZoneInfo("UTC")).date()
+    starts: dict[str, date] = {}
+    counts = {"backfill": 0, "update": 0, "current": 0}
+
+    for t in ticker_info:
+        ticker = t["yf_ticker"]
+        if ticker in starts:
+            continue
+        watermark = watermarks.get(ticker)
+        if watermark is None:
+            starts[ticker] = today - timedelta(days=_BACKFILL_DAYS)
+            counts["backfill"] += 1
+        elif watermark < _last_completed_session(_ticker_market_group(t), now):
+            starts[ticker] = watermark
+            counts["update"] += 1
+        else:
+            counts["current"] += 1
+
+    return starts, counts
+
+
+def _equity_close_ahead(now: datetime | None = None) -> bool:
+    """Whether an INDIA or US session closes later in the current UTC day."""
+    utc = ZoneInfo("UTC")
+    now = now or datetime.now(utc)
+    midnight = datetime.combine(now.astimezone(utc).date() + timedelta(days=1), datetime.min.time(), utc)
+    return any(market_calendar.next_close(g, now) < midnight for g in _EQUITY_GROUPS)
+
+
+def _shard_tickers(tickers_by_group: dict[str, list[str]], shard_size: int = _SHARD_SIZE) -> list[list[str]]:
+    """Split each market group's tickers into hash-assigned shards of ~shard_size.
+
+    Shards never mix market groups, and a ticker lands in the same shard for as
+    long as its group's shard count is unchanged (crc32 is stable across processes).
+    """
+    shards = []
+    for group in sorted(tickers_by_group):
+        tickers = list(dict.fromkeys(tickers_by_group[group]))
+        if not tickers:
+            continue
+        n = -(-len(tickers) // max(shard_size, 1))
+        buckets: list[list[str]] = [[] for _ in range(n)]
+        for ticker in tickers:
+            buckets[zlib.crc32(ticker.encode()) % n].append(ticker)
+        shards.extend(b for b in buckets if b)
+    return shards
+
+
+def _refresh_cycles(holders: int, exposure: float, max_holders: int, max_exposure: float) -> int:
+    """Refresh interval of a ticker, in fetch_current_prices cycles.
+
+    Weight is the mean of log-scaled holder count and exposure relative to the
+    most-held / largest ticker in the universe: weight 1 refreshes every cycle,
+    weight 0 every PRICE_REFRESH_MAX_CYCLES cycles, in power-of-two steps.
+    Exposure is summed across currencies, as the portfolio totals are.
+    """
+    max_cycles = max(_REFRESH_MAX_CYCLES, 1)
+    h = math.log1p(holders) / math.log1p(max_holders) if max_holders > 0 else 0.0
+    e = math.log1p(max(exposure, 0.0)) / math.log1p(max_exposure) if max_exposure > 0 else 0.0
+    weight = min((h + e) / 2, 1.0)
+    return min(2 ** round((1 - weight) * math.log2(max_cycles)), max_cycles)
+
+
+def _refresh_candidates(open_info: list[dict]) -> list[dict]:
+    """Collapse open-market ticker rows into one candidate per yf_ticker with its interval.
+
+    Rows are {yf_ticker, group, user_ids, exposure} or {yf_ticker, group, pinned: True}
+    (benchmarks); pinned tickers refresh every cycle. A user holding several
+    rows of one yf_ticker (e.g. under two exchanges) counts once; their
+    exposures add up. Returns [{yf_ticker, group, holders, exposure, cycles}].
+    """
+    merged: dict[str, dict] = {}
+    for t in open_info:
+        c = merged.setdefault(t["yf_ticker"], {
+            "yf_ticker": t["yf_ticker"], "group": t["group"], "user_ids": set(), "exposure": 0.0, "pinned": False,
+        })
+        c["user_ids"].update(t.get("user_ids", ()))
+        c["exposure"] += t.get("exposure", 0.0)
+        c["pinned"] = c["pinned"] or t.get("pinned", False)
+
+    held = [c for c in merged.values() if not c["pinned"]]
+    max_holders = max((len(c["user_ids"]) for c in held), default=0)
+    max_exposure = max((c["exposure"] for c in held), default=0.0)
+
+    candidates = []
+    for c in merged.values():
+        holders = len(c["user_ids"])
+        candidates.append({
+            "yf_ticker": c["yf_ticker"], "group": c["group"], "holders": holders, "exposure": c["exposure"],
+            "cycles": 1 if c["pinned"] else _refresh_cycles(holders, c["exposure"], max_holders, max_exposure),
+        })
+    return candidates
+
+
+def _plan_refresh(
+    candidates: list[dict],
+    last_refreshed: dict[str, float],
+    now: float,
+    max_tickers: int,
+) -> tuple[list[dict], int]:
+    """Pick the candidates due this cycle, most overdue first, capped at max_tickers.
+
+    A ticker is due once its age reaches its interval, less half a cycle of slack
+    (its stamp is written when the previous cycle finishes, not when it starts).
+    Never-fetched tickers come first. Returns (selected, deferred), where deferred
+    counts due tickers left for a later cycle by the cap.
+    """
+    due = []
+    for c in candidates:
+        interval = c["cycles"] * _REFRESH_CYCLE_SECONDS
+        last = last_refreshed.get(c["yf_ticker"])
+        age = math.inf if last is None else now - last
+        if age >= interval - _REFRESH_CYCLE_SECONDS / 2:
+            due.append((age / interval, -c["cycles"], c))
+
+    due.sort(key=lambda d: (d[0], d[1]), reverse=True)
+    selected = [c for _, _, c in due[:max(max_tickers, 0)]]
+    return selected, len(due) - len(selected)
+
+
+def _shard_within_budget(
+    selected: list[dict], batch_size: int, max_requests: int,
+) -> tuple[list[list[str]], int]:
+    """Shard the selected candidates (most overdue first) for at most max_requests requests.
+
+    Every shard is fetched in batch_size requests of its own, so a partial batch
+    per shard counts as a whole request. The least overdue candidates are dropped
+    until the shards fit. Returns (shards, dropped).
+    """
+    keep = len(selected)
+    while True:
+        by_group: dict[str, list[str]] = {}
+        for c in selected[:keep]:
+            by_group.setdefault(c["group"], []).append(c["yf_ticker"])
+        shards = _shard_tickers(by_group)
+        over = sum(-(-len(s) // batch_size) for s in shards) - max_requests
+        if over <= 0:
+            return shards, len(selected) - keep
+        keep = max(keep - over, 0)
+
+
+def _get_last_refreshed_sync(r, tickers: list[str]) -> dict[str, float]:
+    """Epoch seconds of each ticker's last successful current-price fetch."""
+    if not tickers:
+        return {}
+    values = r.hmget(_REFRESH_KEY, tickers)
+    return {t: float(v) for t, v in zip(tickers, values) if v is not None}
+
+
 @celery.task(name="fetch_current_prices")
 def fetch_current_prices():
-    """Fetch current prices for open-market tickers only. Runs every 15 minutes.
+    """Fetch current prices for open-market tickers only.
+
+    Beat runs it every 15 minutes while an INDIA or US session is open and every
+    PRICE_OFF_SESSION_INTERVAL_SECONDS otherwise, for 24/7 crypto
+    (MarketSessionSchedule).
 
     Partitions tickers by market group and skips closed markets.
     MF tickers are always excluded (handled by fetch_mf_nav daily task).
+    If Yahoo's circuit is open the cycle is skipped and cached prices are left as-is.
+
+    Each ticker has its own refresh interval (every cycle for widely held or
+    large positions, down to every PRICE_REFRESH_MAX_CYCLES cycles for rarely
+    held, small ones),
+    and a cycle makes at most PRICE_REFRESH_REQUEST_BUDGET quote requests,
+    spent on the most overdue tickers: a batch each while the batch quote
+    endpoint is available, one per ticker while it is suspended.
+
+    The open tickers are split into shards fetched as a chord of
+    fetch_price_shard subtasks (one per free worker); finalize_price_cycle
+    writes Redis and market_data once every shard has reported.
     """
+    guard = get_guard()
+    if guard.is_open("yahoo"):
+        logger.warning("Yahoo circuit open, skipping price cycle.")
+        return {"fetched": 0, "total": 0, "skipped": "circuit_open"}
+
     ticker_info = _get_all_tickers_sync()
     if not ticker_info:
         logger.info("No priceable tickers found.")
         return
 
     # Partition tickers by market group, filter to open markets only
-    open_tickers = []
+    open_info = []
     skipped_groups = set()
     for t in ticker_info:
         group = _MARKET_GROUPS.get(t["asset_class_code"], "ALWAYS")
         if _is_market_open(group):
-            open_tickers.append(t["yf_ticker"])
+            open_info.append({**t, "group": group})
         else:
             skipped_groups.add(group)
 
@@ -239,63 +521,175 @@ def fetch_current_prices():
     for bench in BENCHMARK_TICKERS:
         group = _BENCHMARK_MARKET_GROUPS.get(bench["yf_ticker"], "ALWAYS")
         if _is_market_open(group):
-            open_tickers.append(bench["yf_ticker"])
+            open_info.append({"yf_ticker": bench["yf_ticker"], "group": group, "pinned": True})
         else:
             skipped_groups.add(group)
 
     if skipped_groups:
         logger.info(f"Skipped closed market groups: {', '.join(sorted(skipped_groups))}")
 
-    if not open_tickers:
+    if not open_info:
         logger.info("All markets closed, no tickers to fetch.")
         return {"fetched": 0, "total": 0, "skipped_groups": list(skipped_groups)}
 
-    logger.info(f"Fetching current prices for {len(open_tickers)} tickers (open markets)")
+    # Pick the tickers due this cycle within the request budget
+    candidates = _refresh_candidates(open_info)
+    r = _get_sync_redis()
+    try:
+        last_refreshed = _get_last_refreshed_sync(r, [c["yf_ticker"] for c in candidates])
+    finally:
+        r.close()
+    batch_size = current_price_batch_size(guard)
+    selected, deferred = _plan_refresh(
+        candidates, last_refreshed, time.time(), _REFRESH_REQUEST_BUDGET * batch_size
+    )
+    shards, dropped = _shard_within_budget(selected, batch_size, _REFRESH_REQUEST_BUDGET)
+    selected = selected[:len(selected) - dropped]
+    deferred += dropped
+    if deferred:
+        logger.warning(f"Request budget reached, deferred {deferred} due tickers to a later cycle")
+
+    open_groups = {c["group"] for c in selected}
+    # Prices must stay cached until their next refresh: slower tickers, the
+    # off-session cycle for 24/7 markets, and the next open for markets that
+    # close before then
+    cycle = _REFRESH_CYCLE_SECONDS if open_groups - {"ALWAYS"} else _OFF_SESSION_INTERVAL
+    ttl_by_interval: dict[tuple[str, int], int] = {}
+    ttls = {}
+    for c in selected:
+        key = (c["group"], max(c["cycles"] * _REFRESH_CYCLE_SECONDS, cycle))
+        if key not in ttl_by_interval:
+            ttl_by_interval[key] = price_cache_ttl(*key)
+        ttls[c["yf_ticker"]] = ttl_by_interval[key]
+
+    total = sum(len(s) for s in shards)
+    if not shards:
+        logger.info(f"No tickers due this cycle ({len(candidates)} open).")
+        return {"fetched": 0, "total": 0, "skipped_groups": list(skipped_groups)}
 
-    # Process in batches
+    logger.info(
+        f"Fetching current prices for {total}/{len(candidates)} open-market tickers "
+        f"due this cycle in {len(shards)} shards"
+    )
+    chord(fetch_price_shard.s(shard) for shard in shards)(
+        finalize_price_cycle.s(total=total, skipped_groups=sorted(skipped_groups), ttls=ttls)
+    )
+    return {
+        "shards": len(shards),
+        "total": total,
+        "deferred": deferred,
+        "skipped_groups": list(skipped_groups),
+    }
+
+
+@task_postrun.connect
+def _publish_http_stats(**_):
+    """Add the finished task's provider traffic to the shared counters the API reports."""
+    if not any(n for metrics in http_client.stats.snapshot().values() for n in metrics.values()):
+        return
+    r = _get_sync_redis()
+    try:
+        http_client.publish_stats(r)
+    except sync_redis.RedisError as e:
+        logger.warning(f"Failed to publish HTTP stats: {e}")
+    finally:
+        r.close()
+
+
+@celery.task(name="fetch_price_shard", soft_time_limit=300)
+def fetch_price_shard(tickers: list[str]) -> dict[str, dict]:
+    """Fetch current prices for one shard of fetch_current_prices.
+
+    Never raises: a failed shard returns {} so the chord still completes and
+    the other shards' prices are written.
+    """
+    try:
+        return fetch_current_prices_batch(tickers, guard=get_guard())
+    except Exception as e:
+        logger.error(f"Price shard of {len(tickers)} tickers failed: {e}")
+        return {}
+
+
+@celery.task(name="finalize_price_cycle")
+def finalize_price_cycle(
+    shard_results: list[dict],
+    total: int = 0,
+    skipped_groups: list[str] | None = None,
+    ttls: dict[str, int] | None = None,
+):
+    """Chord callback: merge shard results, then write Redis and market_data once.
+
+    Queues warm_portfolio_views to cache every portfolio's summary and allocation
+    at the new prices.
+
+    ttls holds each ticker's market-aware cache TTL (price_cache_ttl); tickers
+    without one use PRICE_CACHE_TTL_SECONDS. Fetched tickers get their refresh
+    stamp, so failed ones stay due for the next cycle.
+    """
+    ttls = ttls or {}
     all_prices = {}
-    for i in range(0, len(open_tickers), _BATCH_SIZE):
-        batch = open_tickers[i:i + _BATCH_SIZE]
-        prices = fetch_current_prices_batch(batch)
-        all_prices.update(prices)
+    for result in shard_results:
+        all_prices.update(result or {})
+
+    failed = sum(1 for result in shard_results if not result)
+    if failed:
+        logger.warning(f"{failed}/{len(shard_results)} price shards returned nothing")
 
     if not all_prices:
-        logger.warning("No prices returned from yfinance.")
-        return
+        logger.warning("No prices returned from Yahoo.")
+        return {"fetched": 0, "total": total, "skipped_groups": skipped_groups or []}
 
     # Write to Redis cache
     r = _get_sync_redis()
     pipe = r.pipeline()
     for ticker, data in all_prices.items():
-        pipe.setex(f"price:{ticker}", _CACHE_TTL, json.dumps(data))
+        pipe.setex(f"price:{ticker}", max(_CACHE_TTL, ttls.get(ticker, 0)), json.dumps(data))
+    now = time.time()
+    pipe.hset(_REFRESH_KEY, mapping={ticker: now for ticker in all_prices})
+    pipe.incr(PRICE_SNAPSHOT_KEY)  # new prices: cached portfolio views are superseded
     pipe.execute()
     r.close()
 
     # Persist to market_data table
     _upsert_market_data_sync(all_prices)
+    # Value every portfolio at the new prices before users ask
+    celery.send_task("warm_portfolio_views")
 
     logger.info(f"Cached and persisted prices for {len(all_prices)} tickers")
-    return {"fetched": len(all_prices), "total": len(open_tickers), "skipped_groups": list(skipped_groups)}
+    return {
+        "fetched": len(all_prices),
+        "total": total,
+        "failed_shards": failed,
+        "skipped_groups": skipped_groups or [],
+    }
 
 
-BENCHMARK_TICKERS = [
-    {"yf_ticker": "^NSEI", "asset_class_code": "INDEX"},    # Nifty 50
-    {"yf_ticker": "^BSESN", "asset_class_code": "INDEX"},   # Sensex
-    {"yf_ticker": "^GSPC", "asset_class_code": "INDEX"},     # S&P 500
-    {"yf_ticker": "GC=F", "asset_class_code": "COMMODITY"},  # Gold futures
-    {"yf_ticker": "BTC-INR", "asset_class_code": "CRYPTO"},  # Bitcoin
-]
+# Every registered benchmark (see benchmark_service)
+BENCHMARK_TICKERS = [{"yf_ticker": t, "asset_class_code": b["asset_class_code"]} for t, b in BENCHMARKS.items()]
 
 
 @celery.task(name="fetch_eod_prices")
 def fetch_eod_prices():
-    """Fetch end-of-day OHLCV data. Runs daily after market close.
+    """Fetch end-of-day OHLCV data.
+
+    Beat runs it PRICE_EOD_DELAY_MINUTES after each INDIA, US and MF_DAILY close
+    on trading days and after each UTC midnight for crypto (MarketCloseSchedule).
 
-    Auto-backfills 1 year of history for new tickers.
-    Also fetches benchmark index data (Nifty 50, Sensex).
+    Downloads only the days after each ticker's price_history watermark,
+    backfills PRICE_HISTORY_BACKFILL_DAYS for new tickers and skips tickers
+    that are already current. Also fetches benchmark index data.
+
+    New closes queue update_portfolio_values for their tickers' holders at
+    once; the fleet-wide risk and benchmark rebuilds are deferred to the run
+    after the day's last equity close (US, or INDIA when the US is closed).
     """
     ticker_info = _get_all_tickers_sync()
 
+    guard = get_guard()
+    if guard.is_open("yahoo"):
+        logger.warning("Yahoo circuit open, skipping EOD fetch.")
+        return {"backfilled": 0, "updated": 0, "current": 0, "rows": 0, "skipped": "circuit_open"}
+
     # Add benchmark tickers
     all_ticker_info = list(ticker_info) + BENCHMARK_TICKERS
 
@@ -303,46 +697,48 @@ def fetch_eod_prices():
         logger.info("No tickers found for EOD fetch.")
         return
 
-    # Separate tickers needing backfill vs incremental update
-    backfill_tickers = []
-    update_tickers = []
-
-    for t in all_ticker_info:
-        if _ticker_has_history_sync(t["yf_ticker"]):
-            update_tickers.append(t)
-        else:
-            backfill_tickers.append(t)
-
-    total_rows = 0
-
-    # Backfill new tickers (1 year)
-    if backfill_tickers:
-        logger.info(f"Backfilling {len(backfill_tickers)} new tickers with 1y history")
-        yf_tickers = [t["yf_ticker"] for t in backfill_tickers]
-        ticker_map = {t["yf_ticker"]: t["asset_class_code"] for t in backfill_tickers}
-
-        for i in range(0, len(yf_tickers), _BATCH_SIZE):
-            batch = yf_tickers[i:i + _BATCH_SIZE]
-            history = fetch_eod_history(batch, period="1y")
-            for ticker, rows in history.items():
-                _upsert_price_history_sync(ticker, ticker_map.get(ticker, ""), rows)
-                total_rows += len(rows)
-
-    # Incremental update for existing tickers (last 5 days)
-    if update_tickers:
-        logger.info(f"Updating EOD for {len(update_tickers)} existing tickers")
-        yf_tickers = [t["yf_ticker"] for t in update_tickers]
-        ticker_map = {t["yf_ticker"]: t["asset_class_code"] for t in update_tickers}
-
-        for i in range(0, len(yf_tickers), _BATCH_SIZE):
-            batch = yf_tickers[i:i + _BATCH_SIZE]
-            history = fetch_eod_history(batch, period="5d")
-            for ticker, rows in history.items():
-                _upsert_price_history_sync(ticker, ticker_map.get(ticker, ""), rows)
-                total_rows += len(rows)
+    # One grouped query for every ticker's latest stored date
+    watermarks = _get_history_watermarks_sync([t["yf_ticker"] for t in all_ticker_info])
+    starts, counts = _plan_eod_fetch(all_ticker_info, watermarks)
+    logger.info(
+        f"EOD plan: {counts['backfill']} backfill, {counts['update']} incremental, "
+        f"{counts['current']} already current"
+    )
+
+    asset_classes = {t["yf_ticker"]: t["asset_class_code"] for t in all_ticker_info}
+    history = fetch_eod_history_since(starts, guard=guard)
+    total_rows = _upsert_price_history_bulk_sync(history, asset_classes)
+    r = _get_sync_redis()
+    try:
+        if total_rows:
+            # Performance views are built from price_history
+            r.incr(PRICE_SNAPSHOT_KEY)
+            # Recompute the stored values of the changed tickers' holders from each one's earliest new close
+            changes = {t: min(row["date"] for row in rows) for t, rows in history.items() if rows}
+            celery.send_task("update_portfolio_values", args=[changes])
+            # Risk metrics and benchmark series are rebuilt for the whole fleet:
+            # once a day, after the last equity close
+            r.sadd(_EOD_PENDING_KEY, "risk", *(["benchmarks"] if set(changes) & set(BENCHMARKS) else []))
+
+        if not _equity_close_ahead():
+            pipe = r.pipeline()
+            pipe.smembers(_EOD_PENDING_KEY)
+            pipe.delete(_EOD_PENDING_KEY)
+            pending, _ = pipe.execute()
+            if "benchmarks" in pending:
+                celery.send_task("update_benchmark_series")
+            if "risk" in pending:
+                celery.send_task("update_risk_metrics")
+    finally:
+        r.close()
 
     logger.info(f"EOD fetch complete: {total_rows} rows written")
-    return {"backfilled": len(backfill_tickers), "updated": len(update_tickers), "rows": total_rows}
+    return {
+        "backfilled": counts["backfill"],
+        "updated": counts["update"],
+        "current": counts["current"],
+        "rows": total_rows,
+    }
 
 
 @celery.task(name="resolve_mf_symbols")
@@ -358,7 +754,7 @@ def resolve_mf_symbols():
     try:
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
             cur.execute("""
-                SELECT id, name FROM holdings
+                SELECT id, user_id, name FROM holdings
                 WHERE asset_class_code = 'MUTUAL_FUND'
                   AND (symbol IS NULL OR symbol = '')
                   AND is_active = true
@@ -371,6 +767,7 @@ def resolve_mf_symbols():
 
         logger.info(f"Attempting to resolve {len(unresolved)} MF holdings")
         resolved_count = 0
+        changed_users = set()
 
         for row in unresolved:
             holding_id = row["id"]
@@ -387,6 +784,9 @@ def resolve_mf_symbols():
                             (result["yf_ticker"], holding_id),
                         )
                     conn.commit()
+                    r.incr(holdings_version_key(row["user_id"]))
+                    add_holder_sync(r, str(row["user_id"]), to_yfinance_ticker(result["yf_ticker"], "MUTUAL_FUND"))
+                    changed_users.add(str(row["user_id"]))
                     resolved_count += 1
                     logger.info(f"Resolved MF '{fund_name}' → {result['yf_ticker']}")
                 except Exception as e:
@@ -395,6 +795,11 @@ def resolve_mf_symbols():
             else:
                 logger.info(f"Could not resolve MF '{fund_name}'")
 
+        # Newly priced holdings change every stored portfolio value of their users
+        for user_id in changed_users:
+            celery.send_task("rebuild_portfolio_values", args=[user_id])
+            celery.send_task("update_risk_metrics", args=[user_id])
+
         return {"resolved": resolved_count, "total": len(unresolved)}
     finally:
         r.close()
@@ -405,8 +810,9 @@ def resolve_mf_symbols():
 def fetch_mf_nav():
     """Fetch daily MF NAVs with corrected previous_close from price_history.
 
-    Runs once daily at 18:00 UTC (11:30 PM IST), after NAV declaration and
-    after the EOD task (16:30 UTC) has populated price_history.
+    Beat runs it NAV_FETCH_DELAY after the MF_DAILY close on NSE trading days
+    (23:30 IST, once NAVs are declared), after the EOD run for that close has
+    populated price_history.
 
     Yahoo's chartPreviousClose returns the same value as regularMarketPrice for
     MF tickers, so we override previous_close with the most recent close from
@@ -419,15 +825,16 @@ def fetch_mf_nav():
         logger.info("No MF tickers found.")
         return {"fetched": 0}
 
+    guard = get_guard()
+    if guard.is_open("yahoo"):
+        logger.warning("Yahoo circuit open, skipping MF NAV fetch.")
+        return {"fetched": 0, "skipped": "circuit_open"}
+
     yf_tickers = [t["yf_ticker"] for t in mf_tickers]
     logger.info(f"Fetching MF NAVs for {len(yf_tickers)} tickers")
 
     # Fetch current NAVs from Yahoo
-    all_prices = {}
-    for i in range(0, len(yf_tickers), _BATCH_SIZE):
-        batch = yf_tickers[i:i + _BATCH_SIZE]
-        prices = fetch_current_prices_batch(batch)
-        all_prices.update(prices)
+    all_prices = fetch_current_prices_batch(yf_tickers, guard=guard)
 
     if not all_prices:
         logger.warning("No MF NAVs returned from yfinance.")
@@ -453,16 +860,19 @@ def fetch_mf_nav():
     finally:
         conn.close()
 
-    # Cache in Redis with 24-hour TTL (vs 15-min for other assets)
+    # Cache in Redis until the next NAV fetch
+    mf_ttl = price_cache_ttl("MF_DAILY")
     r = _get_sync_redis()
     pipe = r.pipeline()
     for ticker, data in all_prices.items():
-        pipe.setex(f"price:{ticker}", _MF_CACHE_TTL, json.dumps(data))
+        pipe.setex(f"price:{ticker}", mf_ttl, json.dumps(data))
+    pipe.incr(PRICE_SNAPSHOT_KEY)
     pipe.execute()
     r.close()
 
     # Persist to market_data table
     _upsert_market_data_sync(all_prices)
+    celery.send_task("warm_portfolio_views")
 
     logger.info(f"MF NAV fetch complete: {len(all_prices)} tickers, {fixed_count} with corrected previous_close")
     return {"fetched": len(all_prices), "fixed_previous_close": fixed_count}
@@ -0,0 +1,167 @@
+"""Celery task maintaining portfolio_risk_metrics (see risk_metrics).
+
+update_risk_metrics runs after fetch_eod_prices writes closes, and for a single
+user after their holdings change. It loads RISK_WINDOW_DAYS of closes for every
+held ticker and the benchmarks once, computes per-ticker and per-portfolio
+metrics in one pass and upserts each user's row.
+"""
+import logging
+import os
+import uuid
+from datetime import date, timedelta
+
+import numpy as np
+import psycopg2.extras
+
+from app.celery_app import celery
+from app.services.portfolio_cache import holdings_version_key
+from app.services.portfolio_service import holdings_by_ticker, priced_tickers
+from app.services.risk_metrics import RISK_BENCHMARKS, close_table, daily_returns, risk_metrics
+from app.tasks.portfolio_tasks import load_holdings_by_user_sync
+from app.tasks.price_tasks import _get_sync_db, _get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+_WINDOW_DAYS = int(os.getenv("RISK_WINDOW_DAYS", "365"))
+_RISK_FREE_RATE = float(os.getenv("RISK_FREE_RATE", "0.065"))
+
+
+def _load_closes_sync(conn, tickers: list[str], start: date) -> list[tuple]:
+    """price_history (symbol, date, close) rows from start."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT symbol, date, close FROM price_history
+            WHERE symbol = ANY(%s) AND date >= %s
+        """, (tickers, start))
+        return cur.fetchall()
+
+
+def _rounded(metrics: dict, k: int) -> dict:
+    """Column k of risk_metrics output as JSON: percentages for volatility and drawdown."""
+    def value(x, scale=1):
+        return round(float(x) * scale, 2) + 0.0 if np.isfinite(x) else None
+
+    return {
+        "volatility": value(metrics["volatility"][k], 100),
+        "volatility_1m": value(metrics["volatility_1m"][k], 100),
+        "max_drawdown": value(metrics["max_drawdown"][k], 100),
+        "sharpe": value(metrics["sharpe"][k]),
+        "beta": {b: value(beta[k]) for b, beta in metrics["beta"].items()},
+    }
+
+
+def compute_user_risk(holdings_by_user: dict[str, list], price_rows) -> dict[str, tuple[date, dict]]:
+    """user id -> (last trading day of its holdings, stored metrics JSON) for every user with holdings.
+
+    Weights are each holding's value at its last close (cost basis for holdings
+    without a price); unpriced holdings add value but no returns. A portfolio
+    has a return only on the days one of its holdings traded, and holdings
+    without a close yet are left out of it, so its metrics don't depend on
+    which other tickers the run loaded.
+    """
+    tickers = sorted({t for holdings in holdings_by_user.values() for t in priced_tickers(holdings)})
+    columns = tickers + [b for b in RISK_BENCHMARKS if b not in tickers]
+    column = {t: j for j, t in enumerate(columns)}
+    dates, closes = close_table(price_rows, columns)
+    if len(closes) < 2:
+        return {}
+    closed = ~np.isnan(closes)
+    # Each column's last close (NaN if it has none)
+    last = closes[len(closes) - 1 - np.argmax(closed[::-1], axis=0), np.arange(len(columns))]
+    returns = daily_returns(closes)
+
+    # Value-weighted ticker exposure of each portfolio
+    user_ids = [u for u, holdings in holdings_by_user.items() if holdings]
+    weights = np.zeros((len(columns), len(user_ids)))
+    user_tickers: dict[str, dict[str, float]] = {}
+    for i, u in enumerate(user_ids):
+        holdings = holdings_by_user[u]
+        ticker_holdings = holdings_by_ticker(holdings)
+        priced = {k for ks in ticker_holdings.values() for k in ks}
+        total = sum(h.quantity * h.avg_buy_price for k, h in enumerate(holdings) if k not in priced)
+        for t, ks in ticker_holdings.items():
+            price = last[column[t]]
+            value = sum(holdings[k].quantity for k in ks) * (price if np.isfinite(price) else 0)
+            weights[column[t], i] = value
+            total += value
+        if total > 0:
+            weights[:, i] /= total
+        user_tickers[u] = {t: weights[column[t], i] for t in ticker_holdings}
+
+    # Holdings first priced after a return's start weren't held over it: the
+    # rest of the portfolio is rescaled to their weight
+    listed = np.logical_or.accumulate(closed[:-1], axis=0)
+    invested = 1 - (~listed).astype(float) @ weights
+    traded = (~np.isnan(returns)).astype(float) @ weights > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        portfolio_returns = np.where(traded & (invested > 0), np.nan_to_num(returns) @ weights / invested, np.nan)
+    benchmarks = {b: returns[:, column[b]] for b in RISK_BENCHMARKS}
+    metrics = risk_metrics(np.hstack([returns, portfolio_returns]), benchmarks, _RISK_FREE_RATE)
+
+    # as_of: the last close of the user's holdings, else of the benchmarks
+    held_closed = closed.astype(float) @ weights > 0
+    benchmark_closed = closed[:, [column[b] for b in RISK_BENCHMARKS]].any(axis=1)
+    by_user = {}
+    for i, u in enumerate(user_ids):
+        rows = np.flatnonzero(held_closed[:, i]) if held_closed[:, i].any() else np.flatnonzero(benchmark_closed)
+        as_of = dates[rows[-1]] if len(rows) else dates[-1]
+        by_user[u] = (as_of, {
+            "portfolio": _rounded(metrics, len(columns) + i),
+            "holdings": [
+                {"symbol": t, "weight": round(float(w) * 100, 2), **_rounded(metrics, column[t])}
+                for t, w in sorted(user_tickers[u].items(), key=lambda item: -item[1])
+            ],
+        })
+    return by_user
+
+
+def _write_risk_sync(conn, by_user: dict[str, tuple[date, dict]], versions: dict[str, int]) -> int:
+    """Upsert each user's row; a row from a newer holdings version is kept."""
+    rows = [
+        (str(uuid.uuid4()), u, as_of, versions[u], psycopg2.extras.Json(metrics))
+        for u, (as_of, metrics) in by_user.items()
+    ]
+    with conn.cursor() as cur:
+        psycopg2.extras.execute_values(cur, """
+            INSERT INTO portfolio_risk_metrics (id, user_id, as_of, holdings_version, metrics)
+            VALUES %s
+            ON CONFLICT (user_id) DO UPDATE SET
+                as_of = EXCLUDED.as_of,
+                holdings_version = EXCLUDED.holdings_version,
+                metrics = EXCLUDED.metrics,
+                updated_at = now()
+            WHERE portfolio_risk_metrics.holdings_version <= EXCLUDED.holdings_version
+        """, rows, page_size=500)
+    conn.commit()
+    return len(rows)
+
+
+@celery.task(name="update_risk_metrics")
+def update_risk_metrics(user_id: str | None = None):
+    """Recompute the stored risk metrics of a user (every user with holdings when None)."""
+    r = _get_sync_redis()
+    conn = _get_sync_db()
+    try:
+        holdings_by_user = load_holdings_by_user_sync(conn, [user_id] if user_id else None)
+        user_ids = list(holdings_by_user)
+        if not user_ids:
+            if user_id:
+                # The user's last holding is gone: so are its metrics
+                with conn.cursor() as cur:
+                    cur.execute("DELETE FROM portfolio_risk_metrics WHERE user_id = %s", (user_id,))
+                conn.commit()
+            return {"users": 0, "rows": 0}
+        # A holdings change racing this run queues its own run for the user, which writes last
+        versions = {u: int(v or 0) for u, v in zip(user_ids, r.mget([holdings_version_key(u) for u in user_ids]))}
+
+        tickers = sorted({t for holdings in holdings_by_user.values() for t in priced_tickers(holdings)})
+        price_rows = _load_closes_sync(conn, tickers + list(RISK_BENCHMARKS), date.today() - timedelta(days=_WINDOW_DAYS))
+        by_user = compute_user_risk(holdings_by_user, price_rows)
+        written = _write_risk_sync(conn, by_user, versions) if by_user else 0
+
+        result = {"users": len(user_ids), "rows": written}
+        logger.info(f"Risk metrics updated: {result}")
+        return result
+    finally:
+        conn.close()
+        r.close()
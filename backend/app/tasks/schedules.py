@@ -0,0 +1,94 @@
+"""Celery Beat schedules driven by the exchange calendar instead of fixed clocks."""
+from datetime import datetime, timedelta
+
+from celery.schedules import BaseSchedule, schedstate
+
+from app.services.market_calendar import SESSION_BUFFER, is_open, last_close, next_close, next_open
+
+
+class MarketSessionSchedule(BaseSchedule):
+    """Run every run_every while any of groups is in session (± SESSION_BUFFER).
+
+    Outside sessions the task runs every idle_every instead (for 24/7 markets)
+    and is woken at the next open rather than polled.
+    """
+
+    def __init__(self, run_every: timedelta, groups: tuple[str, ...], idle_every: timedelta, **kwargs):
+        super().__init__(**kwargs)
+        self.run_every = run_every
+        self.groups = tuple(groups)
+        self.idle_every = idle_every
+
+    def in_session(self, now: datetime) -> bool:
+        return any(is_open(g, now, pre=SESSION_BUFFER, post=SESSION_BUFFER) for g in self.groups)
+
+    def remaining_estimate(self, last_run_at: datetime) -> timedelta:
+        now = self.now()
+        if self.in_session(now):
+            return self.maybe_make_aware(last_run_at) + self.run_every - now
+        due = self.maybe_make_aware(last_run_at) + self.idle_every
+        opens = min(next_open(g, now) - SESSION_BUFFER for g in self.groups)
+        return min(due, opens) - now
+
+    def is_due(self, last_run_at: datetime) -> schedstate:
+        remaining = self.remaining_estimate(last_run_at).total_seconds()
+        if remaining <= 0:
+            every = self.run_every if self.in_session(self.now()) else self.idle_every
+            return schedstate(is_due=True, next=every.total_seconds())
+        return schedstate(is_due=False, next=remaining)
+
+    def __repr__(self) -> str:
+        return f"<market session {'/'.join(self.groups)}: every {self.run_every}, idle {self.idle_every}>"
+
+    def __reduce__(self):
+        return self.__class__, (self.run_every, self.groups, self.idle_every)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, MarketSessionSchedule):
+            return (self.run_every, self.groups, self.idle_every) == (other.run_every, other.groups, other.idle_every)
+        return NotImplemented
+
+
+class MarketCloseSchedule(BaseSchedule):
+    """Run once after each session close of any of groups, delayed by delay.
+
+    Closed days (weekends, holidays) have no close, so nothing runs on them.
+    """
+
+    def __init__(self, groups: tuple[str, ...], delay: timedelta = timedelta(0), **kwargs):
+        super().__init__(**kwargs)
+        self.groups = tuple(groups)
+        self.delay = delay
+
+    def _last_event(self, now: datetime) -> datetime | None:
+        closes = [last_close(g, now - self.delay) for g in self.groups]
+        return max((c[1] + self.delay for c in closes if c is not None), default=None)
+
+    def _next_event(self, now: datetime) -> datetime:
+        return min(next_close(g, now - self.delay) for g in self.groups) + self.delay
+
+    def remaining_estimate(self, last_run_at: datetime) -> timedelta:
+        now = self.now()
+        last_event = self._last_event(now)
+        if last_event is not None and last_event > self.maybe_make_aware(last_run_at):
+            return timedelta(0)
+        return self._next_event(now) - now
+
+    def is_due(self, last_run_at: datetime) -> schedstate:
+        now = self.now()
+        wait = max((self._next_event(now) - now).total_seconds(), 1.0)
+        last_event = self._last_event(now)
+        if last_event is not None and last_event > self.maybe_make_aware(last_run_at):
+            return schedstate(is_due=True, next=wait)
+        return schedstate(is_due=False, next=wait)
+
+    def __repr__(self) -> str:
+        return f"<market close {'/'.join(self.groups)} +{self.delay}>"
+
+    def __reduce__(self):
+        return self.__class__, (self.groups, self.delay)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, MarketCloseSchedule):
+            return (self.groups, self.delay) == (other.groups, other.delay)
+        return NotImplemented
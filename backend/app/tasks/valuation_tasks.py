@@ -0,0 +1,147 @@
+"""Celery task warming every user's cached summary and allocation after a price cycle.
+
+finalize_price_cycle and fetch_mf_nav queue warm_portfolio_views once they have
+written prices. The task loads every active holding once and resolves each
+distinct ticker's price once (Redis, then market_data, as resolve_prices_bulk
+does), then values every portfolio in one vectorized pass: priced holdings form
+a sparse users x tickers quantity matrix (coordinate triplets) that is
+multiplied by the price vector with np.bincount. Each user's summary and
+allocation are stored under the versions read before anything was loaded (see
+portfolio_cache), so the next request is a cache hit and the work grows with
+holdings and distinct tickers rather than with requests.
+"""
+import json
+import logging
+
+import numpy as np
+
+from app.celery_app import celery
+from app.services.portfolio_cache import PRICE_SNAPSHOT_KEY, VIEW_TTL, holdings_version_key, view_key
+from app.services.portfolio_service import allocation_rows, priced_tickers, summary_totals
+from app.services.price_service import PRICEABLE_CLASSES, to_yfinance_ticker
+from app.tasks.portfolio_tasks import load_holdings_by_user_sync
+from app.tasks.price_tasks import _get_sync_db, _get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+_WRITE_BATCH = 1000  # users per Redis pipeline
+
+
+def _load_holder_ids_sync(conn) -> list[str]:
+    """Ids of users with active holdings."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT DISTINCT user_id FROM holdings WHERE is_active = true")
+        return [str(row[0]) for row in cur.fetchall()]
+
+
+def _resolve_prices_sync(r, conn, tickers: list[str]) -> dict[str, tuple[float, float | None]]:
+    """ticker -> (price, previous close) from the Redis price cache, then market_data.
+
+    Tickers with neither are left out (their holdings are valued at cost basis).
+    """
+    prices = {}
+    if tickers:
+        for t, raw in zip(tickers, r.mget([f"price:{t}" for t in tickers])):
+            if raw:
+                data = json.loads(raw)
+                prices[t] = (data["price"], data.get("previous_close"))
+
+    misses = [t for t in tickers if t not in prices]
+    if misses:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT symbol, current_price, previous_close FROM market_data
+                WHERE symbol = ANY(%s) AND current_price IS NOT NULL AND current_price <> 0
+            """, (misses,))
+            for symbol, price, previous_close in cur.fetchall():
+                prices.setdefault(symbol, (price, previous_close))
+    return prices
+
+
+def value_portfolios(
+    holdings_by_user: dict[str, list], prices: dict[str, tuple[float, float | None]],
+) -> dict[str, tuple[dict, list[dict]]]:
+    """user id -> (summary, allocation) for every user with holdings, as the API computes them."""
+    user_ids = [u for u, holdings in holdings_by_user.items() if holdings]
+    tickers = list(prices)
+    column = {t: j for j, t in enumerate(tickers)}
+    # Unpriced holdings point at the trailing zero; a missing previous close adds no day change
+    price = np.array([prices[t][0] for t in tickers] + [0.0], dtype=float)
+    previous = np.array([prices[t][1] or 0 for t in tickers] + [0.0], dtype=float)
+
+    codes: dict[str, int] = {}
+    user_codes: list[list[int]] = []
+    rows, cols, holding_codes, quantity, avg_buy_price = [], [], [], [], []
+    for i, u in enumerate(user_ids):
+        held = {}
+        for h in holdings_by_user[u]:
+            ticker = to_yfinance_ticker(h.symbol, h.asset_class_code, h.exchange) \
+                if h.asset_class_code in PRICEABLE_CLASSES else None
+            code = codes.setdefault(h.asset_class_code, len(codes))
+            held[code] = None
+            rows.append(i)
+            cols.append(column.get(ticker, -1))
+            holding_codes.append(code)
+            quantity.append(h.quantity)
+            avg_buy_price.append(h.avg_buy_price)
+        user_codes.append(list(held))
+
+    rows, cols = np.array(rows, dtype=int), np.array(cols, dtype=int)
+    quantity, avg_buy_price = np.array(quantity, dtype=float), np.array(avg_buy_price, dtype=float)
+    n = len(user_ids)
+
+    invested = quantity * avg_buy_price
+    # The users x tickers quantity matrix times the price vector, one entry per holding
+    market = quantity * price[cols]
+    value = np.where(cols >= 0, market, invested)
+    moved = previous[cols] != 0
+
+    total_invested = np.bincount(rows, invested, minlength=n)
+    current_value = np.bincount(rows, value, minlength=n)
+    day_change = np.bincount(rows[moved], (market - quantity * previous[cols])[moved], minlength=n)
+    by_class = np.bincount(
+        rows * len(codes) + np.array(holding_codes, dtype=int), value, minlength=n * len(codes),
+    ).reshape(n, len(codes))
+
+    names = list(codes)
+    return {
+        u: (
+            summary_totals(float(total_invested[i]), float(current_value[i]), float(day_change[i])),
+            allocation_rows({names[c]: float(by_class[i, c]) for c in user_codes[i]}),
+        )
+        for i, u in enumerate(user_ids)
+    }
+
+
+@celery.task(name="warm_portfolio_views")
+def warm_portfolio_views():
+    """Value every portfolio at the current prices and cache its summary and allocation."""
+    r = _get_sync_redis()
+    conn = _get_sync_db()
+    try:
+        # Versions are read before holdings and prices, so a change racing this
+        # run leaves its views under superseded keys rather than stale ones
+        snapshot = r.get(PRICE_SNAPSHOT_KEY) or "0"
+        user_ids = _load_holder_ids_sync(conn)
+        if not user_ids:
+            return {"users": 0, "tickers": 0}
+        versions = dict(zip(user_ids, (v or "0" for v in r.mget([holdings_version_key(u) for u in user_ids]))))
+
+        holdings_by_user = load_holdings_by_user_sync(conn, user_ids)
+        tickers = sorted({t for holdings in holdings_by_user.values() for t in priced_tickers(holdings)})
+        views = value_portfolios(holdings_by_user, _resolve_prices_sync(r, conn, tickers))
+
+        items = list(views.items())
+        for k in range(0, len(items), _WRITE_BATCH):
+            pipe = r.pipeline(transaction=False)
+            for u, (summary, allocation) in items[k:k + _WRITE_BATCH]:
+                pipe.set(view_key(u, "summary", versions[u], snapshot), json.dumps(summary), ex=VIEW_TTL)
+                pipe.set(view_key(u, "allocation", versions[u], snapshot), json.dumps(allocation), ex=VIEW_TTL)
+            pipe.execute()
+
+        result = {"users": len(views), "tickers": len(tickers)}
+        logger.info(f"Portfolio views warmed: {result}")
+        return result
+    finally:
+        conn.close()
+        r.close()
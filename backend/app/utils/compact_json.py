@@ -0,0 +1,102 @@
+"""Opt-in columnar JSON for the large portfolio payloads (?format=columnar).
+
+Row format repeats {"date", "value"} on every point and every key on every
+holding. Columnar format sends one shared dates array with a value array per
+series (null where a series has no point) and holdings as {key: [values]}.
+compact_response encodes with orjson and compresses with brotli or gzip,
+whichever the client accepts (brotli only when the package is installed).
+"""
+import gzip
+from collections.abc import Awaitable, Callable, Mapping
+
+import orjson
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Smaller bodies aren't worth compressing
+_MIN_COMPRESS_BYTES = 500
+_GZIP_LEVEL = 6
+_BROTLI_QUALITY = 5
+
+
+def columnar_series(portfolio: list[dict], series: dict[str, list[dict]]) -> tuple[list[str], dict[str, list]]:
+    """(dates, {name: values}) of series aligned to the portfolio's dates."""
+    dates = [p["date"] for p in portfolio]
+    position = {d: i for i, d in enumerate(dates)}
+    aligned = {}
+    for name, points in series.items():
+        values = [None] * len(dates)
+        for p in points:
+            values[position[p["date"]]] = p["value"]
+        aligned[name] = values
+    return dates, aligned
+
+
+def columnar_performance(performance: dict) -> dict:
+    """get_performance output with one dates array and a values array per series."""
+    portfolio = performance["portfolio"]
+    dates, by_category = columnar_series(portfolio, performance["by_category"])
+    _, benchmarks = columnar_series(portfolio, performance["benchmarks"])
+    return {
+        "dates": dates,
+        "portfolio": [p["value"] for p in portfolio],
+        "by_category": by_category,
+        "benchmarks": benchmarks,
+        "format": "columnar",
+    }
+
+
+def columnar_rows(rows: list[dict]) -> dict[str, list]:
+    """[{key: value}] rows with the same keys as {key: [values]}."""
+    if not rows:
+        return {}
+    return {key: [row[key] for row in rows] for key in rows[0]}
+
+
+def columnar_dashboard(dashboard: dict) -> dict:
+    """get_dashboard output with columnar performance and holdings."""
+    return {
+        **dashboard,
+        "performance": columnar_performance(dashboard["performance"]),
+        "top_holdings": columnar_rows(dashboard["top_holdings"]),
+        "all_holdings": columnar_rows(dashboard["all_holdings"]),
+        "format": "columnar",
+    }
+
+
+async def as_columnar(transform: Callable[[dict], dict], view: Awaitable[dict]) -> dict:
+    """Await a row-format view and convert it (for cached_view's compute)."""
+    return transform(await view)
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    """Content codings an Accept-Encoding header allows (q=0 excluded)."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip().removeprefix("q=")
+        try:
+            if not q or float(q) > 0:
+                accepted.add(coding.strip().lower())
+        except ValueError:
+            continue
+    return accepted
+
+
+def compact_response(request: Request, content, headers: Mapping[str, str] | None = None) -> Response:
+    """content as orjson-encoded JSON, brotli- or gzip-compressed when the client accepts it."""
+    body = orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    if len(body) >= _MIN_COMPRESS_BYTES:
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        if brotli is not None and "br" in accepted:
+            body = brotli.compress(body, quality=_BROTLI_QUALITY)
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in accepted:
+            body = gzip.compress(body, compresslevel=_GZIP_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+    return Response(body, media_type="application/json", headers=headers)
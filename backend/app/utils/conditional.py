@@ -0,0 +1,48 @@
+"""Conditional GET for cached portfolio views.
+
+not_modified answers If-None-Match from the view's ETag (one Redis MGET, see
+portfolio_cache.view_etag) before the endpoint loads holdings or prices; on a
+mismatch it leaves the ETag on the response for the client's next poll. The
+ETag is read before the view, so a view computed after a concurrent change is
+at worst newer than its ETag, never older.
+"""
+import uuid
+
+import redis.asyncio as aioredis
+from fastapi import Request, Response
+
+from app.services.portfolio_cache import view_etag
+
+# Clients may reuse the body only after revalidating it
+_CACHE_CONTROL = "private, no-cache"
+
+
+def _opaque(etag: str) -> str:
+    return etag.strip().removeprefix("W/")
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of etag against an If-None-Match header (a list or *)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(",")}
+
+
+async def not_modified(
+    request: Request, response: Response, redis: aioredis.Redis, user_id: uuid.UUID, view: str,
+    benchmarks: bool = False,
+) -> Response | None:
+    """A 304 when the client's copy of the view is current, else None with the ETag set on response.
+
+    benchmarks as for cached_view.
+    """
+    etag = await view_etag(redis, user_id, view, benchmarks)
+    if etag is None:
+        return None
+    headers = {"ETag": etag, "Cache-Control": _CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -1,6 +1,8 @@
+import logging
 import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+import redis.asyncio as aioredis
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
@@ -11,10 +13,28 @@ from app.config import settings
 from app.database import get_db
 from app.redis import redis_client
 from app.models.user import User
+from app.schemas.user import Principal
+
+logger = logging.getLogger(__name__)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security_scheme = HTTPBearer()
 
+# The only columns an authenticated request loads
+_PRINCIPAL_COLUMNS = [getattr(User, name) for name in Principal.model_fields]
+
+
+def principal_key(user_id: uuid.UUID | str) -> str:
+    return f"principal:{user_id}"
+
+
+async def invalidate_principal(user_id: uuid.UUID) -> None:
+    """Drop a user's cached principal. Call only after the change to the user is committed."""
+    try:
+        await redis_client.delete(principal_key(user_id))
+    except aioredis.RedisError as e:
+        logger.warning(f"Failed to invalidate principal of {user_id}: {e}")
+
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -49,7 +69,7 @@ def decode_token(token: str) -> dict:
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security_scheme),
     db: AsyncSession = Depends(get_db),
-) -> User:
+) -> Principal:
     token = credentials.credentials
     payload = decode_token(token)
 
@@ -67,10 +87,35 @@ async def get_current_user(
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    result = await db.execute(select(User).where(User.id == uuid.UUID(user_id)))
-    user = result.scalar_one_or_none()
+    principal = await _cached_principal(user_id)
+    if principal is not None:
+        return principal
 
-    if not user or not user.is_active:
+    result = await db.execute(select(*_PRINCIPAL_COLUMNS).where(User.id == uuid.UUID(user_id)))
+    row = result.one_or_none()
+
+    if not row or not row.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found or inactive")
 
-    return user
+    principal = Principal.model_validate(row)
+    try:
+        await redis_client.set(principal_key(user_id), principal.model_dump_json(), ex=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+    except aioredis.RedisError as e:
+        logger.warning(f"Failed to cache principal of {user_id}: {e}")
+    return principal
+
+
+async def _cached_principal(user_id: str) -> Principal | None:
+    """The user's cached principal; None on a miss or when Redis is unavailable.
+
+    Only active users are cached. Whatever changes a user (profile, password,
+    onboarding, deactivation) calls invalidate_principal after committing; a
+    request racing the change can re-cache the old row for at most
+    PRINCIPAL_CACHE_TTL_SECONDS.
+    """
+    try:
+        raw = await redis_client.get(principal_key(user_id))
+    except aioredis.RedisError as e:
+        logger.warning(f"Principal cache unavailable: {e}")
+        return None
+    return Principal.model_validate_json(raw) if raw is not None else None
@@ -0,0 +1,70 @@
+"""Stand-ins shared across the test modules: a holding factory and an in-memory
+async Redis."""
+import uuid
+from types import SimpleNamespace
+
+
+def make_holding(symbol, asset_class_code="EQUITY_IN", quantity=10.0, avg_buy_price=100.0, exchange=None):
+    return SimpleNamespace(
+        id=uuid.uuid4(), symbol=symbol, asset_class_code=asset_class_code, exchange=exchange,
+        quantity=quantity, avg_buy_price=avg_buy_price,
+    )
+
+
+class FakeAsyncRedis:
+    """Just enough of redis.asyncio.Redis for the services' caches: strings, lists
+    and hashes. portfolio_cache's lookup script is emulated."""
+
+    def __init__(self):
+        self.store: dict[str, str] = {}
+        self.lists: dict[str, list[str]] = {}
+        self.hashes: dict[str, dict[str, str]] = {}
+
+    def register_script(self, script):
+        async def lookup(keys, args):
+            key = ":".join([args[0], *(self.store.get(k, "0") for k in keys)])
+            return [key, self.store.get(key)]
+        return lookup
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def mget(self, *keys):
+        return [self.store.get(k) for k in keys]
+
+    async def set(self, key, value, nx=False, px=None, ex=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    async def delete(self, key):
+        for data in (self.store, self.lists, self.hashes):
+            data.pop(key, None)
+
+    async def incr(self, key):
+        self.store[key] = str(int(self.store.get(key, 0)) + 1)
+        return int(self.store[key])
+
+    async def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    async def hmget(self, key, names):
+        fields = self.hashes.get(key, {})
+        return [fields.get(n) for n in names]
+
+    def pipeline(self):
+        redis, ops = self, []
+
+        class Pipe:
+            def rpush(self, key, *values):
+                ops.append((key, values))
+
+            def expire(self, key, ttl):
+                pass
+
+            async def execute(self):
+                for key, values in ops:
+                    redis.lists.setdefault(key, []).extend(values)
+
+        return Pipe()
@@ -0,0 +1,94 @@
+"""Tests for benchmark_service: the return index, its cached encoding and
+rescaling a cached index to a request's window (in-memory async Redis stand-in)."""
+from datetime import date, timedelta
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+import redis.asyncio as aioredis
+
+from app.services.benchmark_service import (
+    BENCHMARK_SERIES_KEY,
+    BENCHMARKS,
+    DEFAULT_BENCHMARKS,
+    benchmark_index,
+    encode_series,
+    load_benchmark_series,
+    rescale,
+)
+from tests.helpers import FakeAsyncRedis
+
+START = date(2026, 1, 1)
+ROWS = [
+    ("^NSEI", START + timedelta(days=1), 200.0),
+    ("^NSEI", START + timedelta(days=3), 220.0),
+    ("^GSPC", START + timedelta(days=4), 50.0),
+]
+
+
+def test_registry_defaults():
+    assert DEFAULT_BENCHMARKS == ["^NSEI", "^BSESN", "^GSPC", "GC=F", "BTC-INR"]
+    assert set(DEFAULT_BENCHMARKS) < set(BENCHMARKS)
+
+
+def test_index_is_relative_to_the_first_close():
+    series = benchmark_index(ROWS, ["^NSEI", "^GSPC", "^BSESN"], START, 5)
+    assert list(series) == ["^NSEI", "^GSPC"]
+    start, index = series["^NSEI"]
+    assert start == START
+    assert np.isnan(index[[0, 2, 4, 5]]).all()
+    assert index[[1, 3]].tolist() == [1.0, 1.1]
+
+
+# ── rescale ─────────────────────────────────────────────────────────────────
+
+
+class TestRescale:
+    series = benchmark_index(ROWS, ["^NSEI", "^GSPC"], START, 5)
+
+    def test_later_window_starts_at_its_own_first_close(self):
+        values, seen = rescale(self.series, ["^NSEI", "^GSPC"], START + timedelta(days=2), 3, 1000.0)
+        # ^NSEI's first close in the window is day 3 (220); ^GSPC's is day 4
+        assert seen[:, 0].tolist() == [False, True, True, True]
+        assert values[1:, 0].tolist() == [1000.0, 1000.0, 1000.0]
+        assert seen[:, 1].tolist() == [False, False, True, True]
+
+    def test_window_past_the_series_carries_the_last_close_forward(self):
+        values, seen = rescale(self.series, ["^NSEI"], START, 8, 100.0)
+        assert values[1:, 0] == pytest.approx([100.0, 100.0, 110.0, 110.0, 110.0, 110.0, 110.0, 110.0])
+        assert not seen[0, 0]
+
+    def test_tickers_without_series_are_never_seen(self):
+        _, seen = rescale(self.series, ["BTC-INR"], START, 5, 100.0)
+        assert not seen.any()
+
+
+# ── cache ───────────────────────────────────────────────────────────────────
+
+
+def _cached(series):
+    redis = FakeAsyncRedis()
+    redis.hashes[BENCHMARK_SERIES_KEY] = encode_series(series, START)
+    return redis
+
+
+@pytest.mark.asyncio
+async def test_cached_series_round_trip():
+    series = benchmark_index(ROWS, ["^NSEI", "^GSPC"], START, 5)
+    redis = _cached(series)
+    loaded = await load_benchmark_series(redis, ["^NSEI", "GC=F"], START + timedelta(days=1))
+    assert list(loaded) == ["^NSEI"]
+    assert loaded["^NSEI"][0] == START
+    np.testing.assert_array_equal(loaded["^NSEI"][1], series["^NSEI"][1])
+
+
+@pytest.mark.asyncio
+async def test_cache_misses_fall_back():
+    series = benchmark_index(ROWS, ["^NSEI"], START, 5)
+    # Cold cache, a window starting before the cached one, Redis down
+    assert await load_benchmark_series(FakeAsyncRedis(), ["^NSEI"], START) is None
+    assert await load_benchmark_series(
+        _cached(series), ["^NSEI"], START - timedelta(days=1),
+    ) is None
+    broken = AsyncMock(hmget=AsyncMock(side_effect=aioredis.RedisError("down")))
+    assert await load_benchmark_series(broken, ["^NSEI"], START) is None
@@ -0,0 +1,81 @@
+"""Tests for compact_json: columnar conversion of performance, holdings and
+dashboard payloads, and compact_response's encoding negotiation."""
+import gzip
+from unittest.mock import MagicMock, patch
+
+import orjson
+
+from app.utils import compact_json
+from app.utils.compact_json import columnar_dashboard, columnar_performance, columnar_rows, compact_response
+
+PERFORMANCE = {
+    "portfolio": [{"date": "2026-10-15", "value": 100.0}, {"date": "2026-10-16", "value": 110.0}],
+    "by_category": {"Equity": [{"date": "2026-10-15", "value": 60.0}, {"date": "2026-10-16", "value": 70.0}]},
+    "benchmarks": {"Nifty 50": [{"date": "2026-10-16", "value": 105.0}]},
+}
+HOLDINGS = [
+    {"id": "h1", "name": "TCS", "current_value": 1000.0},
+    {"id": "h2", "name": "FD", "current_value": 500.0},
+]
+
+
+# ── columnar conversion ─────────────────────────────────────────────────────
+
+
+def test_series_share_the_portfolios_dates():
+    assert columnar_performance(PERFORMANCE) == {
+        "dates": ["2026-10-15", "2026-10-16"],
+        "portfolio": [100.0, 110.0],
+        "by_category": {"Equity": [60.0, 70.0]},
+        # No point before the benchmark's first close
+        "benchmarks": {"Nifty 50": [None, 105.0]},
+        "format": "columnar",
+    }
+
+
+def test_rows_become_columns():
+    assert columnar_rows(HOLDINGS) == {"id": ["h1", "h2"], "name": ["TCS", "FD"], "current_value": [1000.0, 500.0]}
+    assert columnar_rows([]) == {}
+
+
+def test_dashboard_keeps_its_other_sections():
+    dashboard = columnar_dashboard({
+        "summary": {"current_value": 1500.0}, "allocation": [],
+        "performance": PERFORMANCE, "top_holdings": HOLDINGS[:1], "all_holdings": HOLDINGS,
+    })
+    assert dashboard["summary"] == {"current_value": 1500.0}
+    assert dashboard["all_holdings"]["name"] == ["TCS", "FD"]
+    assert dashboard["performance"]["dates"] == ["2026-10-15", "2026-10-16"]
+
+
+# ── compact_response ────────────────────────────────────────────────────────
+
+
+def _request(accept_encoding):
+    return MagicMock(headers={"accept-encoding": accept_encoding} if accept_encoding is not None else {})
+
+
+LARGE = {"values": list(range(1000))}
+
+
+def test_gzip_when_accepted():
+    with patch.object(compact_json, "brotli", None):
+        response = compact_response(_request("br, gzip;q=0.8"), LARGE)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert orjson.loads(gzip.decompress(response.body)) == LARGE
+
+
+def test_brotli_preferred_when_available():
+    fake = MagicMock(compress=MagicMock(return_value=b"br-body"))
+    with patch.object(compact_json, "brotli", fake):
+        response = compact_response(_request("gzip, br"), LARGE)
+    assert (response.headers["content-encoding"], response.body) == ("br", b"br-body")
+
+
+def test_identity_for_small_bodies_and_refused_codings():
+    assert "content-encoding" not in compact_response(_request("gzip"), {"a": 1}).headers
+    response = compact_response(_request("gzip;q=0"), LARGE)
+    assert "content-encoding" not in response.headers
+    assert orjson.loads(response.body) == LARGE
+    assert "content-encoding" not in compact_response(_request(None), LARGE).headers
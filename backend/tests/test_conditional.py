@@ -0,0 +1,57 @@
+"""Tests for conditional: If-None-Match matching and the 304 short-circuit."""
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import Response
+
+from app.utils.conditional import etag_matches, not_modified
+
+ETAG = 'W/"3.7.0123456789ab"'
+USER = uuid.uuid4()
+
+
+def test_weak_comparison_and_lists():
+    assert etag_matches(ETAG, ETAG)
+    assert etag_matches('"3.7.0123456789ab"', ETAG)
+    assert etag_matches(f'"other", {ETAG}', ETAG)
+    assert etag_matches("*", ETAG)
+    assert not etag_matches('W/"3.8.0123456789ab"', ETAG)
+    assert not etag_matches(None, ETAG)
+    assert not etag_matches("", ETAG)
+
+
+def _request(if_none_match=None):
+    return MagicMock(headers={"if-none-match": if_none_match} if if_none_match else {})
+
+
+@pytest.fixture
+def etag(monkeypatch):
+    lookup = AsyncMock(return_value=ETAG)
+    monkeypatch.setattr("app.utils.conditional.view_etag", lookup)
+    return lookup
+
+
+@pytest.mark.asyncio
+async def test_current_copy_gets_304(etag):
+    response = Response()
+    unchanged = await not_modified(_request(ETAG), response, MagicMock(), USER, "summary")
+    assert unchanged.status_code == 304
+    assert unchanged.headers["etag"] == ETAG
+    assert unchanged.body == b""
+
+
+@pytest.mark.asyncio
+async def test_stale_copy_gets_etag_on_response(etag):
+    response = Response()
+    assert await not_modified(_request('W/"2.7.0123456789ab"'), response, MagicMock(), USER, "summary") is None
+    assert response.headers["etag"] == ETAG
+    assert response.headers["cache-control"] == "private, no-cache"
+
+
+@pytest.mark.asyncio
+async def test_no_etag_when_redis_down(etag):
+    etag.return_value = None
+    response = Response()
+    assert await not_modified(_request(ETAG), response, MagicMock(), USER, "summary") is None
+    assert "etag" not in response.headers
@@ -0,0 +1,144 @@
+"""Tests for fetch_engine.FetchEngine: per-host concurrency bound, per-request
+deadline, retry on 429/5xx, error handling (httpx.MockTransport, no network)."""
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import http_client
+from app.services.fetch_engine import FetchEngine
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt, retry_after=None: 0)
+    http_client.stats.reset()
+
+
+def _json_handler(payload: dict, status: int = 200):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(status, json=payload)
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_get_json_success():
+    transport = httpx.MockTransport(_json_handler({"ok": True}))
+    async with FetchEngine(transport=transport) as engine:
+        assert await engine.get_json("https://example.test/a") == {"ok": True}
+
+
+@pytest.mark.asyncio
+async def test_get_json_non_200_returns_none():
+    transport = httpx.MockTransport(_json_handler({"error": "not found"}, status=404))
+    async with FetchEngine(transport=transport) as engine:
+        assert await engine.get_json("https://example.test/a") is None
+
+
+@pytest.mark.asyncio
+async def test_retries_429_then_succeeds():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(1)
+        if len(calls) < 3:
+            return httpx.Response(429, json={})
+        return httpx.Response(200, json={"ok": True})
+
+    async with FetchEngine(transport=httpx.MockTransport(handler), max_retries=3) as engine:
+        assert await engine.get_json("https://example.test/a", provider="yahoo") == {"ok": True}
+
+    assert len(calls) == 3
+    assert http_client.stats.snapshot()["yahoo"]["retries"] == 2
+    assert http_client.stats.snapshot()["yahoo"]["requests"] == 3
+
+
+@pytest.mark.asyncio
+async def test_retries_exhausted_returns_none():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(1)
+        return httpx.Response(503, json={})
+
+    async with FetchEngine(transport=httpx.MockTransport(handler), max_retries=2) as engine:
+        assert await engine.get_json("https://example.test/a") is None
+
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_get_json_network_error_returns_none():
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused", request=request)
+
+    async with FetchEngine(transport=httpx.MockTransport(handler)) as engine:
+        assert await engine.get_json("https://example.test/a") is None
+
+
+@pytest.mark.asyncio
+async def test_httpx_timeouts_are_retried():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(1)
+        if len(calls) == 1:
+            raise httpx.ReadTimeout("read timed out", request=request)
+        return httpx.Response(200, json={"ok": True})
+
+    async with FetchEngine(transport=httpx.MockTransport(handler), max_retries=2) as engine:
+        assert await engine.get_json("https://example.test/a", provider="yahoo") == {"ok": True}
+    assert http_client.stats.snapshot()["yahoo"]["retries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_json_invalid_json_returns_none():
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, text="<html>"))
+    async with FetchEngine(transport=transport) as engine:
+        assert await engine.get_json("https://example.test/a") is None
+
+
+@pytest.mark.asyncio
+async def test_deadline_does_not_block_other_requests():
+    """A slow request is cut off at its deadline; fast ones complete normally."""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/slow":
+            await asyncio.sleep(5)
+        return httpx.Response(200, json={"path": request.url.path})
+
+    async with FetchEngine(transport=httpx.MockTransport(handler), timeout=0.2) as engine:
+        results = await asyncio.gather(
+            engine.get_json("https://example.test/slow"),
+            engine.get_json("https://example.test/fast1"),
+            engine.get_json("https://example.test/fast2"),
+        )
+
+    assert results == [None, {"path": "/fast1"}, {"path": "/fast2"}]
+
+
+@pytest.mark.asyncio
+async def test_per_host_concurrency_is_bounded():
+    in_flight = {"a.test": 0, "b.test": 0}
+    peak = {"a.test": 0, "b.test": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        in_flight[host] += 1
+        peak[host] = max(peak[host], in_flight[host])
+        await asyncio.sleep(0.01)
+        in_flight[host] -= 1
+        return httpx.Response(200, json={})
+
+    async with FetchEngine(transport=httpx.MockTransport(handler), per_host_limit=3) as engine:
+        await asyncio.gather(*(
+            engine.get_json(f"https://{host}/{i}")
+            for i in range(10) for host in ("a.test", "b.test")
+        ))
+
+    assert peak == {"a.test": 3, "b.test": 3}
+
+
+@pytest.mark.asyncio
+async def test_requires_context_manager():
+    with pytest.raises(RuntimeError):
+        await FetchEngine().get_json("https://example.test/a")
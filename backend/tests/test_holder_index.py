@@ -0,0 +1,170 @@
+"""Tests for holder_index: reconciling stale users, dropping former holders,
+sparing concurrently changed entries and the holders lookup (in-memory Redis
+stand-in; the reindex script is emulated)."""
+import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import redis
+
+from app.services.holder_index import (
+    _reindex_args,
+    add_holder_sync,
+    holders_of_sync,
+    holding_tickers,
+    index_user_holdings,
+    reconcile_due_sync,
+    reindex_holders_sync,
+    stale_holders_sync,
+)
+
+
+class FakePipeline:
+    """Queues FakeRedis calls and returns their results from execute()."""
+
+    def __init__(self, r):
+        self.r, self.calls = r, []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append(lambda: getattr(self.r, name)(*args, **kwargs))
+
+    def execute(self):
+        return [call() for call in self.calls]
+
+
+class FakeRedis:
+    """Just enough of redis.Redis (sets, scripts, pipelines) for holder_index."""
+
+    def __init__(self):
+        self.sets: dict[str, set] = {}
+        self.strings: dict[str, str] = {}
+
+    def register_script(self, script):
+        def reindex(keys, args, client=None):
+            if client is not None:
+                return client.calls.append(lambda: reindex(keys, args))
+            user_id, tickers = args[0], args[2:]
+            if args[1] != "*":
+                n = int(args[1])
+                expected, tickers = set(tickers[:n]), tickers[n:]
+                if self.sets.get(keys[0], set()) != expected:
+                    return -1
+            for t in self.sets.pop(keys[0], set()):
+                self.srem(f"ticker_holders:{t}", user_id)
+            for t in tickers:
+                self.sadd(f"ticker_holders:{t}", user_id)
+                self.sadd(keys[0], t)
+            (self.sadd if tickers else self.srem)(keys[1], user_id)
+            return len(tickers)
+        return reindex
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = str(value)
+        return True
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+    def srem(self, key, *members):
+        self.sets.get(key, set()).difference_update(members)
+        if not self.sets.get(key):
+            self.sets.pop(key, None)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def sunion(self, keys):
+        return set().union(*(self.sets.get(k, set()) for k in keys))
+
+    def exists(self, key):
+        return int(key in self.sets)
+
+
+def _reconcile(r, user_tickers):
+    """What a price cycle does: re-index the stale users from (here: the same) current holdings."""
+    stale = stale_holders_sync(r, user_tickers)
+    return reindex_holders_sync(r, {u: user_tickers.get(u, set()) for u in stale}, stale)
+
+
+def _holding(symbol, asset_class_code="EQUITY_IN"):
+    return SimpleNamespace(symbol=symbol, asset_class_code=asset_class_code, exchange=None)
+
+
+def test_only_priceable_holdings_have_tickers():
+    assert holding_tickers([_holding("TCS"), _holding("FD", "FIXED_DEPOSIT"), _holding(None, "MUTUAL_FUND")]) == {"TCS.NS"}
+
+
+def test_reconcile_moves_users_and_drops_former_holders():
+    r = FakeRedis()
+    assert _reconcile(r, {"u1": {"TCS.NS", "AAPL"}, "u2": {"TCS.NS"}, "u3": {"INFY.NS"}}) == 3
+    assert holders_of_sync(r, ["TCS.NS"]) == {"u1", "u2"}
+
+    # u1 sold TCS, u3 sold everything; u2 is unchanged and not rewritten
+    assert stale_holders_sync(r, {"u1": {"AAPL"}, "u2": {"TCS.NS"}}) == {"u1": {"TCS.NS", "AAPL"}, "u3": {"INFY.NS"}}
+    assert _reconcile(r, {"u1": {"AAPL"}, "u2": {"TCS.NS"}}) == 2
+    assert holders_of_sync(r, ["TCS.NS"]) == {"u2"}
+    assert holders_of_sync(r, ["AAPL", "INFY.NS"]) == {"u1"}
+    assert "ticker_holders:INFY.NS" not in r.sets
+    assert r.smembers("holder_index:users") == {"u1", "u2"}
+    assert stale_holders_sync(r, {"u1": {"AAPL"}, "u2": {"TCS.NS"}}) == {}
+
+
+def test_reconcile_leaves_entries_changed_since_they_were_read():
+    r = FakeRedis()
+    _reconcile(r, {"u1": {"TCS.NS"}})
+    stale = stale_holders_sync(r, {"u1": {"AAPL"}})
+    # u1's holdings change is indexed between the comparison and the write
+    r.register_script(None)(**_reindex_args("u1", {"INFY.NS"}))
+
+    assert reindex_holders_sync(r, {"u1": {"AAPL"}}, stale) == 0
+    assert r.smembers("holder_tickers:u1") == {"INFY.NS"}
+
+
+def test_expected_tickers_are_counted_then_listed():
+    assert _reindex_args("u1", {"AAPL"}, {"TCS.NS", "INFY.NS"})["args"] == ["u1", "2", "INFY.NS", "TCS.NS", "AAPL"]
+    assert _reindex_args("u1", set(), set())["args"] == ["u1", "0"]
+
+
+def test_reconcile_is_due_when_cold_then_once_per_interval():
+    r = FakeRedis()
+    assert reconcile_due_sync(r, 3600)
+    _reconcile(r, {"u1": {"TCS.NS"}})
+    assert not reconcile_due_sync(r, 3600)
+    del r.strings["holder_index:reconciled"]  # expired
+    assert reconcile_due_sync(r, 3600)
+
+
+def test_newly_priced_holding_is_added():
+    r = FakeRedis()
+    _reconcile(r, {"u1": {"TCS.NS"}})
+    add_holder_sync(r, "u1", "0P0000YWL1.BO")
+    assert holders_of_sync(r, ["0P0000YWL1.BO"]) == {"u1"}
+    assert r.smembers("holder_tickers:u1") == {"TCS.NS", "0P0000YWL1.BO"}
+
+
+def test_cold_or_unavailable_index_means_unknown():
+    assert holders_of_sync(FakeRedis(), ["TCS.NS"]) is None
+    broken = MagicMock(exists=MagicMock(side_effect=redis.ConnectionError("down")))
+    assert holders_of_sync(broken, ["TCS.NS"]) is None
+
+
+@pytest.mark.asyncio
+async def test_holdings_write_reindexes_the_user():
+    user_id = uuid.uuid4()
+    db = AsyncMock()
+    db.execute.return_value = MagicMock(all=MagicMock(return_value=[_holding("TCS"), _holding("AAPL", "EQUITY_US")]))
+    lookup = AsyncMock()
+    redis = MagicMock(register_script=MagicMock(return_value=lookup))
+
+    await index_user_holdings(db, redis, user_id)
+
+    assert lookup.call_args.kwargs == {
+        "keys": [f"holder_tickers:{user_id}", "holder_index:users"],
+        "args": [str(user_id), "*", "AAPL", "TCS.NS"],
+    }
@@ -0,0 +1,197 @@
+"""Tests for http_client: backoff/Retry-After helpers (pure), get() retry policy
+and connection-reuse counters against a local keep-alive stub server, retried
+transport errors (httpx.MockTransport), and the
+counters published to Redis (in-memory stand-in)."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services import http_client
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    statuses: list[int] = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        status = self.statuses.pop(0) if self.statuses else 200
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stub_url(monkeypatch):
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt, retry_after=None: 0)
+    http_client.stats.reset()
+    _StubHandler.statuses = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+# ── backoff_delay / retry_after_seconds (pure) ──────────────────────────────
+
+
+class TestBackoffDelay:
+    def test_jitter_within_exponential_cap(self):
+        for attempt in range(4):
+            cap = min(settings.HTTP_BACKOFF_MAX_SECONDS, settings.HTTP_BACKOFF_BASE_SECONDS * 2 ** attempt)
+            for _ in range(20):
+                assert 0 <= http_client.backoff_delay(attempt) <= cap
+
+    def test_capped_at_max(self):
+        assert http_client.backoff_delay(30) <= settings.HTTP_BACKOFF_MAX_SECONDS
+
+    def test_retry_after_wins(self):
+        assert http_client.backoff_delay(0, retry_after=2.0) == 2.0
+
+    def test_retry_after_capped(self):
+        assert http_client.backoff_delay(0, retry_after=3600) == settings.HTTP_BACKOFF_MAX_SECONDS
+
+
+class TestRetryAfterSeconds:
+    def test_none_response(self):
+        assert http_client.retry_after_seconds(None) is None
+
+    def test_numeric_header(self):
+        import httpx
+        assert http_client.retry_after_seconds(httpx.Response(429, headers={"Retry-After": "5"})) == 5.0
+
+    def test_http_date_header_ignored(self):
+        import httpx
+        resp = httpx.Response(429, headers={"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"})
+        assert http_client.retry_after_seconds(resp) is None
+
+
+# ── get() against the stub server ───────────────────────────────────────────
+
+
+class TestGet:
+    def test_reuses_pooled_connection(self, stub_url):
+        for i in range(3):
+            assert http_client.get("mfapi", f"{stub_url}/{i}").status_code == 200
+
+        counts = http_client.stats.snapshot()["mfapi"]
+        assert counts["requests"] == 3
+        assert counts["connections_opened"] <= 1
+        assert counts["connections_reused"] >= 2
+
+    def test_retries_5xx_then_succeeds(self, stub_url):
+        _StubHandler.statuses = [503, 502]
+        resp = http_client.get("mfapi", f"{stub_url}/scheme")
+        assert resp.status_code == 200
+        assert http_client.stats.snapshot()["mfapi"]["retries"] == 2
+
+    def test_retries_429(self, stub_url):
+        _StubHandler.statuses = [429]
+        assert http_client.get("yahoo", f"{stub_url}/search").status_code == 200
+        assert http_client.stats.snapshot()["yahoo"]["retries"] == 1
+
+    def test_returns_last_response_when_exhausted(self, stub_url):
+        _StubHandler.statuses = [500, 500, 500]
+        resp = http_client.get("mfapi", f"{stub_url}/x", max_retries=2)
+        assert resp.status_code == 500
+        assert http_client.stats.snapshot()["mfapi"]["retries"] == 2
+
+    def test_does_not_retry_4xx(self, stub_url):
+        _StubHandler.statuses = [404]
+        assert http_client.get("mfapi", f"{stub_url}/x").status_code == 404
+        assert http_client.stats.snapshot()["mfapi"]["retries"] == 0
+
+
+class RecordingGuard:
+    """A ProviderGuard that never throttles and records each outcome."""
+
+    def __init__(self):
+        self.outcomes: list[str] = []
+
+    def acquire(self, provider):
+        return 0
+
+    def record_success(self, provider):
+        self.outcomes.append("ok")
+
+    def record_failure(self, provider):
+        self.outcomes.append("failed")
+
+
+@pytest.mark.parametrize("error", [httpx.ReadTimeout, httpx.PoolTimeout, httpx.ConnectError])
+def test_transport_errors_are_retried_and_count_against_the_circuit(monkeypatch, error):
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt, retry_after=None: 0)
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        if len(calls) < 3:
+            raise error("hung", request=request)
+        return httpx.Response(200, json={})
+
+    monkeypatch.setattr(http_client, "_client", httpx.Client(transport=httpx.MockTransport(handler)))
+    guard = RecordingGuard()
+
+    assert http_client.get("yahoo", "https://example.test/q", max_retries=2, guard=guard).status_code == 200
+    assert guard.outcomes == ["failed", "failed", "ok"]
+
+    calls.clear()
+    with pytest.raises(error):
+        http_client.get("yahoo", "https://example.test/q", max_retries=1, guard=guard)
+
+
+# ── published stats ─────────────────────────────────────────────────────────
+
+
+class FakeRedis:
+    """A hash with HINCRBY through a pipeline."""
+
+    def __init__(self):
+        self.hashes: dict[str, dict[str, str]] = {}
+
+    def pipeline(self):
+        return self
+
+    def hincrby(self, key, field, n):
+        h = self.hashes.setdefault(key, {})
+        h[field] = str(int(h.get(field, 0)) + n)
+
+    def expire(self, key, seconds):
+        pass
+
+    def execute(self):
+        pass
+
+
+def test_workers_add_their_counters_to_the_shared_totals():
+    http_client.stats.reset()
+    r = FakeRedis()
+    for _ in range(2):  # two tasks, or two workers
+        http_client.stats.record_request("yahoo", opened=1)
+        http_client.stats.incr("yahoo", "retries")
+        http_client.publish_stats(r)
+
+    assert http_client.stats.snapshot() == {}
+    assert http_client.published_stats(r.hashes[http_client.stats_key()]) == {
+        "yahoo": {"requests": 2, "retries": 2, "connections_opened": 2, "connections_reused": 0},
+    }
+
+
+def test_nothing_to_publish_writes_nothing():
+    http_client.stats.reset()
+    r = FakeRedis()
+    http_client.publish_stats(r)
+    assert r.hashes == {}
@@ -0,0 +1,138 @@
+"""Tests for market_calendar (pure) and the calendar-driven beat schedules."""
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from app.services import market_calendar as cal
+from app.tasks.schedules import MarketCloseSchedule, MarketSessionSchedule
+
+UTC = timezone.utc
+IST = ZoneInfo("Asia/Kolkata")
+ET = ZoneInfo("America/New_York")
+
+
+# ── trading days and sessions ───────────────────────────────────────────────
+
+
+class TestTradingDays:
+    def test_weekends_are_closed(self):
+        assert not cal.is_trading_day("INDIA", date(2026, 10, 17))
+        assert not cal.is_trading_day("US", date(2026, 10, 18))
+
+    def test_holidays_are_per_exchange(self):
+        # Dussehra closes NSE, NYSE trades
+        assert not cal.is_trading_day("INDIA", date(2026, 10, 20))
+        assert cal.is_trading_day("US", date(2026, 10, 20))
+        # Thanksgiving closes NYSE, NSE trades
+        assert not cal.is_trading_day("US", date(2026, 11, 26))
+        assert cal.is_trading_day("INDIA", date(2026, 11, 26))
+
+    def test_mf_follows_nse_holidays(self):
+        assert not cal.is_trading_day("MF_DAILY", date(2026, 10, 20))
+
+    def test_muhurat_session_is_india_only(self):
+        assert cal.is_trading_day("INDIA", date(2025, 10, 21))
+        assert not cal.is_trading_day("MF_DAILY", date(2025, 10, 21))
+
+    def test_crypto_trades_every_day(self):
+        assert cal.is_trading_day("ALWAYS", date(2026, 10, 17))
+
+
+class TestSessions:
+    def test_regular_session_in_utc(self):
+        opens, closes = cal.session_on("US", date(2026, 10, 14))
+        assert opens == datetime(2026, 10, 14, 9, 30, tzinfo=ET)
+        assert closes == datetime(2026, 10, 14, 16, 0, tzinfo=ET)
+
+    def test_half_day_closes_early(self):
+        _, closes = cal.session_on("US", date(2026, 11, 27))
+        assert closes == datetime(2026, 11, 27, 13, 0, tzinfo=ET)
+
+    def test_holiday_has_no_session(self):
+        assert cal.session_on("INDIA", date(2026, 10, 20)) is None
+
+    def test_is_open_with_buffers(self):
+        before_open = datetime(2026, 10, 14, 8, 45, tzinfo=IST)
+        assert not cal.is_open("INDIA", before_open)
+        assert cal.is_open("INDIA", before_open, pre=timedelta(hours=1))
+        assert not cal.is_open("INDIA", datetime(2026, 10, 20, 11, 0, tzinfo=IST), pre=timedelta(hours=1))
+
+    def test_next_open_skips_holiday(self):
+        now = datetime(2026, 10, 19, 17, 0, tzinfo=IST)
+        assert cal.next_open("INDIA", now) == datetime(2026, 10, 21, 9, 15, tzinfo=IST)
+
+    def test_next_open_across_year_end(self):
+        now = datetime(2026, 12, 31, 17, 0, tzinfo=ET)
+        assert cal.next_open("US", now) == datetime(2027, 1, 4, 9, 30, tzinfo=ET)
+
+    def test_years_past_the_holiday_table_are_flagged(self, caplog):
+        cal._timeline.cache_clear()
+        cal._timeline("INDIA", 2031)
+        cal._timeline("US", 2026)
+        assert [r.getMessage() for r in caplog.records] == [
+            "No NSE holidays listed for 2031: INDIA sessions assume every weekday trades",
+        ]
+
+    def test_last_completed_session_skips_holiday(self):
+        now = datetime(2026, 10, 20, 17, 0, tzinfo=IST)
+        assert cal.last_completed_session("INDIA", now) == date(2026, 10, 19)
+
+    def test_last_completed_session_after_half_day(self):
+        now = datetime(2026, 11, 27, 14, 0, tzinfo=ET)
+        assert cal.last_completed_session("US", now) == date(2026, 11, 27)
+
+
+# ── beat schedules ──────────────────────────────────────────────────────────
+
+
+def _session_schedule(now: datetime) -> MarketSessionSchedule:
+    return MarketSessionSchedule(
+        timedelta(minutes=15), ("INDIA", "US"), timedelta(hours=1), nowfun=lambda: now.astimezone(UTC),
+    )
+
+
+class TestMarketSessionSchedule:
+    def test_due_every_run_every_in_session(self):
+        now = datetime(2026, 10, 14, 11, 0, tzinfo=IST)
+        schedule = _session_schedule(now)
+        assert schedule.is_due(now - timedelta(minutes=15)).is_due
+        state = schedule.is_due(now - timedelta(minutes=5))
+        assert not state.is_due
+        assert state.next == 600
+
+    def test_idle_cadence_outside_sessions(self):
+        # Saturday: only the idle cycle runs
+        now = datetime(2026, 10, 17, 12, 0, tzinfo=UTC)
+        schedule = _session_schedule(now)
+        assert not schedule.is_due(now - timedelta(minutes=30)).is_due
+        assert schedule.is_due(now - timedelta(hours=1)).is_due
+
+    def test_wakes_at_next_open(self):
+        # 20 min before the NSE pre-open buffer on Monday
+        now = datetime(2026, 10, 19, 7, 55, tzinfo=IST)
+        state = _session_schedule(now).is_due(now - timedelta(minutes=5))
+        assert not state.is_due
+        assert state.next == 20 * 60
+
+
+class TestMarketCloseSchedule:
+    def _schedule(self, now: datetime, groups=("INDIA", "US")) -> MarketCloseSchedule:
+        return MarketCloseSchedule(groups, timedelta(minutes=30), nowfun=lambda: now.astimezone(UTC))
+
+    def test_due_once_after_close(self):
+        now = datetime(2026, 10, 14, 16, 5, tzinfo=IST)
+        schedule = self._schedule(now)
+        assert schedule.is_due(now - timedelta(hours=2)).is_due
+        assert not schedule.is_due(now - timedelta(minutes=1)).is_due
+
+    def test_not_due_before_delay(self):
+        now = datetime(2026, 10, 14, 15, 45, tzinfo=IST)
+        state = self._schedule(now).is_due(now - timedelta(hours=2))
+        assert not state.is_due
+        assert state.next == 15 * 60
+
+    def test_holiday_has_no_close(self):
+        # NSE closed for Dussehra: the next event is the NYSE close
+        now = datetime(2026, 10, 20, 16, 5, tzinfo=IST)
+        state = self._schedule(now).is_due(now - timedelta(minutes=5))
+        assert not state.is_due
+        assert now + timedelta(seconds=state.next) == datetime(2026, 10, 20, 16, 30, tzinfo=ET)
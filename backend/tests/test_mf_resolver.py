@@ -1,5 +1,5 @@
 """Tests for mf_resolver: _normalize_name (pure), _search_mfapi, _get_scheme_isin,
-_search_yahoo_by_isin (mocked HTTP), resolve_mf_ticker_sync & resolve_mf_ticker (mocked chain)."""
+_search_yahoo_by_isin (mocked http_client), resolve_mf_ticker_sync & resolve_mf_ticker (mocked chain)."""
 import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -38,7 +38,7 @@ class TestNormalizeName:
 
 
 class TestSearchMfapi:
-    @patch("app.services.mf_resolver.requests.get")
+    @patch("app.services.mf_resolver.http_client.get")
     def test_successful_search(self, mock_get):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -52,7 +52,7 @@ class TestSearchMfapi:
         assert result is not None
         assert result["schemeCode"] == 12345
 
-    @patch("app.services.mf_resolver.requests.get")
+    @patch("app.services.mf_resolver.http_client.get")
     def test_empty_results(self, mock_get):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -61,12 +61,12 @@ class TestSearchMfapi:
 
         assert _search_mfapi("Nonexistent Fund XYZ") is None
 
-    @patch("app.services.mf_resolver.requests.get")
+    @patch("app.services.mf_resolver.http_client.get")
     def test_network_error(self, mock_get):
         mock_get.side_effect = Exception("Connection timeout")
         assert _search_mfapi("HDFC Top 100") is None
 
-    @patch("app.services.mf_resolver.requests.get")
+    @patch("app.services.mf_resolver.http_client.get")
     def test_non_200_status(self, mock_get):
         mock_resp = MagicMock()
         mock_resp.status_code = 500
@@ -79,7 +79,7 @@ class TestSearchMfapi:
 
 
 class TestGetSchemeIsin:
-    @patch("app.services.mf_resolver.requests.get")
+    @patch("app.services.mf_resolver.http_client.get")
     def test_prefers_isin_growth(self, mock_get):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -93,7 +93,7 @@ class TestGetSchemeIsin:
 
         assert _get_scheme_isin(12345) == "INF179K01YX0"
 
-    @patch("app.services.mf_resolver.requests.get")
+    @patch("app.services.mf_resolver.http_client.get")
     def test_fallback_to_div_reinvestment(self, mock_get):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -107,7 +107,7 @@ class TestGetSchemeIsin:
 
         assert _get_scheme_isin(12345) == "INF179K01YY8"
 
-    @patch("app.services.mf_resolver.requests.get")
+    @patch("app.services.mf_resolver.http_client.get")
     def test_no_isin_available(self, mock_get):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -116,7 +116,7 @@ class TestGetSchemeIsin:
 
         assert _get_scheme_isin(12345) is None
 
-    @patch("app.services.mf_resolver.requests.get")
+    @patch("app.services.mf_resolver.http_client.get")
     def test_api_error(self, mock_get):
         mock_resp = MagicMock()
         mock_resp.status_code = 404
@@ -129,7 +129,7 @@ class TestGetSchemeIsin:
 
 
 class TestSearchYahooByIsin:
-    @patch("app.services.mf_resolver.requests.get")
+    @patch("app.services.mf_resolver.http_client.get")
     def test_returns_bo_symbol(self, mock_get):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -143,7 +143,7 @@ class TestSearchYahooByIsin:
 
         assert _search_yahoo_by_isin("INF179K01YX0") == "0P0000YWL1.BO"
 
-    @patch("app.services.mf_resolver.requests.get")
+    @patch("app.services.mf_resolver.http_client.get")
     def test_returns_first_quote_fallback(self, mock_get):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -156,7 +156,7 @@ class TestSearchYahooByIsin:
 
         assert _search_yahoo_by_isin("INF179K01YX0") == "SOMEFUND.NS"
 
-    @patch("app.services.mf_resolver.requests.get")
+    @patch("app.services.mf_resolver.http_client.get")
     def test_no_quotes(self, mock_get):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -165,7 +165,7 @@ class TestSearchYahooByIsin:
 
         assert _search_yahoo_by_isin("INF000000000") is None
 
-    @patch("app.services.mf_resolver.requests.get")
+    @patch("app.services.mf_resolver.http_client.get")
     def test_network_error(self, mock_get):
         mock_get.side_effect = Exception("Connection refused")
         assert _search_yahoo_by_isin("INF179K01YX0") is None
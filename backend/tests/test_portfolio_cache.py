@@ -0,0 +1,211 @@
+"""Tests for portfolio_cache: versioned keys, invalidation, miss coalescing and
+the session compute runs on (in-memory async Redis and session stand-ins)."""
+import asyncio
+import json
+import uuid
+
+import pytest
+import redis.asyncio as aioredis
+
+from app.services import portfolio_cache
+from app.services.portfolio_cache import (
+    BENCHMARK_VERSION_KEY,
+    PRICE_SNAPSHOT_KEY,
+    bump_holdings_version,
+    cached_view,
+    holdings_version_key,
+    view_etag,
+)
+from tests.helpers import FakeAsyncRedis
+
+
+class BrokenRedis:
+    def register_script(self, script):
+        async def lookup(keys, args):
+            raise aioredis.ConnectionError("down")
+        return lookup
+
+    async def mget(self, *keys):
+        raise aioredis.ConnectionError("down")
+
+
+class FakeSession:
+    """Stands in for async_session(): open only inside its async with."""
+
+    def __init__(self):
+        self.open = False
+
+    async def __aenter__(self):
+        self.open = True
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.open = False
+
+
+class Counter:
+    def __init__(self, value=None, delay=0.0):
+        self.calls = 0
+        self.value = value or {"total": 1}
+        self.delay = delay
+        self.sessions: list[FakeSession] = []
+
+    async def __call__(self, db):
+        self.calls += 1
+        self.sessions.append(db)
+        await asyncio.sleep(self.delay)
+        assert db.open
+        return self.value
+
+
+USER = uuid.uuid4()
+
+
+@pytest.fixture(autouse=True)
+def sessions(monkeypatch):
+    monkeypatch.setattr(portfolio_cache, "async_session", FakeSession)
+
+
+@pytest.mark.asyncio
+async def test_miss_then_hit():
+    redis, compute = FakeAsyncRedis(), Counter()
+    assert await cached_view(redis, USER, "dashboard", compute) == {"total": 1}
+    assert await cached_view(redis, USER, "dashboard", compute) == {"total": 1}
+    assert compute.calls == 1
+    assert f"portfolio:{USER}:dashboard:0:0" in redis.store
+
+
+@pytest.mark.asyncio
+async def test_holdings_version_bump_invalidates_only_that_user():
+    redis, compute = FakeAsyncRedis(), Counter()
+    other = uuid.uuid4()
+    await cached_view(redis, USER, "dashboard", compute)
+    await cached_view(redis, other, "dashboard", compute)
+
+    await bump_holdings_version(redis, USER)
+    await cached_view(redis, USER, "dashboard", compute)
+    await cached_view(redis, other, "dashboard", compute)
+    assert compute.calls == 3
+    assert redis.store[holdings_version_key(USER)] == "1"
+
+
+@pytest.mark.asyncio
+async def test_price_snapshot_invalidates_every_view():
+    redis, compute = FakeAsyncRedis(), Counter()
+    await cached_view(redis, USER, "summary", compute)
+    await redis.incr(PRICE_SNAPSHOT_KEY)
+    await cached_view(redis, USER, "summary", compute)
+    assert compute.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_benchmark_version_invalidates_only_views_drawing_benchmarks():
+    redis, compute = FakeAsyncRedis(), Counter()
+    await cached_view(redis, USER, "summary", compute)
+    await cached_view(redis, USER, "performance", compute, benchmarks=True)
+    assert f"portfolio:{USER}:performance:0:0:0" in redis.store
+
+    await redis.incr(BENCHMARK_VERSION_KEY)
+    await cached_view(redis, USER, "summary", compute)
+    await cached_view(redis, USER, "performance", compute, benchmarks=True)
+    assert compute.calls == 3
+    assert f"portfolio:{USER}:performance:0:0:1" in redis.store
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_are_coalesced():
+    redis, compute = FakeAsyncRedis(), Counter(delay=0.01)
+    results = await asyncio.gather(*(cached_view(redis, USER, "dashboard", compute) for _ in range(10)))
+    assert compute.calls == 1
+    assert all(r == {"total": 1} for r in results)
+    assert portfolio_cache._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_shared_compute_survives_the_first_caller_going_away():
+    redis, compute = FakeAsyncRedis(), Counter(delay=0.02)
+    first = asyncio.ensure_future(cached_view(redis, USER, "dashboard", compute))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(cached_view(redis, USER, "dashboard", compute))
+    await asyncio.sleep(0)
+    first.cancel()  # client disconnected
+
+    assert await second == {"total": 1}
+    assert compute.calls == 1
+    assert not compute.sessions[0].open
+
+
+@pytest.mark.asyncio
+async def test_waits_for_another_process_holding_the_lock():
+    redis, compute = FakeAsyncRedis(), Counter()
+    key = f"portfolio:{USER}:dashboard:0:0"
+    redis.store[f"portfolio_lock:{USER}:dashboard:0:0"] = "1"
+
+    async def other_process_finishes():
+        await asyncio.sleep(0.08)
+        redis.store[key] = json.dumps({"total": 2})
+
+    result, _ = await asyncio.gather(cached_view(redis, USER, "dashboard", compute), other_process_finishes())
+    assert result == {"total": 2}
+    assert compute.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_compute_releases_the_lock():
+    redis = FakeAsyncRedis()
+
+    async def fail(db):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await cached_view(redis, USER, "dashboard", fail)
+    assert f"portfolio_lock:{USER}:dashboard:0:0" not in redis.store
+    assert await cached_view(redis, USER, "dashboard", Counter()) == {"total": 1}
+
+
+@pytest.mark.asyncio
+async def test_redis_down_computes_directly():
+    compute = Counter()
+    assert await cached_view(BrokenRedis(), USER, "dashboard", compute) == {"total": 1}
+    assert compute.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_etag_follows_both_versions():
+    redis = FakeAsyncRedis()
+    etag = await view_etag(redis, USER, "summary")
+    assert etag.startswith('W/"0.0.')
+    assert await view_etag(redis, USER, "summary") == etag
+
+    await bump_holdings_version(redis, USER)
+    after_write = await view_etag(redis, USER, "summary")
+    assert after_write.startswith('W/"1.0.')
+    await redis.incr(PRICE_SNAPSHOT_KEY)
+    assert (await view_etag(redis, USER, "summary")).startswith('W/"1.1.')
+
+
+@pytest.mark.asyncio
+async def test_benchmark_etag_follows_the_benchmark_version():
+    redis = FakeAsyncRedis()
+    summary = await view_etag(redis, USER, "summary")
+    assert (await view_etag(redis, USER, "dashboard", benchmarks=True)).startswith('W/"0.0.0.')
+
+    await redis.incr(BENCHMARK_VERSION_KEY)
+    assert await view_etag(redis, USER, "summary") == summary
+    assert (await view_etag(redis, USER, "dashboard", benchmarks=True)).startswith('W/"0.0.1.')
+
+
+@pytest.mark.asyncio
+async def test_etag_differs_per_view_and_user():
+    redis = FakeAsyncRedis()
+    etags = {
+        await view_etag(redis, USER, "summary"),
+        await view_etag(redis, USER, "allocation"),
+        await view_etag(redis, uuid.uuid4(), "summary"),
+    }
+    assert len(etags) == 3
+
+
+@pytest.mark.asyncio
+async def test_etag_unavailable_when_redis_down():
+    assert await view_etag(BrokenRedis(), USER, "summary") is None
@@ -0,0 +1,290 @@
+"""Tests for portfolio_service valuation: _summarize, _allocate, _rank_holdings (pure),
+_build_performance's matrix engine and materialized read path, and get_dashboard's
+single valuation pass (mocked DB + price resolution)."""
+import uuid
+from datetime import date, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.services import portfolio_service
+from app.models.portfolio_daily_value import TOTAL_CATEGORY
+from app.services.benchmark_service import benchmark_index, encode_series
+from app.services.portfolio_service import (
+    _allocate,
+    _build_performance,
+    _inception_days,
+    _rank_holdings,
+    _summarize,
+    sample_indices,
+)
+
+
+def _holding(name, asset_class_code, quantity, avg_buy_price, symbol=None):
+    h = MagicMock(
+        id=uuid.uuid4(), symbol=symbol, asset_class_code=asset_class_code,
+        exchange=None, quantity=quantity, avg_buy_price=avg_buy_price,
+        buy_currency="INR", is_active=True,
+    )
+    h.name = name  # MagicMock's own name= kwarg names the mock
+    return h
+
+
+def _price(price, previous_close=None, day_change_pct=0, source="cache"):
+    return {"price": price, "previous_close": previous_close, "day_change_pct": day_change_pct, "source": source}
+
+
+HOLDINGS = [
+    _holding("TCS", "EQUITY_IN", 10, 3000.0, "TCS"),
+    _holding("FD", "FIXED_DEPOSIT", 1, 50000.0),
+]
+VALUED = [
+    (HOLDINGS[0], _price(3500.0, 3400.0, 2.94)),
+    (HOLDINGS[1], _price(50000.0, source="cost_basis")),
+]
+
+
+# ── pure aggregations ───────────────────────────────────────────────────────
+
+
+class TestValuation:
+    def test_summary(self):
+        summary = _summarize(VALUED)
+        assert summary["total_invested"] == 80000.0
+        assert summary["current_value"] == 85000.0
+        assert summary["total_gain_loss"] == 5000.0
+        assert summary["day_change"] == 1000.0
+
+    def test_summary_without_prices_is_cost_basis(self):
+        summary = _summarize([(h, None) for h in HOLDINGS])
+        assert summary["current_value"] == summary["total_invested"] == 80000.0
+
+    def test_allocation_sorted_by_value(self):
+        allocation = _allocate(VALUED)
+        assert [a["asset_class"] for a in allocation] == ["FIXED_DEPOSIT", "EQUITY_IN"]
+        assert sum(a["percentage"] for a in allocation) == pytest.approx(100, abs=0.02)
+
+    def test_ranked_holdings(self):
+        ranked = _rank_holdings(VALUED)
+        assert [r["name"] for r in ranked] == ["FD", "TCS"]
+        assert ranked[1]["gain_loss"] == 5000.0
+        assert ranked[1]["day_change_pct"] == 2.94
+
+
+# ── get_dashboard (single pass) ─────────────────────────────────────────────
+
+
+@pytest.mark.asyncio
+async def test_dashboard_loads_and_prices_holdings_once():
+    performance = {"portfolio": [], "by_category": {}, "benchmarks": {}}
+    with patch.object(portfolio_service, "_load_holdings", AsyncMock(return_value=HOLDINGS)) as load, \
+            patch.object(portfolio_service, "resolve_prices_bulk",
+                         AsyncMock(return_value=[p for _, p in VALUED])) as resolve, \
+            patch.object(portfolio_service, "_build_performance", AsyncMock(return_value=performance)) as perf:
+        dashboard = await portfolio_service.get_dashboard(AsyncMock(), uuid.uuid4(), redis=AsyncMock())
+
+    load.assert_awaited_once()
+    resolve.assert_awaited_once()
+    perf.assert_awaited_once()
+    assert dashboard["summary"] == _summarize(VALUED)
+    assert dashboard["allocation"] == _allocate(VALUED)
+    assert dashboard["all_holdings"] == _rank_holdings(VALUED)
+    assert dashboard["top_holdings"] == dashboard["all_holdings"][:5]
+    assert dashboard["performance"] is performance
+
+
+# ── _build_performance (matrix engine) ──────────────────────────────────────
+
+
+def _history_db(rows):
+    result = MagicMock()
+    result.all.return_value = rows
+    return AsyncMock(execute=AsyncMock(return_value=result))
+
+
+@pytest.mark.asyncio
+async def test_performance_forward_fills_from_cost_basis():
+    today = date.today()
+    holdings = [
+        _holding("TCS", "EQUITY_IN", 10, 3000.0, "TCS"),
+        _holding("TCS again", "EQUITY_IN", 10, 3200.0, "TCS"),
+        _holding("FD", "FIXED_DEPOSIT", 1, 50000.0),
+    ]
+    rows = [
+        ("TCS.NS", today - timedelta(days=2), 3500.0),
+        ("TCS.NS", today, 3600.0),
+        ("^NSEI", today - timedelta(days=1), 20000.0),
+        ("^NSEI", today, 21000.0),
+    ]
+    perf = await _build_performance(_history_db(rows), holdings, days=3)
+
+    # Day 0 values TCS at its weighted average cost (3100), then the last close carries forward
+    assert [p["value"] for p in perf["portfolio"]] == [112000.0, 120000.0, 120000.0, 122000.0]
+    assert [p["date"] for p in perf["portfolio"]] == [(today - timedelta(days=i)).isoformat() for i in (3, 2, 1, 0)]
+    assert [p["value"] for p in perf["by_category"]["Equity"]] == [62000.0, 70000.0, 70000.0, 72000.0]
+    assert [p["value"] for p in perf["by_category"]["Fixed Income"]] == [50000.0] * 4
+
+    # Benchmarks start at their first close, scaled to the portfolio's starting value
+    assert perf["benchmarks"] == {"Nifty 50": [
+        {"date": (today - timedelta(days=1)).isoformat(), "value": 112000.0},
+        {"date": today.isoformat(), "value": 117600.0},
+    ]}
+
+
+@pytest.mark.asyncio
+async def test_performance_values_are_plain_floats():
+    perf = await _build_performance(_history_db([]), [_holding("TCS", "EQUITY_IN", 3, 0.1, "TCS")], days=1)
+    assert all(type(p["value"]) is float for p in perf["portfolio"])
+    assert perf["benchmarks"] == {}
+
+
+# ── _build_performance (materialized daily values) ──────────────────────────
+
+
+def _rows(*rows):
+    result = MagicMock()
+    result.all.return_value = [
+        MagicMock(category=c, date=d, value=v, holdings_version=hv) for c, d, v, hv in rows
+    ]
+    return result
+
+
+def _materialized_db(value_rows, history_rows=()):
+    history = MagicMock()
+    history.all.return_value = list(history_rows)
+    return AsyncMock(execute=AsyncMock(side_effect=[value_rows, history]))
+
+
+def _versioned_redis(version, benchmark_series=None):
+    # Position events already cached, with none dated; benchmark series as hash fields
+    fields = benchmark_series or {}
+    return AsyncMock(
+        get=AsyncMock(return_value=version),
+        lrange=AsyncMock(return_value=["*"]),
+        hmget=AsyncMock(side_effect=lambda key, names: [fields.get(n) for n in names]),
+    )
+
+
+@pytest.mark.asyncio
+async def test_performance_reads_current_daily_values():
+    today = date.today()
+    start = today - timedelta(days=2)
+    db = _materialized_db(
+        _rows(
+            (TOTAL_CATEGORY, start, 1000.0, 2), ("Equity", start, 1000.0, 2),
+            (TOTAL_CATEGORY, start + timedelta(days=1), 1100.0, 2), ("Equity", start + timedelta(days=1), 1100.0, 2),
+        ),
+        [("^NSEI", start, 100.0), ("^NSEI", today, 110.0)],
+    )
+    perf = await _build_performance(
+        db, [_holding("TCS", "EQUITY_IN", 10, 90.0, "TCS")], days=2, user_id=uuid.uuid4(), redis=_versioned_redis("2"),
+    )
+
+    # Today has no stored row yet: yesterday's value carries forward
+    assert [p["value"] for p in perf["portfolio"]] == [1000.0, 1100.0, 1100.0]
+    assert [p["value"] for p in perf["by_category"]["Equity"]] == [1000.0, 1100.0, 1100.0]
+    assert [p["value"] for p in perf["benchmarks"]["Nifty 50"]] == [1000.0, 1000.0, 1100.0]
+
+
+@pytest.mark.asyncio
+async def test_performance_rescales_cached_benchmark_series():
+    today = date.today()
+    start = today - timedelta(days=2)
+    # Cached a week back, so ^NSEI's index is relative to an earlier close
+    cache_start = today - timedelta(days=7)
+    history = [("^NSEI", cache_start, 50.0), ("^NSEI", start, 100.0), ("^NSEI", today, 110.0), ("^GSPC", today, 10.0)]
+    cached = encode_series(benchmark_index(history, ["^NSEI", "^GSPC"], cache_start, 7), cache_start)
+    db = AsyncMock(execute=AsyncMock(return_value=_rows(
+        (TOTAL_CATEGORY, start, 1000.0, 2), ("Equity", start, 1000.0, 2),
+    )))
+    perf = await _build_performance(
+        db, [_holding("TCS", "EQUITY_IN", 10, 90.0, "TCS")], days=2, user_id=uuid.uuid4(),
+        redis=_versioned_redis("2", cached), benchmarks=["^NSEI", "^IXIC"],
+    )
+
+    # Only the daily values are read from the database
+    db.execute.assert_awaited_once()
+    assert perf["benchmarks"] == {"Nifty 50": [
+        {"date": start.isoformat(), "value": 1000.0},
+        {"date": (start + timedelta(days=1)).isoformat(), "value": 1000.0},
+        {"date": today.isoformat(), "value": 1100.0},
+    ]}
+
+
+@pytest.mark.asyncio
+async def test_performance_recomputes_when_daily_values_are_stale():
+    today = date.today()
+    start = today - timedelta(days=1)
+    db = _materialized_db(
+        _rows((TOTAL_CATEGORY, start, 1.0, 1), ("Equity", start, 1.0, 1)),
+        [("TCS.NS", start, 100.0)],
+    )
+    perf = await _build_performance(
+        db, [_holding("TCS", "EQUITY_IN", 10, 90.0, "TCS")], days=1, user_id=uuid.uuid4(), redis=_versioned_redis("2"),
+    )
+    assert [p["value"] for p in perf["portfolio"]] == [1000.0, 1000.0]
+
+
+@pytest.mark.asyncio
+async def test_performance_recomputes_when_daily_values_start_late():
+    today = date.today()
+    db = _materialized_db(
+        _rows((TOTAL_CATEGORY, today, 1.0, 0), ("Equity", today, 1.0, 0)),
+    )
+    perf = await _build_performance(
+        db, [_holding("TCS", "EQUITY_IN", 10, 90.0, "TCS")], days=1, user_id=uuid.uuid4(), redis=_versioned_redis(None),
+    )
+    assert [p["value"] for p in perf["portfolio"]] == [900.0, 900.0]
+
+
+# ── downsampling ────────────────────────────────────────────────────────────
+
+
+class TestSampleIndices:
+    def test_week_and_month_ends(self):
+        values = np.zeros(40)
+        # 2026-10-01 is a Thursday: Sundays fall on days 3, 10, 17, ...
+        assert sample_indices(date(2026, 10, 1), values, "week").tolist() == [0, 3, 10, 17, 24, 31, 38, 39]
+        assert sample_indices(date(2026, 9, 20), values, "month").tolist() == [0, 10, 39]
+
+    def test_lttb_keeps_the_ends_and_the_extremes(self):
+        values = np.full(3651, 100.0)
+        values[1234], values[2345] = 180.0, 20.0
+        keep = sample_indices(date(2016, 10, 1), values, points=500)
+        assert len(keep) == 500
+        assert keep[0] == 0 and keep[-1] == 3650
+        assert {1234, 2345} <= set(keep.tolist())
+        assert (np.diff(keep) > 0).all()
+
+    def test_short_series_are_untouched(self):
+        assert sample_indices(date(2026, 10, 1), np.zeros(31), points=500).tolist() == list(range(31))
+
+
+@pytest.mark.asyncio
+async def test_downsampled_series_share_their_dates():
+    today = date.today()
+    rows = [("TCS.NS", today - timedelta(days=i), 100.0 + i % 7) for i in range(400)]
+    rows += [("^NSEI", today - timedelta(days=i), 1000.0 + i) for i in range(0, 400, 3)]
+    holdings = [_holding("TCS", "EQUITY_IN", 10, 90.0, "TCS"), _holding("FD", "FIXED_DEPOSIT", 1, 500.0)]
+    perf = await _build_performance(_history_db(rows), holdings, days=365, interval="week", points=20)
+
+    dates = [p["date"] for p in perf["portfolio"]]
+    assert len(dates) == 20
+    assert dates[0] == (today - timedelta(days=365)).isoformat() and dates[-1] == today.isoformat()
+    assert [p["date"] for p in perf["by_category"]["Fixed Income"]] == dates
+    # Nifty's first close in the window is two days in
+    assert [p["date"] for p in perf["benchmarks"]["Nifty 50"]] == dates[1:]
+
+
+@pytest.mark.asyncio
+async def test_inception_is_the_first_transaction_or_holding():
+    today = date.today()
+    holding = _holding("TCS", "EQUITY_IN", 10, 90.0, "TCS")
+    holding.created_at = datetime.combine(today - timedelta(days=30), datetime.min.time())
+    db = AsyncMock(execute=AsyncMock(return_value=MagicMock(scalar=MagicMock(return_value=today - timedelta(days=400)))))
+    assert await _inception_days(db, uuid.uuid4(), [holding]) == 400
+
+    db.execute.return_value.scalar.return_value = None
+    assert await _inception_days(db, uuid.uuid4(), [holding]) == 30
+    assert await _inception_days(db, uuid.uuid4(), []) == 7
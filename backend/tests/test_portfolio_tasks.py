@@ -0,0 +1,205 @@
+"""Tests for portfolio_tasks: incremental vs full materialization (_materialize_sync),
+the per-user view invalidation after an update (_bump_value_versions_sync) and
+the affected-user planning of update_portfolio_values (mocked DB + Redis)."""
+from datetime import date, timedelta
+from unittest.mock import MagicMock, patch
+
+from app.models.portfolio_daily_value import TOTAL_CATEGORY
+from app.tasks import portfolio_tasks
+from app.services.benchmark_service import BENCHMARK_SERIES_KEY
+from app.services.portfolio_cache import BENCHMARK_VERSION_KEY, holdings_version_key
+from app.tasks.portfolio_tasks import (
+    _VALUE_DAYS,
+    _bump_value_versions_sync,
+    _materialize_sync,
+    update_benchmark_series,
+    update_portfolio_values,
+)
+from tests.helpers import make_holding
+
+TODAY = date.today()
+WINDOW_START = TODAY - timedelta(days=_VALUE_DAYS)
+
+
+def _redis(versions: list):
+    r = MagicMock()
+    r.mget.return_value = versions
+    return r
+
+
+# ── _materialize_sync ───────────────────────────────────────────────────────
+
+
+@patch.object(portfolio_tasks, "_write_values_sync", return_value=1)
+@patch.object(portfolio_tasks, "_load_position_events_sync", return_value={})
+@patch.object(portfolio_tasks, "_load_price_rows_sync")
+@patch.object(portfolio_tasks, "_get_value_versions_sync")
+@patch.object(portfolio_tasks, "_get_sync_db")
+@patch.object(portfolio_tasks, "_get_sync_redis")
+class TestMaterialize:
+    def test_current_user_is_updated_from_its_start(self, redis, db, versions, prices, events, write):
+        start = TODAY - timedelta(days=2)
+        redis.return_value = _redis(["3"])
+        versions.return_value = {"u1": (3, 3)}
+        prices.return_value = ([("TCS.NS", start, 120.0)], {"TCS.NS": 110.0})
+
+        result = _materialize_sync({"u1": [make_holding("TCS")]}, {"u1": start})
+
+        assert prices.call_args.args[2] == start
+        _, user_id, written_from, values, version = write.call_args.args
+        assert (user_id, written_from, version) == ("u1", start, 3)
+        assert write.call_args.kwargs == {"replace": False}
+        # Only the recomputed days are written; the close carries forward to today
+        assert values[TOTAL_CATEGORY] == [1200.0, 1200.0, 1200.0]
+        assert values["Equity"] == [1200.0, 1200.0, 1200.0]
+        assert result == {"users": 1, "rebuilt": 0, "rows": 1}
+
+    def test_stale_user_is_rebuilt_in_full(self, redis, db, versions, prices, events, write):
+        redis.return_value = _redis(["4"])
+        versions.return_value = {"u1": (3, 4)}
+        prices.return_value = ([], {})
+
+        result = _materialize_sync({"u1": [make_holding("TCS")]}, {"u1": TODAY})
+
+        assert prices.call_args.args[2] == WINDOW_START
+        _, _, written_from, values, version = write.call_args.args
+        assert (written_from, version) == (WINDOW_START, 4)
+        assert write.call_args.kwargs == {"replace": True}
+        assert len(values[TOTAL_CATEGORY]) == _VALUE_DAYS + 1
+        assert result["rebuilt"] == 1
+
+    def test_users_share_one_price_load(self, redis, db, versions, prices, events, write):
+        start = TODAY - timedelta(days=5)
+        redis.return_value = _redis(["1", "1"])
+        versions.return_value = {"u1": (1, 1), "u2": (1, 1)}
+        prices.return_value = ([], {})
+
+        _materialize_sync(
+            {"u1": [make_holding("TCS")], "u2": [make_holding("INFY"), make_holding("FD", "FIXED_DEPOSIT")]},
+            {"u1": start, "u2": TODAY},
+        )
+
+        prices.assert_called_once()
+        assert prices.call_args.args[1:] == (["INFY.NS", "TCS.NS"], start)
+        u2 = write.call_args_list[1].args
+        assert u2[2] == TODAY
+        assert u2[3][TOTAL_CATEGORY] == [2000.0]
+        assert u2[3]["Fixed Income"] == [1000.0]
+
+    def test_positions_follow_dated_transactions(self, redis, db, versions, prices, events, write):
+        start = TODAY - timedelta(days=2)
+        tcs = make_holding("TCS", quantity=15.0)
+        redis.return_value = _redis(["1"])
+        versions.return_value = {"u1": (1, 1)}
+        prices.return_value = ([("TCS.NS", start, 100.0)], {})
+        # 5 of the 15 shares were bought yesterday
+        events.return_value = {"u1": [("t1", str(tcs.id), TODAY - timedelta(days=1), 5.0)]}
+
+        _materialize_sync({"u1": [tcs]}, {"u1": start})
+
+        assert write.call_args.args[3][TOTAL_CATEGORY] == [1000.0, 1500.0, 1500.0]
+
+    def test_user_without_holdings_is_cleared(self, redis, db, versions, prices, events, write):
+        redis.return_value = _redis([None])
+        versions.return_value = {"u1": (0, 0)}
+        prices.return_value = ([], {})
+
+        _materialize_sync({}, {"u1": None})
+
+        _, user_id, _, values, _ = write.call_args.args
+        assert (user_id, values) == ("u1", {})
+        assert write.call_args.kwargs == {"replace": True}
+
+    def test_invalidate_bumps_the_users_written(self, redis, db, versions, prices, events, write):
+        redis.return_value = _redis(["3", "5"])
+        versions.return_value = {"u1": (3, 3), "u2": (5, 5)}
+        prices.return_value = ([], {})
+        write.side_effect = [1, RuntimeError("deadlock")]
+
+        with patch.object(portfolio_tasks, "_bump_value_versions_sync") as bump:
+            _materialize_sync({"u1": [make_holding("TCS")], "u2": [make_holding("INFY")]}, {"u1": TODAY, "u2": TODAY}, invalidate=True)
+
+        assert bump.call_args.args[2] == {"u1": 3}
+
+
+# ── update_portfolio_values ─────────────────────────────────────────────────
+
+
+@patch.object(portfolio_tasks, "holders_of_sync", return_value=None)
+@patch.object(portfolio_tasks, "_get_sync_redis")
+@patch.object(portfolio_tasks, "_materialize_sync", return_value={"users": 0, "rebuilt": 0, "rows": 0})
+@patch.object(portfolio_tasks, "load_holdings_by_user_sync")
+@patch.object(portfolio_tasks, "_get_sync_db")
+def test_update_starts_each_user_at_their_earliest_change(db, holdings, materialize, redis, holders_of):
+    holdings.return_value = {
+        "u1": [make_holding("TCS"), make_holding("INFY")],
+        "u2": [make_holding("RELIANCE")],
+        "u3": [make_holding("FD", "FIXED_DEPOSIT")],
+    }
+    update_portfolio_values({"TCS.NS": "2026-10-14", "INFY.NS": "2026-10-12", "HDFC.NS": "2026-10-01"})
+
+    _, starts = materialize.call_args.args
+    assert starts == {"u1": date(2026, 10, 12)}
+    # Cold holder index: every user's holdings are loaded
+    assert holdings.call_args.args[1] is None
+
+
+@patch.object(portfolio_tasks, "holders_of_sync", return_value={"u2", "u1"})
+@patch.object(portfolio_tasks, "_get_sync_redis")
+@patch.object(portfolio_tasks, "_materialize_sync", return_value={"users": 0, "rebuilt": 0, "rows": 0})
+@patch.object(portfolio_tasks, "load_holdings_by_user_sync")
+@patch.object(portfolio_tasks, "_get_sync_db")
+def test_update_loads_only_the_tickers_holders(db, holdings, materialize, redis, holders_of):
+    holdings.return_value = {"u1": [make_holding("TCS")], "u2": [make_holding("RELIANCE")]}
+    update_portfolio_values({"TCS.NS": "2026-10-14"})
+
+    assert holders_of.call_args.args[1] == ["TCS.NS"]
+    assert holdings.call_args.args[1] == ["u1", "u2"]
+    # The index may list a former holder: the loaded holdings decide
+    _, starts = materialize.call_args.args
+    assert starts == {"u1": date(2026, 10, 14)}
+
+
+@patch.object(portfolio_tasks, "holders_of_sync", return_value={"u1"})
+@patch.object(portfolio_tasks, "_get_sync_redis")
+@patch.object(portfolio_tasks, "_materialize_sync", return_value={"users": 1, "rebuilt": 0, "rows": 3})
+@patch.object(portfolio_tasks, "load_holdings_by_user_sync")
+@patch.object(portfolio_tasks, "_get_sync_db")
+def test_update_invalidates_only_the_updated_users(db, holdings, materialize, redis, holders_of):
+    holdings.return_value = {"u1": [make_holding("TCS")]}
+    update_portfolio_values({"TCS.NS": "2026-10-14"})
+    assert materialize.call_args.kwargs == {"invalidate": True}
+    redis.return_value.incr.assert_not_called()
+
+
+def test_bumped_users_keep_their_rows_unless_their_holdings_moved_on():
+    r, conn = MagicMock(), MagicMock()
+    # u2's holdings changed after its values were computed: its version is already 8
+    r.pipeline.return_value.execute.return_value = [4, 9]
+
+    with patch.object(portfolio_tasks.psycopg2.extras, "execute_values") as execute_values:
+        _bump_value_versions_sync(conn, r, {"u1": 3, "u2": 7})
+
+    assert [c.args for c in r.pipeline.return_value.incr.call_args_list] == [
+        (holdings_version_key("u1"),), (holdings_version_key("u2"),),
+    ]
+    assert execute_values.call_args.args[2] == [("u1", 3, 4)]
+    conn.commit.assert_called_once()
+
+
+# ── update_benchmark_series ─────────────────────────────────────────────────
+
+
+@patch.object(portfolio_tasks, "_load_price_rows_sync")
+@patch.object(portfolio_tasks, "_get_sync_db")
+@patch.object(portfolio_tasks, "_get_sync_redis")
+def test_benchmark_series_replace_the_cache_and_bump_their_version(redis, db, prices):
+    prices.return_value = ([("^NSEI", TODAY, 100.0)], {})
+    pipe = redis.return_value.pipeline.return_value
+
+    assert update_benchmark_series() == {"benchmarks": 1, "start": WINDOW_START.isoformat()}
+    assert prices.call_args.args[2] == WINDOW_START
+    fields = pipe.hset.call_args.kwargs["mapping"]
+    assert pipe.hset.call_args.args == (BENCHMARK_SERIES_KEY,)
+    assert set(fields) == {"_start", "^NSEI"}
+    pipe.incr.assert_called_once_with(BENCHMARK_VERSION_KEY)
@@ -0,0 +1,123 @@
+"""Tests for position_service: transaction_event filtering, position_matrix replay
+and the append-only position event cache (in-memory async Redis stand-in)."""
+import uuid
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from app.services.position_service import (
+    load_position_events,
+    position_events_key,
+    position_matrix,
+    record_position_events,
+    transaction_event,
+)
+from tests.helpers import FakeAsyncRedis
+
+START = date(2026, 10, 1)
+
+
+def _txn(type="buy", quantity=5.0, transaction_date=START, broker=None, holding_id="h1"):
+    return SimpleNamespace(
+        id=uuid.uuid4(), holding_id=holding_id, type=type, quantity=quantity,
+        transaction_date=transaction_date, broker=broker,
+    )
+
+
+def _holding(id, quantity):
+    return SimpleNamespace(id=id, quantity=quantity)
+
+
+# ── transaction_event ───────────────────────────────────────────────────────
+
+
+class TestTransactionEvent:
+    def test_buy_and_sell_are_signed(self):
+        assert transaction_event(_txn("buy"))[2:] == (START, 5.0)
+        assert transaction_event(_txn("sell"))[2:] == (START, -5.0)
+
+    def test_entries_that_date_no_position_change(self):
+        assert transaction_event(_txn("dividend")) is None
+        assert transaction_event(_txn(transaction_date=None)) is None
+        assert transaction_event(_txn(broker="merge")) is None
+        assert transaction_event(_txn(holding_id=None)) is None
+
+
+# ── position_matrix ─────────────────────────────────────────────────────────
+
+
+class TestPositionMatrix:
+    def test_without_events_every_day_holds_current_quantity(self):
+        positions = position_matrix([_holding("h1", 10.0)], [], START, 3)
+        assert positions[:, 0].tolist() == [10.0] * 4
+
+    def test_buy_counts_from_its_trade_date(self):
+        events = [("t1", "h1", START + timedelta(days=2), 4.0)]
+        positions = position_matrix([_holding("h1", 10.0), _holding("h2", 1.0)], events, START, 3)
+        assert positions[:, 0].tolist() == [6.0, 6.0, 10.0, 10.0]
+        assert positions[:, 1].tolist() == [1.0] * 4
+
+    def test_sell_and_events_outside_the_window(self):
+        events = [
+            ("t1", "h1", START - timedelta(days=30), 10.0),   # before the window: always held
+            ("t2", "h1", START + timedelta(days=1), -4.0),
+            ("t3", "h1", START + timedelta(days=30), 2.0),    # after today: folded into today
+        ]
+        positions = position_matrix([_holding("h1", 8.0)], events, START, 2)
+        assert positions[:, 0].tolist() == [10.0, 6.0, 8.0]
+
+    def test_incomplete_ledger_never_goes_negative(self):
+        events = [("t1", "h1", START + timedelta(days=1), 10.0)]
+        positions = position_matrix([_holding("h1", 4.0)], events, START, 1)
+        assert positions[:, 0].tolist() == [0.0, 4.0]
+        assert np.all(positions >= 0)
+
+
+# ── cached events ───────────────────────────────────────────────────────────
+
+
+def _db(*txns):
+    result = MagicMock()
+    result.all.return_value = list(txns)
+    return AsyncMock(execute=AsyncMock(return_value=result))
+
+
+USER = uuid.uuid4()
+
+
+@pytest.mark.asyncio
+async def test_events_load_once_then_come_from_the_cache():
+    redis, txn = FakeAsyncRedis(), _txn()
+    db = _db(txn)
+    first = await load_position_events(db, redis, USER)
+    second = await load_position_events(db, redis, USER)
+    assert first == second == [transaction_event(txn)]
+    db.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_new_transactions_append_to_the_cache():
+    redis = FakeAsyncRedis()
+    await load_position_events(_db(), redis, USER)
+    event = transaction_event(_txn())
+    await record_position_events(redis, USER, [event])
+    assert await load_position_events(_db(), redis, USER) == [event]
+
+
+@pytest.mark.asyncio
+async def test_append_racing_a_load_is_deduplicated():
+    redis, txn = FakeAsyncRedis(), _txn()
+    # Appended before the cache was loaded, then loaded from the DB as well
+    await record_position_events(redis, USER, [transaction_event(txn)])
+    assert await load_position_events(_db(txn), redis, USER) == [transaction_event(txn)]
+    assert len(redis.lists[position_events_key(USER)]) == 3
+    assert await load_position_events(_db(), redis, USER) == [transaction_event(txn)]
+
+
+@pytest.mark.asyncio
+async def test_without_redis_events_come_from_the_db():
+    txn = _txn()
+    assert await load_position_events(_db(txn), None, USER) == [transaction_event(txn)]
@@ -1,17 +1,20 @@
-"""Tests for price_service: to_yfinance_ticker, _safe_float, _safe_int, _is_nan (pure),
-resolve_price & fetch_current_prices_batch (mocked)."""
+"""Tests for price_service: to_yfinance_ticker, _safe_float, _safe_int, _is_nan,
+price_cache_ttl (pure), resolve_prices_bulk & fetch_current_prices_batch (mocked)."""
 import json
 import math
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from app.services.price_service import (
+    YahooChartProvider,
     _is_nan,
     _safe_float,
     _safe_int,
     fetch_current_prices_batch,
-    resolve_price,
+    price_cache_ttl,
+    resolve_prices_bulk,
     to_yfinance_ticker,
 )
 
@@ -111,92 +114,91 @@ class TestIsNan:
         assert _is_nan(math.nan) is True
 
 
-# ── resolve_price (async, mocked Redis + DB) ────────────────────────────────
+# ── price_cache_ttl (pure, market calendar) ─────────────────────────────────
 
 
-@pytest.mark.asyncio
-async def test_resolve_price_cache_hit():
-    """Tier 1: Redis cache hit returns cached price."""
-    mock_redis = AsyncMock()
-    mock_redis.get.return_value = json.dumps({
-        "price": 2650.50,
-        "previous_close": 2600.0,
-        "day_change_pct": 1.94,
-    })
-    mock_db = AsyncMock()
+IST = ZoneInfo("Asia/Kolkata")
+ET = ZoneInfo("America/New_York")
 
-    result = await resolve_price(
-        db=mock_db, redis=mock_redis,
-        symbol="RELIANCE", asset_class_code="EQUITY_IN",
-        exchange="NSE", avg_buy_price=2500.0,
-    )
-    assert result["price"] == 2650.50
-    assert result["source"] == "cache"
-    assert result["day_change_pct"] == 1.94
 
+def _ttl_until(now: datetime, ttl: int) -> datetime:
+    """Expiry time, less the PRICE_CACHE_TTL_SECONDS grace."""
+    return now + timedelta(seconds=ttl - 900)
 
-@pytest.mark.asyncio
-async def test_resolve_price_db_fallback():
-    """Tier 2: Cache miss, DB has MarketData."""
-    mock_redis = AsyncMock()
-    mock_redis.get.return_value = None
 
-    mock_md = MagicMock()
-    mock_md.current_price = 2700.0
-    mock_md.previous_close = 2650.0
-    mock_md.day_change_pct = 1.89
+class TestPriceCacheTtl:
+    def test_open_market_lives_one_refresh(self):
+        now = datetime(2026, 10, 14, 11, 0, tzinfo=IST)
+        assert price_cache_ttl("INDIA", 900, now) == 1800
 
-    mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = mock_md
+    def test_last_fetch_before_close_lasts_until_next_window(self):
+        # 16:20 IST: the next cycle falls after the 16:30 fetch window
+        now = datetime(2026, 10, 14, 16, 20, tzinfo=IST)
+        assert _ttl_until(now, price_cache_ttl("INDIA", 900, now)) == datetime(2026, 10, 15, 8, 15, tzinfo=IST)
 
-    mock_db = AsyncMock()
-    mock_db.execute.return_value = mock_result
+    def test_weekend_and_holiday_are_skipped(self):
+        # Friday's last NYSE cycle lasts over the weekend
+        now = datetime(2026, 10, 16, 16, 50, tzinfo=ET)
+        assert _ttl_until(now, price_cache_ttl("US", 900, now)) == datetime(2026, 10, 19, 8, 30, tzinfo=ET)
+        # NSE is closed on the 20th for Dussehra
+        now = datetime(2026, 10, 19, 16, 20, tzinfo=IST)
+        assert _ttl_until(now, price_cache_ttl("INDIA", 900, now)) == datetime(2026, 10, 21, 8, 15, tzinfo=IST)
 
-    result = await resolve_price(
-        db=mock_db, redis=mock_redis,
-        symbol="RELIANCE", asset_class_code="EQUITY_IN",
-        exchange="NSE", avg_buy_price=2500.0,
-    )
-    assert result["price"] == 2700.0
-    assert result["source"] == "db"
+    def test_mf_lives_until_next_nav_fetch(self):
+        now = datetime(2026, 10, 16, 23, 30, tzinfo=IST)  # Friday NAV fetch
+        assert _ttl_until(now, price_cache_ttl("MF_DAILY", now=now)) == datetime(2026, 10, 19, 23, 30, tzinfo=IST)
+
+    def test_always_uses_refresh_interval(self):
+        now = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+        assert price_cache_ttl("ALWAYS", 3600, now) == 4500
+        assert price_cache_ttl(None, now=now) == 1800
+
+
+# ── resolve_prices_bulk (async, mocked Redis + DB) ──────────────────────────
+
+
+def _holding(symbol, asset_class_code="EQUITY_IN", exchange="NSE", avg_buy_price=100.0):
+    return MagicMock(symbol=symbol, asset_class_code=asset_class_code, exchange=exchange, avg_buy_price=avg_buy_price)
 
 
 @pytest.mark.asyncio
-async def test_resolve_price_cost_basis_fallback():
-    """Tier 3: Cache miss, no DB data, returns avg_buy_price."""
+async def test_resolve_prices_bulk_one_mget_one_query():
+    """Cache hits, DB hits and cost-basis fallbacks resolved with one MGET and one IN query."""
     mock_redis = AsyncMock()
-    mock_redis.get.return_value = None
+    mock_redis.mget.return_value = [json.dumps({"price": 2650.5, "previous_close": 2600.0, "day_change_pct": 1.94}), None, None]
 
+    mock_md = MagicMock(symbol="TCS.NS", current_price=3900.0, previous_close=3850.0, day_change_pct=1.3)
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = None
-
+    mock_result.scalars.return_value.all.return_value = [mock_md]
     mock_db = AsyncMock()
     mock_db.execute.return_value = mock_result
 
-    result = await resolve_price(
-        db=mock_db, redis=mock_redis,
-        symbol="RELIANCE", asset_class_code="EQUITY_IN",
-        exchange="NSE", avg_buy_price=2500.0,
-    )
-    assert result["price"] == 2500.0
-    assert result["source"] == "cost_basis"
+    holdings = [
+        _holding("RELIANCE"),
+        _holding("TCS"),
+        _holding("UNLISTED", avg_buy_price=42.0),
+        _holding(None, "FIXED_DEPOSIT", None, 100000.0),
+        _holding("RELIANCE"),
+    ]
+    result = await resolve_prices_bulk(mock_db, mock_redis, holdings)
+
+    assert [r["source"] for r in result] == ["cache", "db", "cost_basis", "cost_basis", "cache"]
+    assert result[0]["price"] == 2650.5
+    assert result[1]["previous_close"] == 3850.0
+    assert result[2]["price"] == 42.0
+    assert result[3]["price"] == 100000.0
+    mock_redis.mget.assert_awaited_once_with(["price:RELIANCE.NS", "price:TCS.NS", "price:UNLISTED.NS"])
+    mock_db.execute.assert_awaited_once()
 
 
 @pytest.mark.asyncio
-async def test_resolve_price_cost_basis_class():
-    """Cost-basis asset class (FD) skips Redis/DB entirely."""
+async def test_resolve_prices_bulk_all_cached_skips_db():
     mock_redis = AsyncMock()
+    mock_redis.mget.return_value = [json.dumps({"price": 10.0})]
     mock_db = AsyncMock()
 
-    result = await resolve_price(
-        db=mock_db, redis=mock_redis,
-        symbol=None, asset_class_code="FIXED_DEPOSIT",
-        exchange=None, avg_buy_price=100000.0,
-    )
-    assert result["price"] == 100000.0
-    assert result["source"] == "cost_basis"
-    # Redis and DB should not have been queried
-    mock_redis.get.assert_not_called()
+    result = await resolve_prices_bulk(mock_db, mock_redis, [_holding("AAPL", "EQUITY_US", None)])
+    assert result == [{"price": 10.0, "previous_close": None, "day_change_pct": 0, "source": "cache"}]
     mock_db.execute.assert_not_called()
 
 
@@ -207,7 +209,7 @@ class TestFetchCurrentPricesBatch:
     def test_empty_tickers(self):
         assert fetch_current_prices_batch([]) == {}
 
-    @patch("app.services.price_service._fetch_yahoo_chart")
+    @patch("app.services.price_service._fetch_yahoo_chart", new_callable=AsyncMock)
     def test_successful_fetch(self, mock_chart):
         mock_chart.return_value = {
             "chart": {
@@ -219,27 +221,27 @@ class TestFetchCurrentPricesBatch:
                 }]
             }
         }
-        result = fetch_current_prices_batch(["RELIANCE.NS"])
+        result = fetch_current_prices_batch(["RELIANCE.NS"], provider=YahooChartProvider())
         assert "RELIANCE.NS" in result
         assert result["RELIANCE.NS"]["price"] == 2650.50
         assert result["RELIANCE.NS"]["previous_close"] == 2600.0
 
-    @patch("app.services.price_service._fetch_yahoo_chart")
+    @patch("app.services.price_service._fetch_yahoo_chart", new_callable=AsyncMock)
     def test_api_failure_graceful(self, mock_chart):
         mock_chart.return_value = None
-        result = fetch_current_prices_batch(["RELIANCE.NS"])
+        result = fetch_current_prices_batch(["RELIANCE.NS"], provider=YahooChartProvider())
         assert result == {}
 
-    @patch("app.services.price_service._fetch_yahoo_chart")
+    @patch("app.services.price_service._fetch_yahoo_chart", new_callable=AsyncMock)
     def test_no_chart_result(self, mock_chart):
         mock_chart.return_value = {"chart": {"result": None}}
-        result = fetch_current_prices_batch(["RELIANCE.NS"])
+        result = fetch_current_prices_batch(["RELIANCE.NS"], provider=YahooChartProvider())
         assert result == {}
 
-    @patch("app.services.price_service._fetch_yahoo_chart")
+    @patch("app.services.price_service._fetch_yahoo_chart", new_callable=AsyncMock)
     def test_no_market_price(self, mock_chart):
         mock_chart.return_value = {
             "chart": {"result": [{"meta": {}}]}
         }
-        result = fetch_current_prices_batch(["RELIANCE.NS"])
+        result = fetch_current_prices_batch(["RELIANCE.NS"], provider=YahooChartProvider())
         assert result == {}
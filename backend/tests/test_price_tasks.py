@@ -0,0 +1,367 @@
+"""Tests for price_tasks: EOD planning (_last_completed_session, _plan_eod_fetch),
+refresh scheduling (_refresh_cycles, _refresh_candidates, _plan_refresh),
+holder index reconciliation, the EOD follow-up jobs, price-cycle sharding
+(_shard_tickers, _shard_within_budget) and the shard/finalizer tasks (mocked I/O)."""
+from datetime import date, datetime, timedelta
+from unittest.mock import MagicMock, patch
+from zoneinfo import ZoneInfo
+
+from app.tasks import price_tasks
+from app.tasks.price_tasks import (
+    _BACKFILL_DAYS,
+    _REFRESH_CYCLE_SECONDS,
+    _REFRESH_MAX_CYCLES,
+    _last_completed_session,
+    _plan_eod_fetch,
+    _plan_refresh,
+    _refresh_candidates,
+    _equity_close_ahead,
+    _reconcile_holder_index_sync,
+    _refresh_cycles,
+    _shard_tickers,
+    _shard_within_budget,
+    fetch_eod_prices,
+    fetch_price_shard,
+    finalize_price_cycle,
+)
+
+IST = ZoneInfo("Asia/Kolkata")
+ET = ZoneInfo("America/New_York")
+
+
+def _ticker(yf_ticker: str, asset_class_code: str = "EQUITY_IN") -> dict:
+    return {"yf_ticker": yf_ticker, "asset_class_code": asset_class_code}
+
+
+# ── _last_completed_session ─────────────────────────────────────────────────
+
+
+class TestLastCompletedSession:
+    def test_india_after_close_is_today(self):
+        now = datetime(2026, 10, 14, 16, 0, tzinfo=IST)  # Wednesday
+        assert _last_completed_session("INDIA", now) == date(2026, 10, 14)
+
+    def test_india_before_close_is_previous_day(self):
+        now = datetime(2026, 10, 14, 11, 0, tzinfo=IST)
+        assert _last_completed_session("INDIA", now) == date(2026, 10, 13)
+
+    def test_monday_morning_rolls_back_to_friday(self):
+        now = datetime(2026, 10, 12, 9, 0, tzinfo=IST)
+        assert _last_completed_session("INDIA", now) == date(2026, 10, 9)
+
+    def test_weekend_is_friday(self):
+        now = datetime(2026, 10, 17, 18, 0, tzinfo=ET)  # Saturday
+        assert _last_completed_session("US", now) == date(2026, 10, 16)
+
+    def test_us_uses_eastern_time(self):
+        # 16:30 IST is 07:00 ET: the US session for that date hasn't closed yet
+        now = datetime(2026, 10, 14, 16, 30, tzinfo=IST)
+        assert _last_completed_session("US", now) == date(2026, 10, 13)
+
+    def test_always_is_previous_utc_day(self):
+        now = datetime(2026, 10, 17, 12, 0, tzinfo=ZoneInfo("UTC"))
+        assert _last_completed_session("ALWAYS", now) == date(2026, 10, 16)
+
+
+# ── _plan_eod_fetch ─────────────────────────────────────────────────────────
+
+
+class TestPlanEodFetch:
+    now = datetime(2026, 10, 14, 17, 0, tzinfo=IST)  # after NSE close
+
+    def test_new_ticker_is_backfilled(self):
+        starts, counts = _plan_eod_fetch([_ticker("TCS.NS")], {}, self.now)
+        assert starts == {"TCS.NS": date(2026, 10, 14) - timedelta(days=_BACKFILL_DAYS)}
+        assert counts == {"backfill": 1, "update": 0, "current": 0}
+
+    def test_stale_ticker_starts_at_watermark(self):
+        starts, counts = _plan_eod_fetch([_ticker("TCS.NS")], {"TCS.NS": date(2026, 10, 10)}, self.now)
+        assert starts == {"TCS.NS": date(2026, 10, 10)}
+        assert counts["update"] == 1
+
+    def test_current_ticker_is_skipped(self):
+        starts, counts = _plan_eod_fetch([_ticker("TCS.NS")], {"TCS.NS": date(2026, 10, 14)}, self.now)
+        assert starts == {}
+        assert counts["current"] == 1
+
+    def test_staleness_uses_ticker_market(self):
+        # Same watermark: the NSE bar for the 14th is final, the NYSE one isn't yet
+        watermarks = {"TCS.NS": date(2026, 10, 13), "AAPL": date(2026, 10, 13)}
+        starts, _ = _plan_eod_fetch(
+            [_ticker("TCS.NS"), _ticker("AAPL", "EQUITY_US")], watermarks, self.now,
+        )
+        assert starts == {"TCS.NS": date(2026, 10, 13)}
+
+    def test_benchmark_uses_its_market_group(self):
+        starts, _ = _plan_eod_fetch([_ticker("^GSPC", "INDEX")], {"^GSPC": date(2026, 10, 13)}, self.now)
+        assert starts == {}
+
+    def test_duplicate_tickers_planned_once(self):
+        tickers = [_ticker("BTC-INR", "CRYPTO"), _ticker("BTC-INR", "CRYPTO")]
+        starts, counts = _plan_eod_fetch(tickers, {}, self.now)
+        assert list(starts) == ["BTC-INR"]
+        assert counts["backfill"] == 1
+
+
+# ── refresh scheduling ──────────────────────────────────────────────────────
+
+
+class TestRefreshCycles:
+    def test_largest_most_held_ticker_refreshes_every_cycle(self):
+        assert _refresh_cycles(5000, 1e9, 5000, 1e9) == 1
+
+    def test_single_small_holder_refreshes_least(self):
+        assert _refresh_cycles(1, 0.0, 5000, 1e9) == _REFRESH_MAX_CYCLES
+
+    def test_interval_shrinks_with_holders(self):
+        intervals = [_refresh_cycles(h, 1e6, 5000, 1e9) for h in (1, 10, 100, 1000, 5000)]
+        assert intervals == sorted(intervals, reverse=True)
+        assert intervals[0] > intervals[-1]
+
+    def test_exposure_shortens_the_interval(self):
+        assert _refresh_cycles(1, 1e9, 5000, 1e9) < _refresh_cycles(1, 1e3, 5000, 1e9)
+
+    def test_empty_universe(self):
+        assert _refresh_cycles(0, 0.0, 0, 0.0) == _REFRESH_MAX_CYCLES
+
+
+class TestRefreshCandidates:
+    def test_merges_duplicate_tickers_and_pins_benchmarks(self):
+        users = [f"u{i}" for i in range(20)]
+        candidates = _refresh_candidates([
+            {"yf_ticker": "TCS.NS", "group": "INDIA", "user_ids": users[:3], "exposure": 6e5},
+            # The same ticker under another row; u2 holds both
+            {"yf_ticker": "TCS.NS", "group": "INDIA", "user_ids": users[2:5], "exposure": 4e5},
+            {"yf_ticker": "RARE.NS", "group": "INDIA", "user_ids": ["u0"], "exposure": 1e3},
+            {"yf_ticker": "^NSEI", "group": "INDIA", "pinned": True},
+        ])
+        by_ticker = {c["yf_ticker"]: c for c in candidates}
+        assert (by_ticker["TCS.NS"]["holders"], by_ticker["TCS.NS"]["exposure"]) == (5, 1e6)
+        assert by_ticker["TCS.NS"]["cycles"] == 1
+        assert by_ticker["RARE.NS"]["cycles"] > 1
+        assert by_ticker["^NSEI"]["cycles"] == 1
+
+    def test_one_large_position_outranks_a_small_one(self):
+        candidates = _refresh_candidates([
+            {"yf_ticker": "BIG", "group": "US", "user_ids": ["u1"], "exposure": 5e6},
+            {"yf_ticker": "SMALL", "group": "US", "user_ids": ["u2"], "exposure": 50.0},
+            {"yf_ticker": "WIDE", "group": "US", "user_ids": [f"u{i}" for i in range(100)], "exposure": 5e6},
+        ])
+        cycles = {c["yf_ticker"]: c["cycles"] for c in candidates}
+        assert cycles["WIDE"] < cycles["BIG"] < cycles["SMALL"]
+
+
+@patch.object(price_tasks, "_reconcile_holder_index_sync")
+@patch.object(price_tasks, "_get_sync_db")
+def test_exposure_is_market_value_else_cost_basis(db, reconcile):
+    cur = db.return_value.cursor.return_value.__enter__.return_value
+    cur.fetchall.side_effect = [
+        [
+            {"symbol": "TCS", "asset_class_code": "EQUITY_IN", "exchange": "NSE",
+             "user_ids": ["u1"], "quantity": 10, "cost_basis": 30000},
+            {"symbol": "NEW", "asset_class_code": "EQUITY_US", "exchange": None,
+             "user_ids": ["u2"], "quantity": 2, "cost_basis": 300},
+            {"symbol": "FD1", "asset_class_code": "FIXED_DEPOSIT", "exchange": None,
+             "user_ids": ["u3"], "quantity": 1, "cost_basis": 1e5},
+        ],
+        [{"symbol": "TCS.NS", "current_price": 4000}],
+    ]
+
+    rows = price_tasks._get_all_tickers_sync()
+
+    assert {r["yf_ticker"]: r["exposure"] for r in rows} == {"TCS.NS": 40000.0, "NEW": 300.0}
+    assert cur.execute.call_args.args[1] == (["NEW", "TCS.NS"],)
+
+
+class TestPlanRefresh:
+    now = 1_000_000.0
+
+    def _c(self, ticker, cycles):
+        return {"yf_ticker": ticker, "group": "US", "cycles": cycles}
+
+    def test_only_due_tickers_are_selected(self):
+        candidates = [self._c("HOT", 1), self._c("COLD", 8)]
+        last = {"HOT": self.now - _REFRESH_CYCLE_SECONDS, "COLD": self.now - 2 * _REFRESH_CYCLE_SECONDS}
+        selected, deferred = _plan_refresh(candidates, last, self.now, 100)
+        assert [c["yf_ticker"] for c in selected] == ["HOT"]
+        assert deferred == 0
+
+    def test_slack_covers_previous_cycle_runtime(self):
+        last = {"HOT": self.now - _REFRESH_CYCLE_SECONDS + 60}
+        selected, _ = _plan_refresh([self._c("HOT", 1)], last, self.now, 100)
+        assert len(selected) == 1
+
+    def test_budget_caps_and_prefers_never_fetched_then_most_overdue(self):
+        candidates = [self._c("A", 1), self._c("B", 2), self._c("NEW", 8)]
+        last = {"A": self.now - _REFRESH_CYCLE_SECONDS, "B": self.now - 4 * _REFRESH_CYCLE_SECONDS}
+        selected, deferred = _plan_refresh(candidates, last, self.now, 2)
+        assert [c["yf_ticker"] for c in selected] == ["NEW", "B"]
+        assert deferred == 1
+
+
+# ── EOD follow-up jobs ──────────────────────────────────────────────────────
+
+
+class TestEquityCloseAhead:
+    def test_india_close_waits_for_the_us_close(self):
+        assert _equity_close_ahead(datetime(2026, 10, 14, 16, 0, tzinfo=IST))
+
+    def test_us_close_is_the_last_of_the_day(self):
+        assert not _equity_close_ahead(datetime(2026, 10, 14, 16, 30, tzinfo=ET))
+
+    def test_india_close_on_a_us_holiday_is_the_last(self):
+        assert not _equity_close_ahead(datetime(2026, 11, 26, 16, 0, tzinfo=IST))
+
+    def test_crypto_midnight_run_waits(self):
+        assert _equity_close_ahead(datetime(2026, 10, 15, 0, 30, tzinfo=ZoneInfo("UTC")))
+
+
+@patch("app.tasks.price_tasks.celery.send_task")
+@patch("app.tasks.price_tasks._equity_close_ahead")
+@patch("app.tasks.price_tasks._upsert_price_history_bulk_sync", return_value=1)
+@patch("app.tasks.price_tasks.fetch_eod_history_since")
+@patch("app.tasks.price_tasks._get_history_watermarks_sync", return_value={})
+@patch("app.tasks.price_tasks._get_all_tickers_sync")
+@patch("app.tasks.price_tasks.get_guard")
+@patch("app.tasks.price_tasks._get_sync_redis")
+class TestFetchEodPrices:
+    def _run(self, redis, tickers, history, pending=None):
+        pipe = redis.return_value.pipeline.return_value
+        pipe.execute.return_value = [pending or set(), 1]
+        tickers.return_value = [{"yf_ticker": "ETH-INR", "asset_class_code": "CRYPTO"}]
+        history.return_value = {"ETH-INR": [{"date": date(2026, 10, 15)}], "^NSEI": []}
+        fetch_eod_prices.run()
+
+    def test_crypto_close_updates_its_holders_only(self, redis, guard, tickers, marks, history, upsert, ahead, send):
+        guard.return_value.is_open.return_value = False
+        ahead.return_value = True
+        self._run(redis, tickers, history)
+
+        send.assert_called_once_with("update_portfolio_values", args=[{"ETH-INR": date(2026, 10, 15)}])
+        redis.return_value.sadd.assert_called_once_with("eod:pending", "risk")
+
+    def test_last_equity_close_queues_owed_jobs(self, redis, guard, tickers, marks, history, upsert, ahead, send):
+        guard.return_value.is_open.return_value = False
+        ahead.return_value = False
+        self._run(redis, tickers, history, pending={"risk", "benchmarks"})
+
+        assert [c.args[0] for c in send.call_args_list] == [
+            "update_portfolio_values", "update_benchmark_series", "update_risk_metrics",
+        ]
+
+
+# ── holder index reconciliation ─────────────────────────────────────────────
+
+
+@patch.object(price_tasks, "reindex_holders_sync", return_value=1)
+@patch.object(price_tasks, "_load_user_tickers_sync")
+@patch.object(price_tasks, "stale_holders_sync")
+@patch.object(price_tasks, "reconcile_due_sync")
+@patch.object(price_tasks, "_get_sync_redis")
+class TestReconcileHolderIndex:
+    def test_stale_users_are_reindexed_from_a_fresh_read(self, redis, due, stale, load, reindex):
+        due.return_value = True
+        stale.return_value = {"u1": {"TCS.NS"}, "u2": {"INFY.NS"}}
+        load.return_value = {"u1": {"AAPL"}}  # u2 sold everything
+
+        _reconcile_holder_index_sync({"u1": {"AAPL"}, "u3": {"TCS.NS"}})
+
+        assert load.call_args.args[0] == ["u1", "u2"]
+        assert reindex.call_args.args[1:] == ({"u1": {"AAPL"}, "u2": set()}, stale.return_value)
+
+    def test_nothing_is_read_until_due(self, redis, due, stale, load, reindex):
+        due.return_value = False
+        _reconcile_holder_index_sync({"u1": {"AAPL"}})
+        stale.assert_not_called()
+        load.assert_not_called()
+
+
+# ── _shard_tickers ──────────────────────────────────────────────────────────
+
+
+class TestShardTickers:
+    def test_small_groups_are_one_shard_each(self):
+        shards = _shard_tickers({"US": ["AAPL", "MSFT"], "INDIA": ["TCS.NS"]}, shard_size=10)
+        assert shards == [["TCS.NS"], ["AAPL", "MSFT"]]
+
+    def test_large_group_is_split_and_covers_every_ticker_once(self):
+        tickers = [f"T{i}.NS" for i in range(1000)]
+        shards = _shard_tickers({"INDIA": tickers}, shard_size=200)
+        assert len(shards) == 5
+        assert sorted(t for shard in shards for t in shard) == sorted(tickers)
+        assert max(len(s) for s in shards) < 300
+
+    def test_assignment_is_stable(self):
+        tickers = [f"T{i}" for i in range(500)]
+        forward = _shard_tickers({"US": tickers}, 100)
+        backward = _shard_tickers({"US": list(reversed(tickers))}, 100)
+        assert [set(s) for s in forward] == [set(s) for s in backward]
+
+    def test_duplicates_and_empty_groups(self):
+        assert _shard_tickers({"ALWAYS": ["BTC-INR", "BTC-INR"], "US": []}, 10) == [["BTC-INR"]]
+
+
+class TestShardWithinBudget:
+    def _selected(self, n, group="US"):
+        return [{"yf_ticker": f"T{i}", "group": group} for i in range(n)]
+
+    def test_batches_count_a_request_each(self):
+        shards, dropped = _shard_within_budget(self._selected(120), batch_size=50, max_requests=40)
+        assert dropped == 0
+        assert sum(len(s) for s in shards) == 120
+
+    def test_per_symbol_fallback_spends_a_request_per_ticker(self):
+        shards, dropped = _shard_within_budget(self._selected(120), batch_size=1, max_requests=40)
+        assert sum(len(s) for s in shards) == 40
+        assert dropped == 80
+
+    def test_partial_batches_per_shard_count_as_requests(self):
+        # Two groups, so two shards: 60 INDIA + 60 US tickers in batches of 50 is four requests
+        selected = self._selected(60, "INDIA") + [{"yf_ticker": f"U{i}", "group": "US"} for i in range(60)]
+        shards, dropped = _shard_within_budget(selected, batch_size=50, max_requests=3)
+        assert sum(-(-len(s) // 50) for s in shards) <= 3
+        # The least overdue (the tail of the US tickers) are the ones dropped
+        kept = {t for s in shards for t in s}
+        assert {f"T{i}" for i in range(60)} <= kept
+        assert dropped == 120 - len(kept)
+
+
+# ── fetch_price_shard / finalize_price_cycle ────────────────────────────────
+
+
+_QUOTE = {"price": 10.0, "previous_close": 9.0, "day_change_pct": 11.11, "last_updated": "2026-10-14T10:00:00"}
+
+
+class TestPriceCycleTasks:
+    @patch("app.tasks.price_tasks.get_guard")
+    @patch("app.tasks.price_tasks.fetch_current_prices_batch", side_effect=RuntimeError("boom"))
+    def test_failed_shard_returns_empty(self, mock_fetch, mock_guard):
+        assert fetch_price_shard.run(["AAPL"]) == {}
+
+    @patch("app.tasks.price_tasks.celery.send_task")
+    @patch("app.tasks.price_tasks._upsert_market_data_sync")
+    @patch("app.tasks.price_tasks._get_sync_redis")
+    def test_finalizer_merges_shards_and_writes_once(self, mock_redis, mock_upsert, mock_send):
+        pipe = MagicMock()
+        mock_redis.return_value.pipeline.return_value = pipe
+
+        result = finalize_price_cycle.run(
+            [{"AAPL": _QUOTE}, {}, {"TCS.NS": _QUOTE}], total=3, ttls={"TCS.NS": 7200}
+        )
+
+        assert result["fetched"] == 2
+        assert result["failed_shards"] == 1
+        assert pipe.setex.call_count == 2
+        ttls = {call.args[0]: call.args[1] for call in pipe.setex.call_args_list}
+        assert ttls["price:TCS.NS"] == 7200
+        assert set(pipe.hset.call_args.kwargs["mapping"]) == {"AAPL", "TCS.NS"}
+        pipe.execute.assert_called_once()
+        mock_upsert.assert_called_once_with({"AAPL": _QUOTE, "TCS.NS": _QUOTE})
+        mock_send.assert_called_once_with("warm_portfolio_views")
+
+    @patch("app.tasks.price_tasks._upsert_market_data_sync")
+    @patch("app.tasks.price_tasks._get_sync_redis")
+    def test_finalizer_with_no_prices_leaves_cache(self, mock_redis, mock_upsert):
+        assert finalize_price_cycle.run([{}, {}], total=4)["fetched"] == 0
+        mock_redis.assert_not_called()
+        mock_upsert.assert_not_called()
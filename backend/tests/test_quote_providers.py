@@ -0,0 +1,257 @@
+"""Tests for multi-symbol quote batching (YahooQuoteProvider + chart fallback)
+against a local stub HTTP server that records every request and, like Yahoo,
+only answers quote requests carrying a session cookie and its crumb."""
+import json
+import threading
+import uuid
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.services import price_service
+from app.services.price_service import (
+    QuoteProvider,
+    YahooChartProvider,
+    YahooQuoteProvider,
+    _parse_quote_response,
+    current_price_batch_size,
+    fetch_current_prices_async,
+)
+
+# Symbols the stub "exchange" knows: symbol -> (price, previous_close)
+_STUB_PRICES = {f"SYM{i}.NS": (100.0 + i, 100.0) for i in range(120)}
+# Served only by the chart endpoint (simulates symbols the batch quote misses)
+_CHART_ONLY = {"0P0000YWL1.BO": (55.5, 55.0)}
+
+
+class _StubYahooHandler(BaseHTTPRequestHandler):
+    requests_seen: list[str] = []
+    crumbs: dict[str, str] = {}  # live session cookie -> its crumb
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _session(self) -> str | None:
+        cookie = SimpleCookie(self.headers.get("Cookie", "")).get("A3")
+        return cookie.value if cookie is not None and cookie.value in self.crumbs else None
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        self.requests_seen.append(parts.path)
+
+        if parts.path == "/cookie":  # fc.yahoo.com: a 404 that sets the session cookie
+            session = uuid.uuid4().hex
+            self.crumbs[session] = uuid.uuid4().hex[:11]
+            self.send_response(404)
+            self.send_header("Set-Cookie", f"A3={session}; Path=/; HttpOnly")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if parts.path == "/v1/test/getcrumb":
+            session = self._session()
+            body = (self.crumbs[session] if session else "Unauthorized").encode()
+            self.send_response(200 if session else 401)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if parts.path in ("/v7/finance/quote", "/v7/locked/quote"):
+            query = parse_qs(parts.query)
+            session = self._session()
+            if parts.path == "/v7/locked/quote" or session is None or query.get("crumb") != [self.crumbs[session]]:
+                self._send_json({"finance": {"result": None, "error": {
+                    "code": "Unauthorized", "description": "Invalid Crumb",
+                }}}, status=401)
+                return
+            symbols = query["symbols"][0].split(",")
+            result = [
+                {
+                    "symbol": s,
+                    "regularMarketPrice": _STUB_PRICES[s][0],
+                    "regularMarketPreviousClose": _STUB_PRICES[s][1],
+                }
+                for s in symbols if s in _STUB_PRICES
+            ]
+            self._send_json({"quoteResponse": {"result": result, "error": None}})
+            return
+
+        if parts.path.startswith("/v8/finance/chart/"):
+            symbol = parts.path.rsplit("/", 1)[-1]
+            known = {**_STUB_PRICES, **_CHART_ONLY}
+            if symbol not in known:
+                self._send_json({"chart": {"result": None}})
+                return
+            price, prev = known[symbol]
+            self._send_json({"chart": {"result": [{"meta": {
+                "regularMarketPrice": price, "chartPreviousClose": prev,
+            }}]}})
+            return
+
+        self.send_response(404)
+        self.end_headers()
+
+
+@pytest.fixture
+def stub_server():
+    _StubYahooHandler.requests_seen = []
+    _StubYahooHandler.crumbs = {}
+    price_service._yahoo_sessions.clear()
+    price_service._quote_suspended_until.clear()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubYahooHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    yield base, _StubYahooHandler.requests_seen
+    server.shutdown()
+    server.server_close()
+
+
+def _quote_provider(base: str, path: str = "/v7/finance/quote", cookie_path: str = "/cookie") -> YahooQuoteProvider:
+    return YahooQuoteProvider(
+        batch_size=50, url=f"{base}{path}",
+        cookie_url=f"{base}{cookie_path}", crumb_url=f"{base}/v1/test/getcrumb",
+    )
+
+
+def _chart_provider(base: str) -> YahooChartProvider:
+    return YahooChartProvider(url=f"{base}/v8/finance/chart/{{ticker}}")
+
+
+# ── _parse_quote_response (pure) ────────────────────────────────────────────
+
+
+class TestParseQuoteResponse:
+    def test_maps_symbols_back_case_insensitively(self):
+        data = {"quoteResponse": {"result": [
+            {"symbol": "RELIANCE.NS", "regularMarketPrice": 2650.5, "regularMarketPreviousClose": 2600.0},
+        ]}}
+        result = _parse_quote_response(["reliance.ns"], data)
+        assert result["reliance.ns"]["price"] == 2650.5
+        assert result["reliance.ns"]["previous_close"] == 2600.0
+        assert result["reliance.ns"]["day_change_pct"] == 1.94
+        assert "last_updated" in result["reliance.ns"]
+
+    def test_skips_unrequested_and_priceless_items(self):
+        data = {"quoteResponse": {"result": [
+            {"symbol": "OTHER.NS", "regularMarketPrice": 10.0},
+            {"symbol": "TCS.NS"},
+        ]}}
+        assert _parse_quote_response(["TCS.NS"], data) == {}
+
+    def test_empty_response(self):
+        assert _parse_quote_response(["TCS.NS"], None) == {}
+        assert _parse_quote_response(["TCS.NS"], {"quoteResponse": {"result": None}}) == {}
+
+
+# ── Batched fetch against the stub server ───────────────────────────────────
+
+
+@pytest.mark.asyncio
+async def test_batched_fetch_uses_one_request_per_batch(stub_server):
+    base, seen = stub_server
+    tickers = list(_STUB_PRICES)  # 120 symbols
+
+    result = await fetch_current_prices_async(tickers, provider=_quote_provider(base))
+
+    assert set(result) == set(tickers)
+    assert result["SYM7.NS"]["price"] == 107.0
+    assert result["SYM7.NS"]["day_change_pct"] == 7.0
+    assert seen == ["/cookie", "/v1/test/getcrumb"] + ["/v7/finance/quote"] * 3  # ceil(120 / 50)
+
+
+@pytest.mark.asyncio
+async def test_session_is_fetched_once_and_renewed_when_rejected(stub_server):
+    base, seen = stub_server
+    tickers = ["SYM1.NS", "SYM2.NS"]
+
+    assert set(await fetch_current_prices_async(tickers, provider=_quote_provider(base))) == set(tickers)
+    assert set(await fetch_current_prices_async(tickers, provider=_quote_provider(base))) == set(tickers)
+    assert seen.count("/cookie") == 1 and seen.count("/v7/finance/quote") == 2
+
+    # Yahoo expires the session: the next quote request is refused and retried with a new crumb
+    _StubYahooHandler.crumbs.clear()
+    seen.clear()
+    assert set(await fetch_current_prices_async(tickers, provider=_quote_provider(base))) == set(tickers)
+    assert seen == ["/v7/finance/quote", "/cookie", "/v1/test/getcrumb", "/v7/finance/quote"]
+
+
+@pytest.mark.asyncio
+async def test_missing_symbols_fall_back_to_chart(stub_server):
+    base, seen = stub_server
+    tickers = ["SYM1.NS", "SYM2.NS", "0P0000YWL1.BO"]
+
+    result = await fetch_current_prices_async(tickers, provider=_quote_provider(base), fallback=_chart_provider(base))
+
+    assert set(result) == set(tickers)
+    assert result["0P0000YWL1.BO"]["price"] == 55.5
+    assert seen.count("/v7/finance/quote") == 1
+    assert seen.count("/v8/finance/chart/0P0000YWL1.BO") == 1
+    assert len(seen) == 4
+
+
+@pytest.mark.asyncio
+async def test_chart_provider_is_one_request_per_symbol(stub_server):
+    base, seen = stub_server
+    tickers = ["SYM1.NS", "SYM2.NS", "SYM3.NS"]
+
+    result = await fetch_current_prices_async(tickers, provider=_chart_provider(base))
+
+    assert set(result) == set(tickers)
+    assert len(seen) == 3
+
+
+@pytest.mark.asyncio
+async def test_rejected_batch_endpoint_is_suspended(stub_server):
+    base, seen = stub_server
+    tickers = ["SYM1.NS", "SYM2.NS"]
+
+    def fetch():
+        return fetch_current_prices_async(
+            tickers, provider=_quote_provider(base, "/v7/locked/quote"), fallback=_chart_provider(base),
+        )
+
+    # Refused with a fresh crumb too
+    assert set(await fetch()) == set(tickers)
+    assert seen.count("/v7/locked/quote") == 2 and seen.count("/cookie") == 2 and len(seen) == 8
+
+    # Later cycles go straight to the chart fallback
+    assert set(await fetch()) == set(tickers)
+    assert seen.count("/v7/locked/quote") == 2 and len(seen) == 10
+
+
+def test_batch_size_is_one_while_the_quote_endpoint_is_suspended(stub_server):
+    assert current_price_batch_size() == YahooQuoteProvider().batch_size
+    price_service._quote_suspended_until[price_service._YF_QUOTE_URL] = float("inf")
+    assert current_price_batch_size() == 1
+
+
+@pytest.mark.asyncio
+async def test_no_crumb_means_chart_fallback(stub_server):
+    base, seen = stub_server
+    tickers = ["SYM1.NS", "SYM2.NS"]
+
+    result = await fetch_current_prices_async(
+        tickers, provider=_quote_provider(base, cookie_path="/no-cookie"), fallback=_chart_provider(base),
+    )
+
+    assert set(result) == set(tickers)
+    assert "/v7/finance/quote" not in seen
+    assert seen.count("/no-cookie") == 1 and len(seen) == 3
+
+
+def test_providers_must_implement_fetch_quotes():
+    with pytest.raises(TypeError):
+        QuoteProvider()
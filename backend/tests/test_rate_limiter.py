@@ -0,0 +1,188 @@
+"""Tests for rate_limiter.ProviderGuard (in-memory Redis stand-in) and its
+integration with FetchEngine (httpx.MockTransport)."""
+import asyncio
+
+import httpx
+import pytest
+import redis as sync_redis
+
+from app.config import settings
+from app.services import http_client
+from app.services.fetch_engine import FetchEngine
+from app.services.rate_limiter import (
+    BudgetExceededError,
+    CircuitOpenError,
+    ProviderGuard,
+    PROVIDER_LIMITS,
+)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def incr(self, key):
+        self.ops.append(lambda: self.redis.incr(key))
+
+    def expire(self, key, seconds):
+        self.ops.append(lambda: True)
+
+    def execute(self):
+        return [op() for op in self.ops]
+
+
+class FakeRedis:
+    """Just enough of redis.Redis for ProviderGuard; the token bucket script is stubbed."""
+
+    def __init__(self):
+        self.store: dict[str, str] = {}
+        self.bucket_wait = 0.0
+
+    def register_script(self, script):
+        return lambda keys, args: str(self.bucket_wait)
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+    def incr(self, key):
+        self.store[key] = str(int(self.store.get(key, 0)) + 1)
+        return int(self.store[key])
+
+    def exists(self, key):
+        return int(key in self.store)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+
+class BrokenRedis(FakeRedis):
+    def exists(self, key):
+        raise sync_redis.ConnectionError("down")
+
+    def register_script(self, script):
+        def _raise(keys, args):
+            raise sync_redis.ConnectionError("down")
+        return _raise
+
+
+@pytest.fixture
+def guard():
+    return ProviderGuard(FakeRedis())
+
+
+# ── ProviderGuard ───────────────────────────────────────────────────────────
+
+
+class TestProviderGuard:
+    def test_acquire_grants_and_counts_budget(self, guard):
+        assert guard.acquire("yahoo") == 0.0
+        assert guard.acquire("yahoo") == 0.0
+        assert guard.budget_used("yahoo") == 2
+
+    def test_acquire_returns_bucket_wait(self, guard):
+        guard.redis.bucket_wait = 0.25
+        assert guard.acquire("yahoo") == 0.25
+        assert guard.budget_used("yahoo") == 0
+
+    def test_budget_exhausted(self, guard, monkeypatch):
+        monkeypatch.setitem(PROVIDER_LIMITS["yahoo"], "daily_budget", 2)
+        guard.acquire("yahoo")
+        guard.acquire("yahoo")
+        with pytest.raises(BudgetExceededError):
+            guard.acquire("yahoo")
+
+    def test_unknown_provider_is_unlimited(self, guard):
+        assert guard.acquire("somewhere-else") == 0.0
+        assert guard.redis.store == {}
+
+    def test_circuit_opens_at_threshold(self, guard):
+        for _ in range(settings.CIRCUIT_FAILURE_THRESHOLD - 1):
+            guard.record_failure("yahoo")
+        assert guard.is_open("yahoo") is False
+
+        guard.record_failure("yahoo")
+        assert guard.is_open("yahoo") is True
+        with pytest.raises(CircuitOpenError):
+            guard.acquire("yahoo")
+
+    def test_success_resets_failures(self, guard):
+        for _ in range(settings.CIRCUIT_FAILURE_THRESHOLD - 1):
+            guard.record_failure("yahoo")
+        guard.record_success("yahoo")
+        guard.record_failure("yahoo")
+        assert guard.is_open("yahoo") is False
+
+    def test_suspend_opens_the_circuit_at_once(self, guard):
+        guard.suspend("yahoo_quote", 60)
+        assert guard.is_open("yahoo_quote") is True
+        assert guard.is_open("yahoo") is False
+
+    def test_circuits_are_per_provider(self, guard):
+        for _ in range(settings.CIRCUIT_FAILURE_THRESHOLD):
+            guard.record_failure("yahoo")
+        assert guard.is_open("yahoo") is True
+        assert guard.is_open("mfapi") is False
+
+    def test_redis_down_fails_open(self):
+        guard = ProviderGuard(BrokenRedis())
+        assert guard.is_open("yahoo") is False
+        assert guard.acquire("yahoo") == 0.0
+
+
+# ── FetchEngine + guard ─────────────────────────────────────────────────────
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt, retry_after=None: 0)
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_skips_request(guard):
+    guard.redis.set("circuit:yahoo:open", "1")
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(200, json={})
+
+    async with FetchEngine(transport=httpx.MockTransport(handler), guard=guard) as engine:
+        assert await engine.get_json("https://example.test/a", provider="yahoo") is None
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_repeated_429_opens_circuit_and_stops_retrying(guard):
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(429, json={})
+
+    async with FetchEngine(transport=httpx.MockTransport(handler), guard=guard, max_retries=10) as engine:
+        assert await engine.get_json("https://example.test/a", provider="yahoo") is None
+
+    assert guard.is_open("yahoo") is True
+    assert len(calls) == settings.CIRCUIT_FAILURE_THRESHOLD
+
+
+@pytest.mark.asyncio
+async def test_timeouts_and_transport_errors_open_the_circuit(guard):
+    async def handler(request):
+        if request.url.path == "/slow":
+            await asyncio.sleep(1)
+        raise httpx.ReadTimeout("read timed out", request=request)
+
+    async with FetchEngine(transport=httpx.MockTransport(handler), guard=guard) as engine:
+        for k in range(settings.CIRCUIT_FAILURE_THRESHOLD):
+            path = "/slow" if k % 2 else "/read"
+            assert await engine.get_json(f"https://example.test{path}", provider="yahoo", deadline=0.05) is None
+
+    assert guard.is_open("yahoo") is True
@@ -0,0 +1,147 @@
+"""Tests for returns_service: the batched XIRR solver, time-weighted returns and
+their annualization, transaction cash flows and get_returns over one daily grid (mocked DB + prices)."""
+import uuid
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.services import returns_service
+from app.services.returns_service import (
+    _flow_amount,
+    annualized_returns,
+    get_returns,
+    solve_xirr,
+    time_weighted_returns,
+)
+
+
+# ── solve_xirr ──────────────────────────────────────────────────────────────
+
+
+class TestSolveXirr:
+    def test_one_year_gain(self):
+        assert solve_xirr(np.array([0.0, 1.0]), [[-1000.0, 1100.0]])[0] == pytest.approx(0.1)
+
+    def test_rows_are_solved_together(self):
+        times = np.array([0.0, 0.5, 1.0])
+        rates = solve_xirr(times, [
+            [-100.0, 0.0, 300.0],
+            [-100.0, -100.0, 150.0],
+            [-100.0, 0.0, 0.0],     # never paid back
+            [0.0, 0.0, 0.0],
+        ])
+        assert rates[0] == pytest.approx(2.0)
+        assert -1 < rates[1] < 0
+        assert np.isnan(rates[2:]).all()
+
+    def test_monthly_investments_solve_to_zero_npv(self):
+        times = np.arange(61) / 12
+        amounts = np.full(61, -1000.0)
+        amounts[-1] = 90000.0
+        rate = solve_xirr(times, amounts)[0]
+        assert np.sum(amounts / (1 + rate) ** times) == pytest.approx(0, abs=1e-6)
+
+
+# ── time_weighted_returns ───────────────────────────────────────────────────
+
+
+def test_twr_excludes_money_added():
+    values = np.array([[100.0], [110.0], [220.0]])
+    flows = np.array([[0.0], [0.0], [100.0]])
+    # +10% on day 1, then (220 - 100) / 110 on day 2
+    assert time_weighted_returns(values, flows)[0] == pytest.approx(1.1 * 120 / 110 - 1)
+
+
+def test_twr_skips_days_starting_empty():
+    values = np.array([[0.0], [100.0], [105.0]])
+    flows = np.array([[0.0], [100.0], [0.0]])
+    assert time_weighted_returns(values, flows)[0] == pytest.approx(0.05)
+
+
+def test_cagr_is_annualized_over_each_columns_live_span():
+    days = 730
+    values = np.zeros((days + 1, 4))
+    values[:, 0] = 100.0             # live the whole window
+    values[days - 400:, 1] = 100.0   # bought 400 days ago
+    values[days - 200:, 2] = 100.0   # bought 200 days ago: too short to annualize
+    twr = np.array([0.21, 0.21, 0.1, 0.0])
+    cagr = annualized_returns(twr, values, np.zeros_like(values))
+
+    assert cagr[0] == pytest.approx(0.1)
+    assert cagr[1] == pytest.approx(1.21 ** (365 / 400) - 1)
+    assert np.isnan(cagr[2:]).all()  # and never held
+
+
+def _txn(type, quantity=2.0, price=100.0, total_amount=None, fees=0.0, holding_id=None, transaction_date=None):
+    return SimpleNamespace(
+        type=type, quantity=quantity, price=price, total_amount=total_amount, fees=fees,
+        holding_id=holding_id, transaction_date=transaction_date, broker=None,
+    )
+
+
+def test_flow_amounts():
+    assert _flow_amount(_txn("buy", fees=5.0)) == 205.0
+    assert _flow_amount(_txn("sell", fees=5.0)) == -195.0
+    assert _flow_amount(_txn("dividend", total_amount=30.0)) == -30.0
+    assert _flow_amount(_txn("split")) == 0.0
+
+
+# ── get_returns ─────────────────────────────────────────────────────────────
+
+
+def _holding(name, asset_class_code, quantity, avg_buy_price, symbol=None):
+    h = MagicMock(
+        id=uuid.uuid4(), symbol=symbol, asset_class_code=asset_class_code,
+        exchange=None, quantity=quantity, avg_buy_price=avg_buy_price,
+    )
+    h.name = name
+    return h
+
+
+def _db(*results):
+    db = AsyncMock()
+    db.execute.side_effect = [MagicMock(all=MagicMock(return_value=rows)) for rows in results]
+    return db
+
+
+USER = uuid.uuid4()
+TODAY = date.today()
+
+
+@pytest.mark.asyncio
+async def test_returns_per_holding_asset_class_and_portfolio():
+    tcs = _holding("TCS", "EQUITY_IN", 10, 100.0, "TCS")
+    fd = _holding("FD", "FIXED_DEPOSIT", 1, 1000.0)
+    start = TODAY - timedelta(days=365)
+    price_rows = [("TCS.NS", start, 100.0)]
+    # A dividend paid out half way through
+    dividend = _txn("dividend", total_amount=50.0, holding_id=tcs.id, transaction_date=start + timedelta(days=180))
+    redis = AsyncMock(lrange=AsyncMock(return_value=["*"]))
+
+    with patch.object(returns_service, "_load_holdings", AsyncMock(return_value=[tcs, fd])), \
+         patch.object(returns_service, "_value_holdings", AsyncMock(return_value=[
+             (tcs, {"price": 110.0}), (fd, None),
+         ])):
+        result = await get_returns(_db(price_rows, [dividend]), USER, 365, redis=redis)
+
+    assert (result["start_date"], result["days"]) == (start.isoformat(), 365)
+    by_id = {h["id"]: h for h in result["holdings"]}
+    # 1000 -> 1100 with 50 paid out half way: 1.05 x 1.1 chain-linked
+    assert by_id[str(tcs.id)]["twr"] == 15.5
+    assert 15.0 < by_id[str(tcs.id)]["xirr"] < 15.5
+    assert by_id[str(fd.id)] == {**by_id[str(fd.id)], "xirr": 0.0, "twr": 0.0, "cagr": 0.0}
+    assert [c["asset_class"] for c in result["by_asset_class"]] == ["EQUITY_IN", "FIXED_DEPOSIT"]
+    assert result["by_asset_class"][0]["twr"] == by_id[str(tcs.id)]["twr"]
+    # 2000 -> 2100 with the same 50 paid out: 1.025 x 1.05
+    assert result["portfolio"]["twr"] == pytest.approx(7.625, abs=0.01)
+    assert result["portfolio"]["cagr"] == result["portfolio"]["twr"]
+
+
+@pytest.mark.asyncio
+async def test_no_holdings():
+    with patch.object(returns_service, "_load_holdings", AsyncMock(return_value=[])):
+        result = await get_returns(_db(), USER, 30)
+    assert (result["portfolio"], result["holdings"]) == (None, [])
@@ -0,0 +1,110 @@
+"""Tests for risk_metrics: the close table and per-ticker returns, the vectorized
+per-column metrics and get_risk's stored-row lookup (mocked DB)."""
+import uuid
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from app.services.risk_metrics import (
+    MIN_OBSERVATIONS,
+    TRADING_DAYS,
+    close_table,
+    daily_returns,
+    get_risk,
+    risk_metrics,
+)
+
+START = date(2026, 1, 1)
+
+
+# ── close_table ─────────────────────────────────────────────────────────────
+
+
+def test_closes_are_not_filled_across_each_others_trading_days():
+    rows = [
+        ("A", START, 10.0), ("A", START + timedelta(days=2), 12.0),
+        ("B", START + timedelta(days=1), 5.0),
+    ]
+    dates, closes = close_table(rows, ["A", "B", "C"])
+    assert dates == [START + timedelta(days=i) for i in range(3)]
+    assert closes[[0, 2], 0].tolist() == [10.0, 12.0] and np.isnan(closes[1, 0])
+    assert np.isnan(closes[[0, 2], 1]).all() and closes[1, 1] == 5.0
+    assert np.isnan(closes[:, 2]).all()
+
+
+def test_returns_span_each_columns_own_previous_close():
+    nan = np.nan
+    closes = np.array([[10.0, nan], [nan, 5.0], [12.0, nan], [nan, nan], [9.0, 6.0]])
+    returns = daily_returns(closes)
+    assert np.allclose(returns[:, 0], [nan, 0.2, nan, -0.25], equal_nan=True)
+    assert np.allclose(returns[:, 1], [nan, nan, nan, 0.2], equal_nan=True)
+
+
+# ── risk_metrics ────────────────────────────────────────────────────────────
+
+
+def _returns(n=60, seed=0):
+    return np.random.default_rng(seed).normal(0.0005, 0.01, n)
+
+
+class TestRiskMetrics:
+    def test_columns_match_their_definitions(self):
+        benchmark = _returns()
+        returns = np.column_stack([benchmark, 2 * benchmark])
+        metrics = risk_metrics(returns, {"IDX": benchmark}, 0.05)
+
+        volatility = benchmark.std(ddof=1) * np.sqrt(TRADING_DAYS)
+        assert metrics["volatility"] == pytest.approx([volatility, 2 * volatility])
+        assert metrics["volatility_1m"][0] == pytest.approx(benchmark[-21:].std(ddof=1) * np.sqrt(TRADING_DAYS))
+        assert metrics["sharpe"][0] == pytest.approx((benchmark.mean() * TRADING_DAYS - 0.05) / volatility)
+        assert metrics["beta"]["IDX"] == pytest.approx([1.0, 2.0])
+
+    def test_recent_volatility_uses_each_columns_own_last_returns(self):
+        returns = np.column_stack([_returns(), _returns()])
+        returns[::2, 1] = np.nan  # trades every other day
+        metrics = risk_metrics(returns, {}, 0.0)
+        own = returns[~np.isnan(returns[:, 1]), 1][-21:]
+        assert metrics["volatility_1m"][1] == pytest.approx(own.std(ddof=1) * np.sqrt(TRADING_DAYS))
+
+    def test_max_drawdown_is_the_worst_peak_to_trough(self):
+        closes = np.array([[100.0], [120.0], [90.0], [110.0], [60.0], [130.0]] + [[130.0]] * MIN_OBSERVATIONS)
+        metrics = risk_metrics(daily_returns(closes), {}, 0.0)
+        assert metrics["max_drawdown"][0] == pytest.approx(-0.5)
+
+    def test_short_histories_get_no_metrics(self):
+        returns = np.column_stack([_returns(), _returns(seed=1)])
+        returns[: -MIN_OBSERVATIONS + 1, 1] = np.nan
+        metrics = risk_metrics(returns, {"IDX": returns[:, 0]}, 0.0)
+        assert np.isfinite(metrics["volatility"][0])
+        assert np.isnan([metrics["volatility"][1], metrics["sharpe"][1], metrics["beta"]["IDX"][1]]).all()
+
+
+# ── get_risk ────────────────────────────────────────────────────────────────
+
+
+def _db(row):
+    result = MagicMock()
+    result.first.return_value = row
+    return AsyncMock(execute=AsyncMock(return_value=result))
+
+
+STORED = {"volatility": 20.0, "volatility_1m": 18.0, "max_drawdown": -12.0, "sharpe": 0.8,
+          "beta": {"^NSEI": 1.1, "^GSPC": 0.3}}
+
+
+@pytest.mark.asyncio
+async def test_stored_metrics_report_the_chosen_benchmarks_beta():
+    row = SimpleNamespace(as_of=START, metrics={"portfolio": STORED, "holdings": [{"symbol": "TCS.NS", **STORED}]})
+    result = await get_risk(_db(row), uuid.uuid4(), "^GSPC")
+    assert (result["as_of"], result["benchmark_name"]) == ("2026-01-01", "S&P 500")
+    assert result["portfolio"] == {**STORED, "beta": 0.3}
+    assert result["holdings"][0]["beta"] == 0.3
+
+
+@pytest.mark.asyncio
+async def test_users_without_stored_metrics():
+    result = await get_risk(_db(None), uuid.uuid4())
+    assert (result["as_of"], result["portfolio"], result["holdings"]) == (None, None, [])
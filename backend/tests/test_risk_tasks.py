@@ -0,0 +1,114 @@
+"""Tests for risk_tasks: value weights and portfolio aggregation in
+compute_user_risk, and update_risk_metrics' stored rows (mocked DB + Redis)."""
+from datetime import date, timedelta
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.tasks import risk_tasks
+from app.tasks.risk_tasks import compute_user_risk, update_risk_metrics
+from tests.helpers import make_holding
+
+START = date(2026, 1, 1)
+DAYS = 60
+
+
+def _price_rows():
+    """Nifty on a random walk and TCS moving 1.5x its daily returns, ending at 100."""
+    index_returns = np.random.default_rng(0).normal(0, 0.01, DAYS)
+    index = 100 * np.cumprod(np.concatenate([[1.0], 1 + index_returns]))
+    tcs = np.cumprod(np.concatenate([[1.0], 1 + 1.5 * index_returns]))
+    tcs *= 100 / tcs[-1]
+    return [
+        row for i in range(DAYS + 1)
+        for row in (("^NSEI", START + timedelta(days=i), index[i]), ("TCS.NS", START + timedelta(days=i), tcs[i]))
+    ]
+
+
+def _weekday_rows():
+    """_price_rows() on weekdays only, plus BTC closing every day (weekends too) until a day later."""
+    weekday_rows = []
+    for k, (symbol, _, close) in enumerate(_price_rows()):
+        weekday_rows.append((symbol, START + timedelta(days=k // 2 // 5 * 7 + k // 2 % 5), close))
+    rng = np.random.default_rng(1)
+    last = max(d for _, d, _ in weekday_rows)
+    btc = [("BTC-INR", START + timedelta(days=i), float(c))
+           for i, c in enumerate(5e6 * np.cumprod(1 + rng.normal(0, 0.03, (last - START).days + 2)))]
+    return weekday_rows, btc
+
+
+# ── compute_user_risk ───────────────────────────────────────────────────────
+
+
+def test_portfolios_are_value_weighted_with_unpriced_holdings_as_cash():
+    by_user = compute_user_risk({
+        "u1": [make_holding("TCS")],
+        # 1000 in TCS at the last close, 3000 in a fixed deposit
+        "u2": [make_holding("TCS"), make_holding("FD", "FIXED_DEPOSIT", 1, 3000.0)],
+    }, _price_rows())
+
+    as_of, u1 = by_user["u1"]
+    assert as_of == START + timedelta(days=DAYS)
+    tcs = u1["holdings"][0]
+    assert (tcs["symbol"], tcs["weight"], tcs["beta"]["^NSEI"]) == ("TCS.NS", 100.0, 1.5)
+    assert tcs["beta"]["^GSPC"] is None
+    assert u1["portfolio"]["volatility"] == tcs["volatility"]
+
+    _, u2 = by_user["u2"]
+    assert u2["holdings"][0]["weight"] == 25.0
+    assert u2["portfolio"]["beta"]["^NSEI"] == pytest.approx(0.375, abs=0.01)
+    assert u2["portfolio"]["volatility"] == pytest.approx(tcs["volatility"] / 4, abs=0.01)
+
+
+def test_other_users_holdings_dont_change_a_users_metrics():
+    weekday_rows, btc = _weekday_rows()
+    alone = compute_user_risk({"u1": [make_holding("TCS")]}, weekday_rows)
+    fleet = compute_user_risk(
+        {"u1": [make_holding("TCS")], "u2": [make_holding("BTC", "CRYPTO", 0.01)]}, weekday_rows + btc,
+    )
+    assert fleet["u1"] == alone["u1"]
+    # BTC's last close is a day after everything else
+    assert fleet["u2"][0] == fleet["u1"][0] + timedelta(days=1)
+
+
+def test_holdings_without_closes_yet_are_left_out_of_the_portfolio():
+    rows = _price_rows()
+    # INFY only starts trading halfway through, after which it moves with TCS
+    infy = [("INFY.NS", d, c) for s, d, c in rows if s == "TCS.NS" and d >= START + timedelta(days=DAYS // 2)]
+    _, mixed = compute_user_risk({"u1": [make_holding("TCS"), make_holding("INFY")]}, rows + infy)["u1"]
+    _, tcs = compute_user_risk({"u1": [make_holding("TCS")]}, rows)["u1"]
+    assert mixed["portfolio"]["volatility"] == pytest.approx(tcs["portfolio"]["volatility"], abs=0.01)
+    assert mixed["portfolio"]["beta"]["^NSEI"] == pytest.approx(1.5, abs=0.01)
+
+
+def test_no_closes_means_nothing_to_store():
+    assert compute_user_risk({"u1": [make_holding("TCS")]}, []) == {}
+
+
+# ── update_risk_metrics ─────────────────────────────────────────────────────
+
+
+@patch.object(risk_tasks, "_write_risk_sync", return_value=1)
+@patch.object(risk_tasks, "_load_closes_sync")
+@patch.object(risk_tasks, "load_holdings_by_user_sync")
+@patch.object(risk_tasks, "_get_sync_db")
+@patch.object(risk_tasks, "_get_sync_redis")
+class TestUpdateRiskMetrics:
+    def test_rows_are_stamped_with_holdings_versions(self, redis, db, holdings, closes, write):
+        redis.return_value = MagicMock(mget=MagicMock(return_value=["4"]))
+        holdings.return_value = {"u1": [make_holding("TCS")]}
+        closes.return_value = _price_rows()
+
+        assert update_risk_metrics() == {"users": 1, "rows": 1}
+        assert closes.call_args.args[1] == ["TCS.NS", "^NSEI", "^GSPC"]
+        _, by_user, versions = write.call_args.args
+        assert (by_user["u1"][0], versions) == (START + timedelta(days=DAYS), {"u1": 4})
+
+    def test_user_without_holdings_is_cleared(self, redis, db, holdings, closes, write):
+        holdings.return_value = {}
+        cursor = db.return_value.cursor.return_value.__enter__.return_value
+
+        assert update_risk_metrics("u1") == {"users": 0, "rows": 0}
+        assert cursor.execute.call_args.args[1] == ("u1",)
+        write.assert_not_called()
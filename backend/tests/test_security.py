@@ -0,0 +1,106 @@
+"""Tests for security.get_current_user: the identity-only principal query, its
+rejections and the Redis principal cache (mocked DB + Redis)."""
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import redis.asyncio as aioredis
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.schemas.user import Principal
+from app.utils.security import create_access_token, get_current_user, invalidate_principal, principal_key
+
+USER_ID = uuid.uuid4()
+
+
+def _row(**overrides):
+    return SimpleNamespace(**{
+        "id": USER_ID, "email": "a@example.com", "full_name": "A", "phone": None,
+        "preferred_currency": "INR", "onboarding_completed": True, "is_active": True,
+        "created_at": datetime(2026, 1, 1, tzinfo=timezone.utc), **overrides,
+    })
+
+
+def _db(row):
+    db = AsyncMock()
+    db.execute.return_value = MagicMock(one_or_none=MagicMock(return_value=row))
+    return db
+
+
+def _credentials(user_id=USER_ID):
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token({"sub": str(user_id)}))
+
+
+@pytest.fixture(autouse=True)
+def redis():
+    r = MagicMock(get=AsyncMock(return_value=None), set=AsyncMock(), delete=AsyncMock())
+    with patch("app.utils.security.redis_client", r):
+        yield r
+
+
+@pytest.mark.asyncio
+async def test_loads_only_identity_columns():
+    db = _db(_row())
+    principal = await get_current_user(_credentials(), db)
+
+    assert principal == Principal(**vars(_row()))
+    statement = db.execute.call_args.args[0]
+    columns = {c.name for c in statement.selected_columns}
+    assert columns == set(Principal.model_fields)
+    assert "password_hash" not in columns
+
+
+@pytest.mark.asyncio
+async def test_inactive_or_missing_user_is_rejected():
+    for row in (None, _row(is_active=False)):
+        with pytest.raises(HTTPException) as e:
+            await get_current_user(_credentials(), _db(row))
+        assert e.value.status_code == 401
+
+
+# ── principal cache ─────────────────────────────────────────────────────────
+
+
+@pytest.mark.asyncio
+async def test_miss_loads_and_caches_the_principal(redis):
+    principal = await get_current_user(_credentials(), _db(_row()))
+
+    key, raw = redis.set.call_args.args
+    assert key == principal_key(USER_ID)
+    assert Principal.model_validate_json(raw) == principal
+
+
+@pytest.mark.asyncio
+async def test_hit_skips_the_database(redis):
+    cached = Principal(**vars(_row(full_name="Cached")))
+    redis.get.return_value = cached.model_dump_json()
+    db = _db(_row())
+
+    assert await get_current_user(_credentials(), db) == cached
+    db.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_inactive_user_is_not_cached(redis):
+    with pytest.raises(HTTPException):
+        await get_current_user(_credentials(), _db(_row(is_active=False)))
+    redis.set.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_redis_down_falls_back_to_the_database(redis):
+    redis.get.side_effect = aioredis.ConnectionError("down")
+    redis.set.side_effect = aioredis.ConnectionError("down")
+    assert (await get_current_user(_credentials(), _db(_row()))).id == USER_ID
+
+
+@pytest.mark.asyncio
+async def test_invalidate_drops_the_cached_principal(redis):
+    await invalidate_principal(USER_ID)
+    redis.delete.assert_awaited_once_with(principal_key(USER_ID))
+
+    redis.delete.side_effect = aioredis.ConnectionError("down")
+    await invalidate_principal(USER_ID)
@@ -0,0 +1,103 @@
+"""Tests for valuation_tasks: the vectorized value_portfolios against the API's
+per-user valuation, and the views warm_portfolio_views caches (mocked DB + Redis)."""
+import json
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.services.portfolio_service import _allocate, _summarize
+from app.tasks import valuation_tasks
+from app.tasks.valuation_tasks import value_portfolios, warm_portfolio_views
+from tests.helpers import make_holding
+
+
+PRICES = {
+    "TCS.NS": (120.0, 110.0),
+    "AAPL": (200.0, None),
+    "BTC-INR": (5_000_000.0, 4_900_000.0),
+}
+
+
+def _api_price(h):
+    """resolve_prices_bulk's answer for one holding under PRICES."""
+    ticker = {"TCS": "TCS.NS", "AAPL": "AAPL", "BTC": "BTC-INR"}.get(h.symbol)
+    if ticker in PRICES and h.asset_class_code != "FIXED_DEPOSIT":
+        price, previous_close = PRICES[ticker]
+        return {"price": price, "previous_close": previous_close}
+    return {"price": h.avg_buy_price, "previous_close": None}
+
+
+# ── value_portfolios ────────────────────────────────────────────────────────
+
+
+def test_matches_the_per_user_valuation():
+    rng = np.random.default_rng(1)
+    choices = [
+        ("TCS", "EQUITY_IN"), ("AAPL", "EQUITY_US"), ("BTC", "CRYPTO"),
+        ("INFY", "EQUITY_IN"),  # no price anywhere: cost basis
+        ("FD", "FIXED_DEPOSIT"),
+    ]
+    holdings_by_user = {
+        f"u{i}": [
+            make_holding(*choices[k], quantity=float(rng.integers(1, 50)), avg_buy_price=float(rng.integers(50, 500)))
+            for k in rng.integers(0, len(choices), rng.integers(1, 6))
+        ]
+        for i in range(20)
+    }
+    holdings_by_user["empty"] = []
+
+    views = value_portfolios(holdings_by_user, PRICES)
+
+    assert set(views) == {f"u{i}" for i in range(20)}
+    for u, (summary, allocation) in views.items():
+        valued = [(h, _api_price(h)) for h in holdings_by_user[u]]
+        assert summary == pytest.approx(_summarize(valued))
+        assert [a["asset_class"] for a in allocation] == [a["asset_class"] for a in _allocate(valued)]
+        assert [a["value"] for a in allocation] == pytest.approx([a["value"] for a in _allocate(valued)])
+
+
+def test_day_change_needs_a_previous_close():
+    (summary, allocation), = value_portfolios(
+        {"u1": [make_holding("TCS"), make_holding("AAPL", "EQUITY_US", 1, 150.0)]}, PRICES,
+    ).values()
+    assert summary["current_value"] == 1400.0
+    assert summary["day_change"] == 100.0
+    assert [(a["asset_class"], a["percentage"]) for a in allocation] == [("EQUITY_IN", 85.71), ("EQUITY_US", 14.29)]
+
+
+def test_no_prices_values_everything_at_cost():
+    (summary, _), = value_portfolios({"u1": [make_holding("TCS")]}, {}).values()
+    assert (summary["current_value"], summary["total_gain_loss"]) == (1000.0, 0.0)
+
+
+# ── warm_portfolio_views ────────────────────────────────────────────────────
+
+
+@patch.object(valuation_tasks, "_resolve_prices_sync", return_value=PRICES)
+@patch.object(valuation_tasks, "load_holdings_by_user_sync")
+@patch.object(valuation_tasks, "_load_holder_ids_sync")
+@patch.object(valuation_tasks, "_get_sync_db")
+@patch.object(valuation_tasks, "_get_sync_redis")
+class TestWarmPortfolioViews:
+    def test_views_are_stored_under_the_versions_read_first(self, redis, db, holder_ids, holdings, prices):
+        r = MagicMock(get=MagicMock(return_value="9"), mget=MagicMock(return_value=["4", None]))
+        redis.return_value = r
+        holder_ids.return_value = ["u1", "u2"]
+        holdings.return_value = {"u1": [make_holding("TCS")], "u2": [make_holding("FD", "FIXED_DEPOSIT", 1, 3000.0)]}
+
+        assert warm_portfolio_views() == {"users": 2, "tickers": 1}
+        assert prices.call_args.args[2] == ["TCS.NS"]
+        stored = {call.args[0]: json.loads(call.args[1]) for call in r.pipeline.return_value.set.call_args_list}
+        assert set(stored) == {
+            "portfolio:u1:summary:4:9", "portfolio:u1:allocation:4:9",
+            "portfolio:u2:summary:0:9", "portfolio:u2:allocation:0:9",
+        }
+        assert stored["portfolio:u1:summary:4:9"]["current_value"] == 1200.0
+        assert stored["portfolio:u2:allocation:0:9"][0]["value"] == 3000.0
+
+    def test_no_holders_writes_nothing(self, redis, db, holder_ids, holdings, prices):
+        holder_ids.return_value = []
+        assert warm_portfolio_views() == {"users": 0, "tickers": 0}
+        holdings.assert_not_called()
+        redis.return_value.pipeline.assert_not_called()